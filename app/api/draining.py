@@ -0,0 +1,100 @@
+"""
+Graceful drain: track in-flight streaming responses and report readiness while a worker shuts down
+"""
+import asyncio
+import signal
+import time
+from typing import Any, AsyncIterator, Awaitable
+
+from api.logging_theme import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class DrainState:
+    """
+    Per-worker drain state. On SIGTERM the worker reports itself as not ready, so that a load balancer stops
+    routing to it, while the server stops accepting connections and lets in-flight SSE streams (and background
+    batch jobs) finish.
+    """
+    def __init__(self):
+        self.draining = False
+        self.active_streams = 0
+
+    def begin_drain(self):
+        """Mark the worker as draining."""
+        if not self.draining:
+            self.draining = True
+            logger.info(f"Draining: {self.active_streams} streams in flight")
+
+    async def track(self, stream: AsyncIterator[str]) -> AsyncIterator[str]:
+        """
+        Count a streaming response as in flight until it ends or the client disconnects.
+
+        Args:
+            stream (AsyncIterator[str]): The response chunks.
+
+        Yields:
+            str: The same chunks.
+        """
+        self.active_streams += 1
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            self.active_streams -= 1
+
+    async def run(self, job: Awaitable[Any]) -> Any:
+        """
+        Count a background job (e.g. a batch run) as in flight until it ends.
+
+        Args:
+            job (Awaitable[Any]): The job.
+
+        Returns:
+            Any: The result of the job.
+        """
+        self.active_streams += 1
+        try:
+            return await job
+        finally:
+            self.active_streams -= 1
+
+    async def wait_idle(self, timeout: float) -> bool:
+        """
+        Wait for the in-flight streams to finish.
+
+        Args:
+            timeout (float): Maximum number of seconds to wait.
+
+        Returns:
+            bool: True if no stream is left in flight.
+        """
+        deadline = time.monotonic() + timeout
+        while self.active_streams and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        return not self.active_streams
+
+    def install_signal_hook(self):
+        """
+        Chain begin_drain in front of the server's SIGTERM and SIGINT handlers.
+
+        Must be called once the server has installed its handlers, i.e. from the lifespan startup.
+        """
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            previous = signal.getsignal(sig)
+            if not callable(previous):
+                continue
+
+            def handler(signum, frame, previous=previous):
+                self.begin_drain()
+                previous(signum, frame)
+
+            try:
+                signal.signal(sig, handler)
+            except ValueError:
+                # Not in the main thread (e.g. under a test client): the server handles shutdown on its own
+                return
+
+
+drain_state = DrainState()
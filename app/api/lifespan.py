@@ -0,0 +1,109 @@
+"""
+Application lifespan: warm up shared clients and models before serving requests
+"""
+import os
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI
+
+from api.draining import drain_state
+from api.logging_theme import setup_logger
+from domain.retrieval.faq_index import FAQ_COLLECTION, refresh_faq_index
+from utils.configs import (DENSE_EMBEDDING_BACKEND, get_embeddings, get_qdrant_client, get_sparse_embeddings,
+                           get_state_backend)
+
+logger = setup_logger(__name__)
+
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "true").lower() == "true"
+# Upper bound on waiting for in-flight streams at shutdown; keep it below gunicorn's graceful_timeout
+DRAIN_TIMEOUT_S = float(os.getenv("DRAIN_TIMEOUT_S", "55"))
+
+
+def warm_up_sparse_model() -> float:
+    """
+    Load the sparse model and run one encoding so the ONNX session is initialised
+    Returns:
+        float: seconds spent warming up
+    """
+    start = time.perf_counter()
+    get_sparse_embeddings().embed_query("warm up")
+    elapsed = time.perf_counter() - start
+    logger.info(f"Sparse model warmed up in {elapsed:.2f}s")
+    return elapsed
+
+
+def warm_up_dense_model() -> float:
+    """
+    Load the local dense model, if one is configured, and run one encoding
+    Returns:
+        float: seconds spent warming up
+    """
+    if DENSE_EMBEDDING_BACKEND == "openai":
+        return 0.0
+    start = time.perf_counter()
+    get_embeddings().embed_query("warm up")
+    elapsed = time.perf_counter() - start
+    logger.info(f"Dense model ({DENSE_EMBEDDING_BACKEND}) warmed up in {elapsed:.2f}s")
+    return elapsed
+
+
+def warm_up_qdrant() -> float:
+    """
+    Open the Qdrant connection so the first request does not pay the handshake
+    Returns:
+        float: seconds spent warming up
+    """
+    start = time.perf_counter()
+    collections = get_qdrant_client().get_collections().collections
+    elapsed = time.perf_counter() - start
+    logger.info(f"Qdrant connection warmed up in {elapsed:.2f}s ({len(collections)} collections)")
+    return elapsed
+
+
+def warm_up_faq_index() -> float:
+    """
+    Load the in-process FAQ index of this worker
+    Returns:
+        float: seconds spent loading
+    """
+    start = time.perf_counter()
+    index = refresh_faq_index(FAQ_COLLECTION)
+    elapsed = time.perf_counter() - start
+    logger.info(f"FAQ index loaded in {elapsed:.2f}s ({index.size if index.enabled else 'served by Qdrant'})")
+    return elapsed
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Warm up the embedding models, the Qdrant connection and the FAQ index of this worker.
+
+    The Qdrant (gRPC) connection is opened here, in the worker, because channels
+    must not be shared across a fork. The models may already be loaded by
+    the master process when the app is preloaded (see gunicorn.conf.py).
+
+    On shutdown the worker drains: it waits for in-flight SSE streams, then
+    closes the state backend.
+    """
+    if WARMUP_ON_STARTUP:
+        start = time.perf_counter()
+        try:
+            warm_up_sparse_model()
+            warm_up_dense_model()
+            warm_up_qdrant()
+            warm_up_faq_index()
+        except Exception as e:
+            logger.error(f"Error warming up on startup: {e}")
+        app.state.startup_seconds = time.perf_counter() - start
+        logger.info(f"Startup warm-up completed in {app.state.startup_seconds:.2f}s")
+    drain_state.install_signal_hook()
+    yield
+
+    drain_state.begin_drain()
+    if await drain_state.wait_idle(DRAIN_TIMEOUT_S):
+        logger.info("All in-flight streams finished")
+    else:
+        logger.warning(f"Shutting down with {drain_state.active_streams} streams still in flight")
+    if get_state_backend.cache_info().currsize:
+        get_state_backend().close()
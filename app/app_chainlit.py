@@ -1,36 +1,58 @@
-import os
+import asyncio
+import itertools
 import time
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 from uuid import uuid4
-import re
 
 import chainlit as cl
 from chainlit.input_widget import Switch
-from groq import AsyncGroq
-from openai import AsyncOpenAI
-from langchain.retrievers import MergerRetriever
 from langchain_core.documents import Document
 from langchain_core.vectorstores import VectorStoreRetriever
 
-from app.domain.retrieval.vectorstores import get_vectorstore
-from utils.configs import client as chroma_client
-from langchain.chains import HypotheticalDocumentEmbedder
+from api.logging_theme import setup_logger
+from domain.generation.prompt_assembly import PromptAssembler, PromptCacheUsageHandler
+from domain.retrieval.vectorstores import VectorStore
+from utils.configs import get_llm, get_qdrant_client
 
 API_URL = "http://127.0.0.1:8080/query"
 
 
-client = AsyncOpenAI(
-    api_key=os.getenv("OPENAI_API_KEY"),
-    # base_url="https://api.deepseek.com"
+chat_prompt_assembler = PromptAssembler(
+    static_system_prompt="""
+            # Bạn là một Chatbot thông tin quy chế đào tạo Đại học chuyên nghiệp của trường Đại học Công nghiệp Hà Nội.
+
+            # Ràng buộc:
+            # Nếu bạn không biết câu trả lời, hãy hỏi thêm.
+            # Chỉ thảo luận các vấn đề liên quan đến quy chế đào tạo Đại học của trường Đại học Công nghiệp Hà Nội.
+            # KHÔNG LÀM CÁC HÀNH ĐỘNG KHÁC NHƯ VIẾT MÃ, GIẢI TOÁN, LÀM THƠ,...
+            # Đối với những thông tin cần cập nhật theo thời gian thực, chỉ hướng dẫn, không xin thêm thông tin.
+
+            # Chỉ sử dụng Bối cảnh được cung cấp ngay trước câu hỏi.
+            """,
+    context_prompt="# Bối cảnh:\n\n{context}",
 )
-# client = AsyncGroq(
-#     api_key=os.getenv("GROQ_API_KEY"),
-# )
+
+
+@lru_cache(maxsize=32)
+def get_retrievers(collection_names: Tuple[str, ...]) -> List[VectorStoreRetriever]:
+    """Build the retrievers of a collection set once and share them between sessions."""
+    return [
+        VectorStore(collection_name).get_vectorstore().as_retriever(search_type="mmr", search_kwargs={"score_threshold": 0.8})
+        for collection_name in collection_names
+    ]
+
+
+async def retrieve(retrievers: List[VectorStoreRetriever], query: str) -> List[Document]:
+    """Search every collection concurrently and interleave the results like MergerRetriever."""
+    results = await asyncio.gather(*(retriever.ainvoke(query) for retriever in retrievers))
+    return [doc for docs in itertools.zip_longest(*results) for doc in docs if doc is not None]
 
 
 @cl.on_chat_start
 async def start():
-    collection_names = chroma_client.list_collections()
+    collections = await asyncio.to_thread(get_qdrant_client().get_collections)
+    collection_names = [collection.name for collection in collections.collections]
     setting = await cl.ChatSettings([
         Switch(id=collection_name, label=collection_name)
         for collection_name in collection_names
@@ -47,12 +69,8 @@ async def setup_agent(settings):
     if not selected_collections:
         return
 
-    # Khởi tạo retriever
-    retrievers = MergerRetriever(
-        retrievers=[
-            get_vectorstore(collection_name).as_retriever(search_type="mmr", search_kwargs={"score_threshold": 0.8}) for
-            collection_name in selected_collections]
-    )
+    # Khởi tạo retriever (dùng chung cho các session chọn cùng tập collection)
+    retrievers = await asyncio.to_thread(get_retrievers, tuple(sorted(selected_collections)))
     cl.user_session.set("retrievers", retrievers)
 
     # Tạo chuỗi xử lý RAG
@@ -80,7 +98,7 @@ async def setup_agent(settings):
 async def main(message: cl.Message):
     """Xử lý truy vấn và sinh câu trả lời."""
     selected_collections = cl.user_session.get("selected_collections", [])
-    retrievers: VectorStoreRetriever = cl.user_session.get("retrievers")
+    retrievers: List[VectorStoreRetriever] = cl.user_session.get("retrievers")
     session_id = cl.context.session.id
 
     if not selected_collections:
@@ -88,43 +106,45 @@ async def main(message: cl.Message):
         return
 
     start = time.time()
-    retrieved_docs = retrievers.invoke(message.content)
-
-    stream = await client.chat.completions.create(
-        # model="deepseek-r1-distill-llama-70b",
-        model="gpt-4o",
-        messages=[
-            {"role": "system",
-             "content": ("""
-            # Bạn là một Chatbot thông tin quy chế đào tạo Đại học chuyên nghiệp của trường Đại học Công nghiệp Hà Nội.
-
-            # Ràng buộc:
-            # Nếu bạn không biết câu trả lời, hãy hỏi thêm.
-            # Chỉ thảo luận các vấn đề liên quan đến quy chế đào tạo Đại học của trường Đại học Công nghiệp Hà Nội.
-            # KHÔNG LÀM CÁC HÀNH ĐỘNG KHÁC NHƯ VIẾT MÃ, GIẢI TOÁN, LÀM THƠ,...
-            # Đối với những thông tin cần cập nhật theo thời gian thực, chỉ hướng dẫn, không xin thêm thông tin.
-
-            # Chỉ sử dụng Bối cảnh sau:
-            """)},
-            {"role": "system", "content": str([doc.page_content for doc in retrieved_docs])},
-            {"role": "user", "content": message.content},
-            *cl.chat_context.to_openai()
-        ],
-        stream=True
+    retrieved_docs = await retrieve(retrievers, message.content)
+
+    history = cl.chat_context.to_openai()
+    if history and history[-1].get("role") == "user" and history[-1].get("content") == message.content:
+        history = history[:-1]
+
+    # Model and provider come from the shared LLM router (failover between OpenAI, Groq, DeepSeek, local)
+    stream = get_llm("generation").astream(
+        # Static instructions, history, context, question: keeps the longest prefix cacheable
+        chat_prompt_assembler.openai_messages(
+            context="\n\n".join(doc.page_content for doc in retrieved_docs),
+            question=message.content,
+            history=history,
+        ),
+        config={"callbacks": [PromptCacheUsageHandler(static_tokens=chat_prompt_assembler.static_tokens)]},
     )
     text_elements = []  # type: List[cl.Text]
 
-    # Step hiển thị tài liệu nguồn
-    async with cl.Step(name="Source Documents") as source_step:
-        source_text = "\n\n".join([f"**source_{i}:** \n {doc.page_content}" for i, doc in enumerate(retrieved_docs)])
-        await source_step.stream_token(source_text)
+    # Step hiển thị tài liệu nguồn, trong lúc chờ LLM trả về token đầu tiên
+    async def show_sources():
+        async with cl.Step(name="Source Documents") as source_step:
+            for i, doc in enumerate(retrieved_docs):
+                await source_step.stream_token(f"**source_{i}:** \n {doc.page_content}\n\n")
+
+    first_chunk, _ = await asyncio.gather(anext(stream, None), show_sources())
 
     thinking = False
     async with cl.Step(name="Thinking") as thinking_step:
         final_answer = cl.Message(content="")
 
-        async for chunk in stream:
-            delta = chunk.choices[0].delta
+        async def chunks():
+            if first_chunk is not None:
+                yield first_chunk
+            async for chunk in stream:
+                yield chunk
+
+        async for delta in chunks():
+            if not delta.content:
+                continue
 
             if delta.content == "<think>":
                 thinking = True
@@ -139,7 +159,7 @@ async def main(message: cl.Message):
             if thinking:
                 await thinking_step.stream_token(delta.content)
             else:
-                await final_answer.stream_token(str(delta.content))
+                await final_answer.stream_token(delta.content)
     await final_answer.send()
     cl.chat_context.add(final_answer)
 
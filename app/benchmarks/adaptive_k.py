@@ -0,0 +1,95 @@
+"""
+Adaptive retrieval benchmark: fixed k against the query router with score-gap cut-off.
+
+The questions are a JSONL file of {"question": ..., "expected": <substring of the
+relevant chunk, optional>}. For each configuration the report gives the route
+mix, the average prompt tokens (static prompt + context), retrieval latency
+percentiles and, when "expected" is given, how often it is still in the context.
+"--llm" also times the answers of the generation model.
+
+    cd app && python -m benchmarks.adaptive_k --questions questions.jsonl \
+        --collection tailieu_ftu --fixed-k 10
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from collections import Counter
+
+import numpy as np
+from langchain_core.output_parsers import StrOutputParser
+from langchain_qdrant import RetrievalMode
+
+from domain.generation.prompt_templates import qa_prompt, qa_prompt_assembler
+from domain.retrieval.chunk import pack_context
+from domain.retrieval.context import routed_contexts
+from domain.retrieval.routing import QueryRouter
+from utils.configs import get_llm
+from utils.tokens import count_tokens
+
+
+def read_jsonl(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def run_config(name: str, router: QueryRouter, collection: str, questions: list, llm: bool,
+               mode: RetrievalMode = RetrievalMode.HYBRID) -> dict:
+    latencies, prompt_tokens, hits, routes = [], [], [], Counter()
+    answer_latencies = []
+    chain = qa_prompt | get_llm("generation") | StrOutputParser() if llm else None
+    for item in questions:
+        start = time.perf_counter()
+        plan, blocks = routed_contexts(collection, [item["question"]], router, retrieval_mode=mode)[0]
+        latencies.append(time.perf_counter() - start)
+        context = pack_context(blocks)
+        routes[plan.category] += 1
+        prompt_tokens.append(qa_prompt_assembler.static_tokens + count_tokens(item["question"]) + count_tokens(context))
+        if item.get("expected"):
+            hits.append(item["expected"] in context)
+        if chain is not None:
+            start = time.perf_counter()
+            asyncio.run(chain.ainvoke({"input": item["question"], "context": context, "chat_history": []}))
+            answer_latencies.append(time.perf_counter() - start)
+
+    result = {
+        "config": name,
+        "routes": dict(routes),
+        "avg_prompt_tokens": statistics.mean(prompt_tokens),
+        "retrieval_p50_ms": statistics.median(latencies) * 1000,
+        "retrieval_p95_ms": float(np.percentile(latencies, 95)) * 1000,
+    }
+    if hits:
+        result["context_hit_rate"] = sum(hits) / len(hits)
+    if answer_latencies:
+        result["answer_p50_s"] = statistics.median(answer_latencies)
+        result["answer_p95_s"] = float(np.percentile(answer_latencies, 95))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", required=True)
+    parser.add_argument("--collection", default="tailieu_ftu")
+    parser.add_argument("--fixed-k", type=int, default=10)
+    parser.add_argument("--mode", choices=[mode.value for mode in RetrievalMode], default=RetrievalMode.HYBRID.value,
+                        help="Search mode; the score-gap cut only applies to dense and sparse")
+    parser.add_argument("--llm", action="store_true", help="Also time the generated answers")
+    args = parser.parse_args()
+
+    questions = read_jsonl(args.questions)
+    mode = RetrievalMode(args.mode)
+    results = [
+        run_config(f"fixed k={args.fixed_k}", QueryRouter(adaptive=False, default_k=args.fixed_k), args.collection,
+                   questions, args.llm, mode),
+        run_config("adaptive", QueryRouter(adaptive=True), args.collection, questions, args.llm, mode),
+    ]
+    for result in results:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    saved = 1 - results[1]["avg_prompt_tokens"] / results[0]["avg_prompt_tokens"]
+    print(f"Average prompt tokens: {saved:+.1%} saved by adaptive retrieval")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Per-request allocation benchmark: LangchainDocument vs the slotted Chunk record.
+
+Decodes k synthetic Qdrant points per request into result objects and packs the prompt context, the way the
+retrieval path does, keeps both alive as a request would, and reports allocated blocks and peak traced memory
+per request.
+
+    cd app && python -m benchmarks.chunk_memory --requests 1000 --k 10
+"""
+import argparse
+import time
+import tracemalloc
+import uuid
+from types import SimpleNamespace
+
+from langchain_core.documents import Document as LangchainDocument
+
+from domain.retrieval.chunk import Chunk, pack_context
+
+
+def make_points(k: int, chunk_chars: int) -> list:
+    return [
+        SimpleNamespace(
+            id=str(uuid.uuid4()),
+            score=1.0 / (i + 1),
+            payload={
+                "page_content": "Học phí ngành Công nghệ thông tin năm 2024 " * (chunk_chars // 44),
+                "metadata": {"file_path": "de_an_tuyen_sinh_2024.docx"},
+            },
+        )
+        for i in range(k)
+    ]
+
+
+def as_documents(points: list) -> tuple:
+    documents = [
+        LangchainDocument(page_content=p.payload["page_content"],
+                          metadata={**p.payload["metadata"], "_id": p.id, "_collection_name": "tailieu"})
+        for p in points
+    ]
+    return documents, "\n\n".join(document.page_content for document in documents)
+
+
+def as_chunks(points: list) -> tuple:
+    chunks = [Chunk.from_point(p) for p in points]
+    return chunks, pack_context(chunks)
+
+
+def measure(decode, requests: list) -> tuple:
+    tracemalloc.start()
+    start_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    start = time.perf_counter()
+    retained = [decode(points) for points in requests]
+    elapsed = time.perf_counter() - start
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename")) - start_blocks
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del retained
+    return blocks / len(requests), peak / len(requests), elapsed / len(requests)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--chunk-chars", type=int, default=1500)
+    args = parser.parse_args()
+
+    requests = [make_points(args.k, args.chunk_chars) for _ in range(args.requests)]
+    print(f"{'representation':<20}{'blocks/req':>12}{'peak B/req':>14}{'us/req':>10}")
+    for name, decode in (("LangchainDocument", as_documents), ("Chunk", as_chunks)):
+        blocks, peak, seconds = measure(decode, requests)
+        print(f"{name:<20}{blocks:>12.1f}{peak:>14.0f}{seconds * 1e6:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Dense embedding backend benchmark: latency, throughput and retrieval recall.
+
+The corpus is a JSONL file of chunks ({"page_content": ...}) and the queries a
+JSONL file of labelled questions ({"question": ..., "expected": <substring of
+the relevant chunk>}). Each backend embeds the corpus, then every query is
+embedded on its own and searched by brute-force cosine similarity.
+
+    cd app && python -m benchmarks.embedding_backends --corpus chunks.jsonl \
+        --queries questions.jsonl --backends openai fastembed
+"""
+import argparse
+import json
+import statistics
+import time
+
+import numpy as np
+
+from utils.configs import get_embeddings
+
+
+def read_jsonl(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def normalize(matrix: np.ndarray) -> np.ndarray:
+    return matrix / np.linalg.norm(matrix, axis=-1, keepdims=True).clip(min=1e-12)
+
+
+def run_backend(backend: str, corpus: list, queries: list, k: int) -> dict:
+    embeddings = get_embeddings(backend)
+    embeddings.embed_query("warm up")
+    texts = [chunk["page_content"] for chunk in corpus]
+
+    start = time.perf_counter()
+    corpus_matrix = normalize(np.asarray(embeddings.embed_documents(texts), dtype=np.float32))
+    corpus_seconds = time.perf_counter() - start
+
+    latencies, hits = [], 0
+    for query in queries:
+        start = time.perf_counter()
+        query_vector = normalize(np.asarray(embeddings.embed_query(query["question"]), dtype=np.float32))
+        latencies.append(time.perf_counter() - start)
+        top_k = np.argsort(-(corpus_matrix @ query_vector))[:k]
+        hits += any(query["expected"] in texts[i] for i in top_k)
+
+    return {
+        "backend": backend,
+        "docs_per_s": len(texts) / corpus_seconds,
+        "query_p50_ms": statistics.median(latencies) * 1000,
+        "query_p95_ms": float(np.percentile(latencies, 95)) * 1000,
+        f"recall@{k}": hits / len(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", required=True)
+    parser.add_argument("--queries", required=True)
+    parser.add_argument("--backends", nargs="+", default=["openai", "fastembed"])
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    corpus, queries = read_jsonl(args.corpus), read_jsonl(args.queries)
+    results = [run_backend(backend, corpus, queries, args.k) for backend in args.backends]
+
+    columns = list(results[0])
+    print("".join(f"{column:>16}" for column in columns))
+    for result in results:
+        print("".join(f"{value:>16.3f}" if isinstance(value, float) else f"{value:>16}" for value in result.values()))
+
+
+if __name__ == "__main__":
+    main()
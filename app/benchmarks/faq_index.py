@@ -0,0 +1,79 @@
+"""
+FAQ lookup benchmark: the in-process FAQ index against semantic search in Qdrant.
+
+The questions are a JSONL file of {"question": ...}, typically paraphrases and
+verbatim copies of FAQ entries. For each question the report gives the tier
+that matched (exact, fuzzy or dense) and the lookup latency percentiles of the
+index and of a k=1 Qdrant search. Dense lookups include the query embedding.
+
+    cd app && python -m benchmarks.faq_index --questions faq_questions.jsonl --collection faq
+"""
+import argparse
+import json
+import statistics
+import time
+from collections import Counter
+
+import numpy as np
+
+from domain.retrieval.faq_index import FAQIndex
+from domain.retrieval.search import SearchEngine
+from utils.configs import get_embeddings
+
+
+def read_jsonl(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentiles(name: str, latencies: list) -> dict:
+    if not latencies:
+        return {}
+    return {
+        f"{name}_p50_us": statistics.median(latencies) * 1e6,
+        f"{name}_p95_us": float(np.percentile(latencies, 95)) * 1e6,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", required=True)
+    parser.add_argument("--collection", default="faq")
+    args = parser.parse_args()
+
+    questions = [item["question"] for item in read_jsonl(args.questions)]
+    start = time.perf_counter()
+    index = FAQIndex(args.collection).load()
+    print(f"Loaded {index.size} entries ({index.nbytes / 1e6:.1f} MB) in {time.perf_counter() - start:.2f}s")
+    if not index.enabled:
+        print("The collection exceeds FAQ_INDEX_MAX_SIZE and is served by Qdrant")
+        return
+
+    tiers, latencies = Counter(), {"exact": [], "fuzzy": [], "dense": []}
+    embeddings = get_embeddings()
+    for question in questions:
+        start = time.perf_counter()
+        match = index.exact(question) or index.fuzzy(question)
+        if match is None:
+            match = index.nearest(embeddings.embed_query(question))
+        elapsed = time.perf_counter() - start
+        if match is not None:
+            tiers[match.kind] += 1
+            latencies[match.kind].append(elapsed)
+
+    engine = SearchEngine(collection_name=args.collection, k=1)
+    qdrant_latencies = []
+    for question in questions:
+        start = time.perf_counter()
+        engine.search_chunks([question])
+        qdrant_latencies.append(time.perf_counter() - start)
+
+    result = {"questions": len(questions), "tiers": dict(tiers)}
+    for kind, values in latencies.items():
+        result.update(percentiles(kind, values))
+    result.update(percentiles("qdrant", qdrant_latencies))
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
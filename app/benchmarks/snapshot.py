@@ -0,0 +1,161 @@
+"""
+Snapshot round trip: export a collection, restore it under another name, check that
+both hold the same points, then compare the timings with re-encoding the same chunks.
+
+Against a running Qdrant (QDRANT_URL):
+
+    cd app && python -m benchmarks.snapshot --collection tailieu_ftu --fresh
+
+Without a server, on random points in an in-memory Qdrant:
+
+    cd app && python -m benchmarks.snapshot --synthetic 20000 --dim 1536
+
+"--fresh" re-embeds the chunk texts with the configured dense and sparse backends
+and upserts them, which is a lower bound of fresh ingestion (docling parsing is
+not included). Exits with status 1 if the round trip loses or changes anything.
+"""
+import argparse
+import sys
+import tempfile
+import time
+import uuid
+
+import numpy as np
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient, models
+
+from domain.ingestion.snapshot import CollectionSnapshot
+from utils.configs import get_embeddings, get_qdrant_client, get_sparse_embeddings, get_sparse_index_stats, \
+    get_table_store
+
+
+def create_synthetic(client: QdrantClient, collection_name: str, count: int, dim: int):
+    rng = np.random.default_rng(0)
+    client.create_collection(
+        collection_name,
+        vectors_config={QdrantVectorStore.VECTOR_NAME: models.VectorParams(size=dim, distance=models.Distance.COSINE)},
+        sparse_vectors_config={QdrantVectorStore.SPARSE_VECTOR_NAME: models.SparseVectorParams(
+            modifier=models.Modifier.IDF)},
+    )
+    client.upload_points(collection_name, (
+        models.PointStruct(
+            id=str(uuid.uuid4()),
+            vector={
+                QdrantVectorStore.VECTOR_NAME: rng.standard_normal(dim, dtype=np.float32).tolist(),
+                QdrantVectorStore.SPARSE_VECTOR_NAME: models.SparseVector(
+                    indices=sorted(rng.choice(100_000, size=40, replace=False).tolist()),
+                    values=rng.random(40).tolist()),
+            },
+            payload={QdrantVectorStore.CONTENT_KEY: f"chunk {i}",
+                     QdrantVectorStore.METADATA_KEY: {"file_path": f"file_{i % 7}.docx"}},
+        )
+        for i in range(count)
+    ), batch_size=512, wait=True)
+
+
+def read_points(client: QdrantClient, collection_name: str) -> dict:
+    points, offset = {}, None
+    while True:
+        batch, offset = client.scroll(collection_name, limit=512, offset=offset, with_payload=True, with_vectors=True)
+        points.update({str(point.id): point for point in batch})
+        if offset is None:
+            return points
+
+
+def compare(client: QdrantClient, source: str, target: str) -> list:
+    source_points, target_points = read_points(client, source), read_points(client, target)
+    errors = []
+    if source_points.keys() != target_points.keys():
+        errors.append(f"ids differ: {len(source_points)} vs {len(target_points)} points")
+    for point_id in source_points.keys() & target_points.keys():
+        first, second = source_points[point_id], target_points[point_id]
+        if first.payload != second.payload:
+            errors.append(f"payload of {point_id} differs")
+        if not np.allclose(first.vector[QdrantVectorStore.VECTOR_NAME], second.vector[QdrantVectorStore.VECTOR_NAME],
+                           atol=1e-6):
+            errors.append(f"dense vector of {point_id} differs")
+        sparse, restored = (point.vector.get(QdrantVectorStore.SPARSE_VECTOR_NAME) for point in (first, second))
+        if (sparse is None) != (restored is None) or sparse is not None and (
+                sparse.indices != restored.indices or not np.allclose(sparse.values, restored.values)):
+            errors.append(f"sparse vector of {point_id} differs")
+    for point in list(source_points.values())[:20]:
+        query = point.vector[QdrantVectorStore.VECTOR_NAME]
+        hits = [[str(hit.id) for hit in client.query_points(name, query=query, using=QdrantVectorStore.VECTOR_NAME,
+                                                             limit=5).points] for name in (source, target)]
+        if hits[0] != hits[1]:
+            errors.append(f"top-5 of {point.id} differs")
+    return errors[:20]
+
+
+def fresh_ingestion(client: QdrantClient, source: str, target: str) -> float:
+    texts, ids = [], []
+    for point_id, point in read_points(client, source).items():
+        ids.append(point_id)
+        texts.append(point.payload.get(QdrantVectorStore.CONTENT_KEY, ""))
+    start = time.perf_counter()
+    dense = get_embeddings().embed_documents(texts)
+    sparse = get_sparse_embeddings(source).embed_documents(texts)
+    client.create_collection(
+        target,
+        vectors_config={QdrantVectorStore.VECTOR_NAME: models.VectorParams(size=len(dense[0]),
+                                                                           distance=models.Distance.COSINE)},
+        sparse_vectors_config={QdrantVectorStore.SPARSE_VECTOR_NAME: models.SparseVectorParams(
+            modifier=models.Modifier.IDF)},
+    )
+    client.upload_points(target, (
+        models.PointStruct(id=point_id, vector={
+            QdrantVectorStore.VECTOR_NAME: dense_vector,
+            QdrantVectorStore.SPARSE_VECTOR_NAME: models.SparseVector(indices=sparse_vector.indices,
+                                                                      values=sparse_vector.values),
+        })
+        for point_id, dense_vector, sparse_vector in zip(ids, dense, sparse)
+    ), batch_size=512, wait=True)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source_group = parser.add_mutually_exclusive_group(required=True)
+    source_group.add_argument("--collection", help="Existing collection to export")
+    source_group.add_argument("--synthetic", type=int, help="Number of random points in an in-memory Qdrant")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--fresh", action="store_true", help="Also time re-encoding the chunk texts")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        client, source = QdrantClient(location=":memory:"), f"snapshot_bench_{uuid.uuid4().hex[:8]}"
+        create_synthetic(client, source, args.synthetic, args.dim)
+    else:
+        client, source = get_qdrant_client(), args.collection
+    target, fresh = f"{source}_roundtrip", f"{source}_fresh"
+
+    timings = {}
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            path = f"{directory}/{source}"
+            start = time.perf_counter()
+            manifest = CollectionSnapshot(source, client=client).export(path)
+            timings["export_s"] = time.perf_counter() - start
+            start = time.perf_counter()
+            CollectionSnapshot(target, client=client).restore(path, overwrite=True)
+            timings["import_s"] = time.perf_counter() - start
+        errors = compare(client, source, target)
+        if args.fresh:
+            timings["fresh_encode_upsert_s"] = fresh_ingestion(client, source, fresh)
+    finally:
+        for name in (target, f"{target}_parents", fresh):
+            if client.collection_exists(name):
+                client.delete_collection(name)
+        get_sparse_index_stats().drop_collection(target)
+        get_table_store().import_collection(target, [])
+
+    print(f"points: {manifest['points_count']}  parents: {manifest['parents_count']}  "
+          f"tables: {manifest['tables_count']}")
+    for name, seconds in timings.items():
+        print(f"{name:>24}: {seconds:8.2f}  ({manifest['points_count'] / seconds:10.1f} points/s)")
+    print("round trip: " + ("OK" if not errors else "FAILED\n  " + "\n  ".join(errors)))
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()
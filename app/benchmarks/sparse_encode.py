@@ -0,0 +1,79 @@
+"""
+Sparse encoder throughput: documents and queries per second, cold and warm cache.
+
+The corpus is a JSONL file of chunks ({"page_content": ...}). Each backend encodes
+it twice. For "vietnamese_bm25" the cold pass runs against an empty statistics
+database, the "persisted" pass with an empty in-process cache reads the term
+frequencies stored by the cold pass (what re-ingesting a document costs in a
+fresh worker or CLI), and the warm pass hits the in-process cache. Queries are
+the first line of each chunk.
+
+    cd app && python -m benchmarks.sparse_encode --corpus chunks.jsonl \
+        --backends fastembed vietnamese_bm25
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from domain.retrieval.sparse_index import SparseIndexStats, VietnameseBM25SparseEmbeddings
+from utils.configs import get_sparse_embeddings
+
+
+def read_jsonl(path: str) -> list:
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def run_backend(backend: str, texts: list, queries: list, db_dir: str) -> dict:
+    persisted_seconds = None
+    if backend == "vietnamese_bm25":
+        # A scratch database, so that the cold pass does not read the real cache (nor fill it)
+        embeddings = VietnameseBM25SparseEmbeddings(stats=SparseIndexStats(os.path.join(db_dir, "sparse.sqlite3")))
+        cold_seconds = timed(embeddings.embed_documents, texts)
+        embeddings.tokenizer.cache_clear()
+        persisted_seconds = timed(embeddings.embed_documents, texts)
+    else:
+        embeddings = get_sparse_embeddings(backend=backend)
+        embeddings.embed_query("warm up")
+        cold_seconds = timed(embeddings.embed_documents, texts)
+    warm_seconds = timed(embeddings.embed_documents, texts)
+    query_seconds = timed(lambda: [embeddings.embed_query(query) for query in queries])
+    vectors = embeddings.embed_documents(texts)
+
+    return {
+        "backend": backend,
+        "cold_docs_per_s": len(texts) / cold_seconds,
+        "persisted_docs_per_s": len(texts) / persisted_seconds if persisted_seconds else "-",
+        "warm_docs_per_s": len(texts) / warm_seconds,
+        "queries_per_s": len(queries) / query_seconds,
+        "avg_nnz": sum(len(vector.indices) for vector in vectors) / len(vectors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", required=True)
+    parser.add_argument("--backends", nargs="+", default=["fastembed", "vietnamese_bm25"])
+    args = parser.parse_args()
+
+    texts = [chunk["page_content"] for chunk in read_jsonl(args.corpus)]
+    queries = [text.strip().splitlines()[0] for text in texts if text.strip()]
+    with tempfile.TemporaryDirectory() as db_dir:
+        results = [run_backend(backend, texts, queries, db_dir) for backend in args.backends]
+
+    columns = list(results[0])
+    print("".join(f"{column:>18}" for column in columns))
+    for result in results:
+        print("".join(f"{value:>18.1f}" if isinstance(value, float) else f"{value:>18}" for value in result.values()))
+
+
+if __name__ == "__main__":
+    main()
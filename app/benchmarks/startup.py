@@ -0,0 +1,58 @@
+"""
+Startup-time benchmark.
+
+Measures, in fresh interpreters, how long importing the app takes, how long the
+deferred ingestion dependencies (docling, pandas) would have added, and how long
+the warm-up of the sparse model and Qdrant connection takes.
+
+    cd app && python -m benchmarks.startup --runs 5
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+
+SNIPPETS = {
+    "import main": "import main",
+    "import docling patch (deferred)": "import external_services.patches.custom_docling",
+    "import pandas (deferred)": "import pandas",
+    "sparse model warm-up": "from api.lifespan import warm_up_sparse_model; warm_up_sparse_model()",
+    "qdrant warm-up": "from api.lifespan import warm_up_qdrant; warm_up_qdrant()",
+}
+
+
+def time_snippet(snippet: str) -> float:
+    """
+    Run a snippet in a fresh interpreter and return its wall time
+    Args:
+        snippet (str): python code to time
+    Returns:
+        float: seconds spent executing the snippet
+    """
+    code = (
+        "import time; _t = time.perf_counter()\n"
+        f"{snippet}\n"
+        "print(time.perf_counter() - _t)"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'step':<35}{'median (s)':>12}{'min (s)':>10}")
+    for name, snippet in SNIPPETS.items():
+        try:
+            timings = [time_snippet(snippet) for _ in range(args.runs)]
+        except subprocess.CalledProcessError as e:
+            reason = (e.stderr.strip().splitlines() or ["unknown error"])[-1]
+            print(f"{name:<35}{'failed':>12}  {reason}")
+            continue
+        print(f"{name:<35}{statistics.median(timings):>12.3f}{min(timings):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+This module contains an offline harness measuring retrieval quality and latency of SearchEngine configurations.
+
+The corpus is loaded into an in-memory Qdrant collection and every labelled question is searched under each
+configuration of the grid. A retrieved document is relevant when its metadata "chunk_id" is in the question's
+"expected_ids" or when its text contains one of the question's "expected" substrings.
+"""
+import itertools
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import Iterable, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document as LangchainDocument
+from langchain_qdrant import QdrantVectorStore, RetrievalMode
+
+from api.logging_theme import setup_logger
+from domain.ingestion.indexing import SPARSE_VECTOR_PARAMS
+from domain.retrieval.search import SearchEngine
+from utils.configs import get_embeddings, get_sparse_embeddings
+
+
+@dataclass
+class LabelledQuestion:
+    """
+    A question with the chunks (ids or text fragments) that should be retrieved for it.
+    """
+    question: str
+    expected: List[str]
+    expected_ids: List[str]
+
+    def is_relevant(self, document: LangchainDocument) -> bool:
+        """Whether a retrieved document answers this question."""
+        if document.metadata.get("chunk_id") in self.expected_ids:
+            return True
+        return any(fragment in document.page_content for fragment in self.expected)
+
+
+@dataclass
+class EvaluationResult:
+    """
+    Metrics of one configuration.
+    """
+    config: str
+    mode: str
+    k: int
+    rerank: bool
+    recall_at_k: float
+    mrr: float
+    p50_latency_ms: float
+    p95_latency_ms: float
+
+
+def read_labelled_questions(lines: Iterable[str]) -> List[LabelledQuestion]:
+    """
+    Parse JSONL lines of {"question", "expected": [...], "expected_ids": [...]}.
+
+    Args:
+        lines (Iterable[str]): JSONL lines.
+
+    Returns:
+        List[LabelledQuestion]: Parsed questions.
+    """
+    questions = []
+    for line in lines:
+        if not line.strip():
+            continue
+        item = json.loads(line)
+        expected = item.get("expected", [])
+        questions.append(LabelledQuestion(
+            question=item["question"],
+            expected=[expected] if isinstance(expected, str) else expected,
+            expected_ids=[str(chunk_id) for chunk_id in item.get("expected_ids", [])],
+        ))
+    return questions
+
+
+class RetrievalEvaluator:
+    """
+    Run labelled questions through SearchEngine under a grid of configurations.
+    """
+    def __init__(self, corpus: List[LangchainDocument], questions: List[LabelledQuestion],
+                 collection_name: str = "evaluation"):
+        self.questions = questions
+        self.collection_name = collection_name
+        self.logger = setup_logger(__name__)
+        self.logger.info(f"Indexing {len(corpus)} chunks into an in-memory Qdrant collection")
+        self.client = QdrantVectorStore.from_documents(
+            documents=corpus,
+            embedding=get_embeddings(),
+            sparse_embedding=get_sparse_embeddings(collection_name),
+            location=":memory:",
+            collection_name=collection_name,
+            retrieval_mode=RetrievalMode.HYBRID,
+            sparse_vector_params=SPARSE_VECTOR_PARAMS,
+        ).client
+
+    def evaluate(self, mode: RetrievalMode, k: int, rerank: bool, label: Optional[str] = None) -> EvaluationResult:
+        """
+        Evaluate one configuration.
+
+        Args:
+            mode (RetrievalMode): Dense, sparse or hybrid retrieval.
+            k (int): Number of retrieved documents.
+            rerank (bool): Whether to rerank candidates with the cross-encoder.
+            label (Optional[str]): Prefix for the configuration name.
+
+        Returns:
+            EvaluationResult: Recall@k, MRR and latency percentiles.
+        """
+        engine = SearchEngine(collection_name=self.collection_name, k=k, retrieval_mode=mode, rerank=rerank,
+                              client=self.client)
+        latencies, hits, reciprocal_ranks = [], 0, []
+        for question in self.questions:
+            start = time.perf_counter()
+            documents = [document for document, _ in engine.search(question.question)]
+            latencies.append((time.perf_counter() - start) * 1000)
+            rank = next((i for i, document in enumerate(documents, start=1) if question.is_relevant(document)), None)
+            hits += rank is not None
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+        config = f"{mode.value}/k={k}/{'rerank' if rerank else 'no-rerank'}"
+        return EvaluationResult(
+            config=f"{label}/{config}" if label else config,
+            mode=mode.value,
+            k=k,
+            rerank=rerank,
+            recall_at_k=hits / len(self.questions),
+            mrr=float(np.mean(reciprocal_ranks)),
+            p50_latency_ms=float(np.percentile(latencies, 50)),
+            p95_latency_ms=float(np.percentile(latencies, 95)),
+        )
+
+    def run_grid(self, modes: List[RetrievalMode], k_values: List[int], rerank_options: List[bool],
+                 label: Optional[str] = None) -> List[EvaluationResult]:
+        """
+        Evaluate every combination of modes, k values and rerank options.
+
+        Returns:
+            List[EvaluationResult]: One result per configuration.
+        """
+        results = []
+        for mode, k, rerank in itertools.product(modes, k_values, rerank_options):
+            result = self.evaluate(mode, k, rerank, label=label)
+            self.logger.info(f"{result.config}: recall@k={result.recall_at_k:.3f} mrr={result.mrr:.3f} "
+                             f"p95={result.p95_latency_ms:.1f}ms")
+            results.append(result)
+        return results
+
+
+def format_report(results: List[EvaluationResult]) -> str:
+    """
+    Format results as a side-by-side table.
+
+    Args:
+        results (List[EvaluationResult]): Evaluation results.
+
+    Returns:
+        str: The table.
+    """
+    header = f"{'config':<45}{'recall@k':>10}{'MRR':>8}{'p50 ms':>10}{'p95 ms':>10}"
+    rows = [
+        f"{r.config:<45}{r.recall_at_k:>10.3f}{r.mrr:>8.3f}{r.p50_latency_ms:>10.1f}{r.p95_latency_ms:>10.1f}"
+        for r in results
+    ]
+    return "\n".join([header, *rows])
+
+
+def results_to_json(results: List[EvaluationResult]) -> str:
+    """Serialize results for later comparison."""
+    return json.dumps([asdict(result) for result in results], ensure_ascii=False, indent=2)
@@ -0,0 +1,43 @@
+"""
+This module contains the conversation history kept in the shared state backend.
+"""
+import json
+import os
+from typing import List, Optional, Sequence
+
+from langchain_core.chat_history import BaseChatMessageHistory
+from langchain_core.messages import BaseMessage, message_to_dict, messages_from_dict
+
+from utils.configs import get_state_backend
+from utils.state_backend import StateBackend
+
+# Number of question/answer turns kept per session
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "5"))
+CHAT_HISTORY_TTL_S = int(os.getenv("CHAT_HISTORY_TTL_S", "86400"))
+
+
+class BackendChatMessageHistory(BaseChatMessageHistory):
+    """
+    Windowed message history of one session, readable by any worker or node.
+    """
+    def __init__(self, session_id: str, window: int = CHAT_HISTORY_WINDOW, ttl: int = CHAT_HISTORY_TTL_S,
+                 backend: Optional[StateBackend] = None):
+        self.key = f"chat_history:{session_id}"
+        self.max_messages = 2 * window
+        self.ttl = ttl
+        self.backend = backend or get_state_backend()
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        return messages_from_dict([json.loads(item) for item in self.backend.get_list(self.key)])
+
+    def add_messages(self, messages: Sequence[BaseMessage]) -> None:
+        self.backend.append(
+            self.key,
+            [json.dumps(message_to_dict(message), ensure_ascii=False) for message in messages],
+            max_length=self.max_messages,
+            ttl=self.ttl,
+        )
+
+    def clear(self) -> None:
+        self.backend.delete(self.key)
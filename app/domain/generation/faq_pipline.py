@@ -1,11 +1,34 @@
 """
-This module contains the FAQSearcher class which is responsible for searching FAQ answers using semantic search.
+This module contains the FAQSearcher class which is responsible for searching FAQ answers: in the in-process FAQ
+index when the collection is small enough, with semantic search in Qdrant otherwise.
 """
+import hashlib
+import json
+import os
+
+from langchain_core.documents import Document as LangchainDocument
+
 from api.logging_theme import setup_logger
 from domain.generation.prompt_templates import val_faq_prompt
+from domain.retrieval.faq_index import aget_faq_index, bump_faq_version, faq_version
 from domain.retrieval.search import SearchEngine
 from schemas.faq_val_model import EvalFAQ
-from utils.configs import llm
+from utils.configs import get_embeddings, get_llm_router, get_state_backend
+from utils.text import normalize_text
+
+# Validated FAQ answers (and misses) are cached per normalized question until the FAQ collection changes
+FAQ_CACHE_TTL_S = int(os.getenv("FAQ_CACHE_TTL_S", "3600"))
+# Misses expire quickly: one negative validation must not hide a FAQ answer from every node for long
+FAQ_MISS_CACHE_TTL_S = int(os.getenv("FAQ_MISS_CACHE_TTL_S", "60"))
+
+
+def invalidate_faq_cache(collection_name: str):
+    """
+    Invalidate the cached answers of a FAQ collection, on every worker and node
+    Args:
+        collection_name (str): FAQ collection that changed
+    """
+    bump_faq_version(collection_name)
 
 
 class FAQSearcher:
@@ -16,6 +39,35 @@ class FAQSearcher:
         self.collection_name = collection_name
         self.logger = setup_logger(__name__)
 
+    def _cache_key(self, question: str) -> str:
+        version = faq_version(self.collection_name)
+        digest = hashlib.blake2b(normalize_text(question, fold=False).encode("utf-8"), digest_size=16).hexdigest()
+        return f"faq_answer:{self.collection_name}:{version}:{digest}"
+
+    async def validate_faq(self, question: str, document: LangchainDocument) -> str | None:
+        """Validate that a retrieved FAQ matches the question.
+
+        Args:
+            question (str): The user's question
+            document (LangchainDocument): The retrieved FAQ entry
+
+        Returns:
+            str | None: The FAQ answer if the entry is relevant, None otherwise
+        """
+        # Validate relevance using structured output, on the fast validation model (hedged if it is slow)
+        validation_input = val_faq_prompt.format(
+            question=question,
+            retrieved_document=document
+        )
+
+        result = await get_llm_router().ainvoke_hedged("validation", validation_input, schema=EvalFAQ)
+
+        if result.is_relevant:
+            # Get answer from vectorstore metadata
+            return document.metadata["answer"]
+
+        return None
+
     async def search_faq(self, question: str) -> str | None:
         """Search for FAQ answers using semantic search and validate relevance.
 
@@ -26,28 +78,32 @@ class FAQSearcher:
             str | None: Answer if found and relevant, None otherwise
         """
         try:
-            # Get most relevant FAQ
-            retriever = SearchEngine(collection_name="faq", k=1).semantic_search()
-            docs = await retriever.ainvoke(question)
-
-            if not docs:
-                return None
+            index = await aget_faq_index(self.collection_name)
+            # An exact match of the normalized question needs neither the cache nor validation
+            match = index.exact(question) if index.enabled else None
+            if match is not None:
+                return match.answer
 
-            # Validate relevance using structured output
-            structured_llm = llm.with_structured_output(EvalFAQ)
-            validation_input = val_faq_prompt.format(
-                question=question,
-                retrieved_document=docs[0]
-            )
+            cache_key = self._cache_key(question)
+            cached = get_state_backend().get(cache_key)
+            if cached is not None:
+                return json.loads(cached)["answer"]
 
-            result = await structured_llm.ainvoke(validation_input)
+            if index.enabled:
+                # Near-duplicate wording first, then brute-force cosine over the FAQ embeddings
+                match = index.fuzzy(question) or index.nearest(await get_embeddings().aembed_query(question))
+                document = match.to_document() if match is not None else None
+            else:
+                # Get most relevant FAQ
+                retriever = SearchEngine(collection_name=self.collection_name, k=1).semantic_search()
+                docs = await retriever.ainvoke(question)
+                document = docs[0] if docs else None
 
-            if result.is_relevant:
-                # Get answer from vectorstore metadata
-                return docs[0].metadata["answer"]
-
-            return None
+            answer = await self.validate_faq(question, document) if document is not None else None
+            get_state_backend().set(cache_key, json.dumps({"answer": answer}, ensure_ascii=False),
+                                    ttl=FAQ_CACHE_TTL_S if answer is not None else FAQ_MISS_CACHE_TTL_S)
+            return answer
 
         except Exception as e:
             self.logger.error(f"An error occurred in search_faq: {e}")
-            return None
\ No newline at end of file
+            return None
@@ -0,0 +1,234 @@
+"""
+This module contains the LLM provider registry shared by the RAG pipeline, the FAQ validator and the Chainlit app.
+
+Providers are OpenAI-compatible chat endpoints configured from the environment. Each role ("generation",
+"validation") has an ordered route of providers; the router picks the first provider whose observed latency is
+within budget, fails over to the next ones on timeouts or errors, and can hedge short calls by starting a second
+provider when the first is slow to answer.
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.runnables import Runnable
+from langchain_openai import ChatOpenAI
+
+from api.logging_theme import setup_logger
+
+# Weight of the newest observation in the latency moving average
+LATENCY_EWMA_ALPHA = 0.3
+# A provider whose average latency exceeds this budget is moved behind the others of its route
+LLM_LATENCY_BUDGET_S = float(os.getenv("LLM_LATENCY_BUDGET_S", "8"))
+# A provider whose last call failed is moved behind the others of its route for this long
+LLM_FAILURE_COOLDOWN_S = float(os.getenv("LLM_FAILURE_COOLDOWN_S", "60"))
+# Start the next provider of a hedged call when the first has not answered after this delay
+LLM_HEDGE_AFTER_S = float(os.getenv("LLM_HEDGE_AFTER_S", "2"))
+
+
+@dataclass
+class ProviderConfig:
+    """
+    An OpenAI-compatible chat endpoint.
+    """
+    name: str
+    model: str
+    api_key: Optional[str] = None
+    base_url: Optional[str] = None
+    timeout: float = 30.0
+
+
+def providers_from_env() -> Dict[str, ProviderConfig]:
+    """
+    Build the providers that are configured in the environment.
+
+    Returns:
+        Dict[str, ProviderConfig]: Providers by name.
+    """
+    timeout = float(os.getenv("LLM_TIMEOUT_S", "30"))
+    candidates = [
+        ProviderConfig("openai", os.getenv("OPENAI_CHAT_MODEL"), os.getenv("OPENAI_API_KEY"), timeout=timeout),
+        ProviderConfig("openai_fast", os.getenv("OPENAI_FAST_CHAT_MODEL", "gpt-4o-mini"), os.getenv("OPENAI_API_KEY"),
+                       timeout=timeout),
+        ProviderConfig("groq", os.getenv("GROQ_CHAT_MODEL", "llama-3.3-70b-versatile"), os.getenv("GROQ_API_KEY"),
+                       base_url="https://api.groq.com/openai/v1", timeout=timeout),
+        ProviderConfig("deepseek", os.getenv("DEEPSEEK_CHAT_MODEL", "deepseek-chat"), os.getenv("DEEPSEEK_API_KEY"),
+                       base_url="https://api.deepseek.com", timeout=timeout),
+        ProviderConfig("local", os.getenv("LOCAL_LLM_MODEL", "local-stand-in"), "local",
+                       base_url=os.getenv("LOCAL_LLM_BASE_URL"), timeout=timeout),
+    ]
+    return {
+        provider.name: provider for provider in candidates
+        if provider.model and provider.api_key and (provider.name != "local" or provider.base_url)
+    }
+
+
+ROLE_ROUTES = {
+    "generation": os.getenv("LLM_ROUTE_GENERATION", "openai,groq,deepseek,local").split(","),
+    "validation": os.getenv("LLM_ROUTE_VALIDATION", "openai_fast,openai,local").split(","),
+}
+ROLE_TEMPERATURES = {"generation": 1.3, "validation": 0.0}
+
+
+class LatencyTracker(BaseCallbackHandler):
+    """
+    Record the latency of one provider in one role: time to first token for streamed calls, full duration
+    otherwise. Failures are counted apart from latency; cancelled calls (lost hedges, client disconnects) are ignored.
+    """
+    def __init__(self, router: "LLMRouter", provider_name: str, role: str):
+        self.router = router
+        self.provider_name = provider_name
+        self.role = role
+        self._started: Dict[UUID, float] = {}
+
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], *, run_id: UUID,
+                            **kwargs: Any) -> None:
+        self._started[run_id] = time.perf_counter()
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            self.router.record_latency(self.provider_name, self.role, time.perf_counter() - started)
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        started = self._started.pop(run_id, None)
+        if started is not None:
+            self.router.record_latency(self.provider_name, self.role, time.perf_counter() - started)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._started.pop(run_id, None)
+        if not isinstance(error, asyncio.CancelledError):
+            self.router.record_error(self.provider_name, self.role)
+
+
+class LLMRouter:
+    """
+    Route LLM calls of each role to the configured providers.
+    """
+    def __init__(self, providers: Optional[Dict[str, ProviderConfig]] = None,
+                 routes: Optional[Dict[str, List[str]]] = None):
+        self.providers = providers if providers is not None else providers_from_env()
+        self.routes = routes or ROLE_ROUTES
+        # Keyed by (provider, role): a slow validation call says nothing about the generation model
+        self.latency: Dict[Tuple[str, str], float] = {}
+        self.failed_at: Dict[Tuple[str, str], float] = {}
+        self._models: Dict[tuple, ChatOpenAI] = {}
+        self.logger = setup_logger(__name__)
+        if not self.providers:
+            raise ValueError("No LLM provider configured")
+
+    def record_latency(self, provider_name: str, role: str, seconds: float):
+        """Update the moving average latency of a provider in a role, and clear its failures."""
+        key = (provider_name, role)
+        previous = self.latency.get(key)
+        self.latency[key] = seconds if previous is None else (
+            LATENCY_EWMA_ALPHA * seconds + (1 - LATENCY_EWMA_ALPHA) * previous
+        )
+        self.failed_at.pop(key, None)
+
+    def record_error(self, provider_name: str, role: str):
+        """Record a failed call (error or timeout) of a provider in a role."""
+        self.failed_at[(provider_name, role)] = time.monotonic()
+
+    def _failing(self, provider_name: str, role: str) -> bool:
+        failed_at = self.failed_at.get((provider_name, role))
+        return failed_at is not None and time.monotonic() - failed_at < LLM_FAILURE_COOLDOWN_S
+
+    def ordered_providers(self, role: str) -> List[str]:
+        """
+        Providers of a role, best first: route order, with providers that are over the latency budget or failed
+        within LLM_FAILURE_COOLDOWN_S moved last.
+
+        Args:
+            role (str): "generation" or "validation".
+
+        Returns:
+            List[str]: Provider names.
+        """
+        route = [name for name in self.routes.get(role, []) if name in self.providers] or list(self.providers)
+        fast = [name for name in route if self.latency.get((name, role), 0.0) <= LLM_LATENCY_BUDGET_S
+                and not self._failing(name, role)]
+        slow = sorted((name for name in route if name not in fast),
+                      key=lambda name: (self._failing(name, role), self.latency.get((name, role), 0.0)))
+        return fast + slow
+
+    def _model(self, provider_name: str, role: str) -> ChatOpenAI:
+        key = (provider_name, role)
+        if key not in self._models:
+            provider = self.providers[provider_name]
+            self._models[key] = ChatOpenAI(
+                model=provider.model,
+                api_key=provider.api_key,
+                base_url=provider.base_url,
+                temperature=ROLE_TEMPERATURES.get(role, 1.0),
+                timeout=provider.timeout,
+                # fail over to the next provider instead of retrying a slow one
+                max_retries=0 if len(self.providers) > 1 else 2,
+                stream_usage=True,
+                callbacks=[LatencyTracker(self, provider_name, role)],
+            )
+        return self._models[key]
+
+    def _runnables(self, role: str, schema: Optional[type] = None) -> List[Runnable]:
+        models = [self._model(name, role) for name in self.ordered_providers(role)]
+        if schema is None:
+            return models
+        return [model.with_structured_output(schema) for model in models]
+
+    def chat_model(self, role: str, schema: Optional[type] = None) -> Runnable:
+        """
+        Get a runnable for a role that fails over to the next providers on errors and timeouts.
+
+        Args:
+            role (str): "generation" or "validation".
+            schema (Optional[type]): Pydantic model for structured output.
+
+        Returns:
+            Runnable: The primary model with fallbacks.
+        """
+        primary, *fallbacks = self._runnables(role, schema)
+        return primary.with_fallbacks(fallbacks) if fallbacks else primary
+
+    async def ainvoke_hedged(self, role: str, model_input: Any, schema: Optional[type] = None,
+                             hedge_after: float = LLM_HEDGE_AFTER_S) -> Any:
+        """
+        Invoke the best provider and, if it has not answered after hedge_after seconds (or failed), the next one
+        too; return the first successful answer and cancel the others.
+
+        Args:
+            role (str): "generation" or "validation".
+            model_input (Any): Prompt or messages.
+            schema (Optional[type]): Pydantic model for structured output.
+            hedge_after (float): Delay before starting the next provider.
+
+        Returns:
+            Any: The first successful response.
+        """
+        runnables = self._runnables(role, schema)
+        pending, errors = set(), []
+        try:
+            for runnable in runnables:
+                pending.add(asyncio.ensure_future(runnable.ainvoke(model_input)))
+                while pending:
+                    done, pending = await asyncio.wait(pending, timeout=hedge_after,
+                                                       return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        break  # still waiting: hedge with the next provider
+                    for task in done:
+                        if task.exception() is None:
+                            return task.result()
+                        errors.append(task.exception())
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    errors.append(task.exception())
+        finally:
+            for task in pending:
+                task.cancel()
+        self.logger.error(f"All providers failed for role {role}: {errors}")
+        raise errors[-1] if errors else ValueError(f"No provider answered for role {role}")
@@ -0,0 +1,117 @@
+"""
+This module contains the prompt assembly layer that orders prompt segments for provider-side prefix caching.
+"""
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import SystemMessage
+from langchain_core.outputs import LLMResult
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+
+from api.logging_theme import setup_logger
+from utils.tokens import count_tokens
+
+
+@lru_cache(maxsize=32)
+def render_static_segment(text: str) -> SystemMessage:
+    """
+    Render a static instruction block once; the same message object is reused by every prompt.
+
+    Args:
+        text (str): Static instructions, without template variables.
+
+    Returns:
+        SystemMessage: The rendered message.
+    """
+    return SystemMessage(content=text)
+
+
+@lru_cache(maxsize=32)
+def static_segment_tokens(text: str) -> int:
+    """Token count of a static segment, computed once."""
+    return count_tokens(text)
+
+
+class PromptAssembler:
+    """
+    Assemble chat prompts as: static instructions, chat history, retrieved context, question.
+
+    Providers cache the longest previously seen prompt prefix. Keeping the variable parts (context, question)
+    at the end makes the instructions and the history cacheable, and rendering the static block once avoids
+    re-formatting it on every call.
+    """
+    def __init__(self, static_system_prompt: str, context_prompt: str, history_key: str = "chat_history",
+                 question_key: str = "input"):
+        self.static_system_prompt = static_system_prompt
+        self.context_prompt = context_prompt
+        self.history_key = history_key
+        self.question_key = question_key
+
+    @property
+    def static_tokens(self) -> int:
+        """Token count of the static prefix."""
+        return static_segment_tokens(self.static_system_prompt)
+
+    def chat_prompt(self) -> ChatPromptTemplate:
+        """
+        Build the LangChain prompt template.
+
+        Returns:
+            ChatPromptTemplate: Prompt with "context", history and question variables.
+        """
+        return ChatPromptTemplate.from_messages(
+            [
+                render_static_segment(self.static_system_prompt),
+                MessagesPlaceholder(self.history_key),
+                ("system", self.context_prompt),
+                ("human", f"{{{self.question_key}}}"),
+            ]
+        )
+
+    def openai_messages(self, context: str, question: str, history: Optional[List[dict]] = None) -> List[dict]:
+        """
+        Build OpenAI-style messages in the same order, for callers using a raw client.
+
+        Args:
+            context (str): Retrieved context.
+            question (str): The user's question.
+            history (Optional[List[dict]]): Previous messages of the conversation.
+
+        Returns:
+            List[dict]: Messages for the chat completions API.
+        """
+        return [
+            {"role": "system", "content": self.static_system_prompt},
+            *(history or []),
+            {"role": "system", "content": self.context_prompt.format(context=context)},
+            {"role": "user", "content": question},
+        ]
+
+
+class PromptCacheUsageHandler(BaseCallbackHandler):
+    """
+    Log prompt tokens served from the provider's prefix cache versus uncached tokens for every LLM call.
+
+    Streaming calls only report usage when the chat model is created with stream_usage=True.
+    """
+    def __init__(self, static_tokens: int = 0):
+        self.static_tokens = static_tokens
+        self.logger = setup_logger(__name__)
+        self.calls: List[Dict[str, int]] = []
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, parent_run_id: Optional[UUID] = None,
+                   **kwargs: Any) -> None:
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if not usage:
+                    continue
+                prompt_tokens = usage.get("input_tokens", 0)
+                cached_tokens = (usage.get("input_token_details") or {}).get("cache_read", 0)
+                self.calls.append({"prompt_tokens": prompt_tokens, "cached_tokens": cached_tokens})
+                self.logger.info(
+                    f"Prompt tokens: {prompt_tokens} (cached {cached_tokens}, uncached {prompt_tokens - cached_tokens},"
+                    f" static prefix {self.static_tokens})"
+                )
@@ -1,7 +1,13 @@
 """
 This module contains the prompt templates for the generation tasks.
+
+The QA prompt is laid out for provider-side prefix caching: static instructions first, then the chat history,
+then the retrieved context, then the question. Everything before the context is identical between calls of
+the same conversation, so it can be served from the cache.
 """
-from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
+from langchain_core.prompts import ChatPromptTemplate
+
+from domain.generation.prompt_assembly import PromptAssembler
 
 qa_system_prompt = (
     """Bạn là một Chatbot tư vấn thông tin tuyển sinh Đại học chuyên nghiệp của trường Đại học Ngoại Thương.
@@ -14,20 +20,12 @@ qa_system_prompt = (
 
     # Tư duy theo từng bước.
 
-    # Chỉ sử dụng Bối cảnh sau:
-    \n\n
-    {context}
-
-    ANSWER:
+    # Chỉ sử dụng Bối cảnh được cung cấp ngay trước câu hỏi.
     """
 )
-qa_prompt = ChatPromptTemplate.from_messages(
-    [
-        ("system", qa_system_prompt),
-        MessagesPlaceholder("chat_history"),
-        ("human", "{input}"),
-    ]
-)
+qa_context_prompt = "# Bối cảnh:\n\n{context}"
+qa_prompt_assembler = PromptAssembler(static_system_prompt=qa_system_prompt, context_prompt=qa_context_prompt)
+qa_prompt = qa_prompt_assembler.chat_prompt()
 
 val_faq_prompt_template = """
         Người dùng hỏi: "{question}"
@@ -35,4 +33,4 @@ val_faq_prompt_template = """
 
         Hãy quyết định xem tài liệu tìm được có nội dung giống câu hỏi câu hỏi người dùng không ?.
         """
-val_faq_prompt = ChatPromptTemplate.from_template(val_faq_prompt_template)
\ No newline at end of file
+val_faq_prompt = ChatPromptTemplate.from_template(val_faq_prompt_template)
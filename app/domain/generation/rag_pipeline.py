@@ -1,41 +1,46 @@
 """
 This module contains functions to setup RAG pipeline.
 """
+import os
 
 from langchain.chains.combine_documents import create_stuff_documents_chain
 from langchain.chains.retrieval import create_retrieval_chain
-from langchain.memory import ConversationBufferWindowMemory
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnableWithMessageHistory, ConfigurableFieldSpec
-from langchain_openai import ChatOpenAI
+from langchain_core.runnables import Runnable, RunnableWithMessageHistory, ConfigurableFieldSpec
 
 from api.logging_theme import setup_logger
+from domain.generation.chat_history import CHAT_HISTORY_WINDOW, BackendChatMessageHistory
 from domain.generation.prompt_templates import qa_prompt
+from domain.retrieval.context import ContextRetriever
 from domain.retrieval.search import SearchEngine
-from utils.configs import llm
+from utils.configs import get_llm
+
+PARENT_CHILD_RETRIEVAL = os.getenv("PARENT_CHILD_RETRIEVAL", "true").lower() == "true"
 
 
 class RAGPipeline:
     """
     This class contains functions to set up RAG pipeline.
     """
-    def __init__(self, collection_name: str, llm_instance: ChatOpenAI = llm):
+    def __init__(self, collection_name: str, llm_instance: Runnable | None = None):
         """
         Initialize the RAGPipeline with a collection name.
 
         Args:
             collection_name (str): The name of the collection to use for retrieval.
+            llm_instance (Runnable | None): The language model to use. Defaults to the generation route of the
+                shared LLM router.
         """
         self.collection_name = collection_name
         self.logger = setup_logger(__name__)
-        self.llm = llm_instance
+        self.llm = llm_instance or get_llm("generation")
 
-    def create_qa_chain(self, llm_instance: ChatOpenAI, prompt: ChatPromptTemplate):
+    def create_qa_chain(self, llm_instance: Runnable, prompt: ChatPromptTemplate):
         """
         Create a question-answer chain using the provided language model and prompt.
 
         Args:
-            llm_instance (ChatOpenAI): The language model to use.
+            llm_instance (Runnable): The language model to use.
             prompt (ChatPromptTemplate): The prompt template for the QA chain.
 
         Returns:
@@ -58,37 +63,38 @@ class RAGPipeline:
             RetrievalQAChain: A chain that combines retrieval and question-answering.
         """
         try:
-            return create_retrieval_chain(
-                SearchEngine(collection_name=self.collection_name, k=10).semantic_search(),
-                qa_chain
-            )
+            if PARENT_CHILD_RETRIEVAL:
+                retriever = ContextRetriever(collection_name=self.collection_name, k=10)
+            else:
+                retriever = SearchEngine(collection_name=self.collection_name, k=10).semantic_search()
+            return create_retrieval_chain(retriever, qa_chain)
         except Exception as error:
             self.logger.error("Error creating RAG retrieval chain: %s", error, exc_info=True)
             raise
 
-    def setup_conversation_memory(self, window_size: int = 5):
+    def setup_conversation_memory(self, window_size: int = CHAT_HISTORY_WINDOW):
         """
         Setup conversation memory with specified window size.
 
+        The history lives in the shared state backend, so a session can be served by any worker or node.
+
         Args:
-            window_size (int): The size of the conversation window. Defaults to 5.
+            window_size (int): The number of question/answer turns kept. Defaults to CHAT_HISTORY_WINDOW.
 
         Returns:
-            function: A function that returns the chat memory.
+            function: A function that returns the chat memory of a conversation.
         """
-        memory = ConversationBufferWindowMemory(k=window_size)
-
-        def get_session_history(_):
+        def get_session_history(conversation_id: str) -> BackendChatMessageHistory:
             """
             Get the session history.
 
             Args:
-                _ (Any): Unused parameter required by the API.
+                conversation_id (str): The conversation (session) ID.
 
             Returns:
-                ChatMessageHistory: The chat memory history.
+                BackendChatMessageHistory: The chat memory history.
             """
-            return memory.chat_memory
+            return BackendChatMessageHistory(session_id=conversation_id, window=window_size)
 
         return get_session_history
 
@@ -2,17 +2,15 @@
 Chunking module for chunking text and table data from .docx files.
 """
 
-from io import BytesIO
+import uuid
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Tuple
 
-from docling.datamodel.base_models import DocumentStream, InputFormat
-from docling.document_converter import DocumentConverter, WordFormatOption
-from docling_core.transforms.chunker import HierarchicalChunker
 from fastapi import UploadFile, File
 from langchain_core.documents.base import Document as LangchainDocument
 
 from api.logging_theme import setup_logger
+from domain.ingestion.uploads import MAX_UPLOAD_BYTES, UploadError, sniff_docx, spooled_upload
 
 
 class ChunkProcessor:
@@ -22,8 +20,23 @@ class ChunkProcessor:
 
     def __init__(self):
         self.all_chunks: List[LangchainDocument] = []
+        self.all_parents: List[LangchainDocument] = []
+        self.all_tables: List[Tuple[Any, str]] = []
         self.logger = setup_logger(__name__)
 
+    @staticmethod
+    def parent_id(filename: str, headings: Tuple[str, ...]) -> str:
+        """
+        Stable id of a section, so re-ingesting a file overwrites its parents instead of duplicating them
+        Args:
+            filename (str): source file name
+            headings (Tuple[str, ...]): heading path of the section
+
+        Returns:
+            str: UUID of the parent section
+        """
+        return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{filename}|{' > '.join(headings)}"))
+
     async def chunking(self, file: UploadFile = File(...)) -> List[LangchainDocument]:
         """
         Chunking for text and table asynchronously
@@ -34,7 +47,8 @@ class ChunkProcessor:
             list: list of chunks
 
         Raises:
-            ValueError: If file type is not supported or processing fails
+            UploadError: If the file is too large, empty or not a .docx document
+            ValueError: If processing fails
         """
 
         if not file:
@@ -45,35 +59,66 @@ class ChunkProcessor:
 
         if not file.filename:
             self.logger.error("Empty filename detected")
-            raise ValueError("Empty filename detected")
+            raise UploadError(422, "missing_filename", "Empty filename detected")
 
         file_extension = Path(file.filename).suffix.lower()
         if file_extension != '.docx':
             self.logger.error(f"Unsupported file type: {file_extension}. Only .docx files are supported")
-            raise ValueError(f"Unsupported file type: {file_extension}. Only .docx files are supported")
-
-        # Create task async for file
-
-        buf = BytesIO(await file.read())
-        source = DocumentStream(name=file.filename, stream=buf)
-        pipline_options = WordFormatOption()
-        coverter = DocumentConverter(
-            format_options={
-                InputFormat.DOCX: WordFormatOption(pipline_options=pipline_options)
-            }
-        )
-        doc = coverter.convert(source=source).document
+            raise UploadError(415, "unsupported_type",
+                              f"Unsupported file type: {file_extension}. Only .docx files are supported")
+
+        # docling reads the spooled copy from disk instead of an in-memory buffer of the whole upload
+        async with spooled_upload(file, MAX_UPLOAD_BYTES, suffix=".docx") as path:
+            sniff_docx(path, file.filename)
+
+            # docling is only needed on the ingestion path, import it (and apply the table patch) lazily
+            from docling.datamodel.base_models import InputFormat
+            from docling.document_converter import DocumentConverter, WordFormatOption
+            from docling_core.transforms.chunker import HierarchicalChunker
+
+            import external_services.patches.custom_docling  # noqa: F401
+
+            pipline_options = WordFormatOption()
+            coverter = DocumentConverter(
+                format_options={
+                    InputFormat.DOCX: WordFormatOption(pipline_options=pipline_options)
+                }
+            )
+            doc = coverter.convert(source=path).document
+        # Tables (with merged headers) are also kept as rows for exact lookup
+        tables = [(table.export_to_dataframe(), table.caption_text(doc)) for table in doc.tables]
         chunker = HierarchicalChunker()
-        chunk_iter = chunker.chunk(doc)
-        chunks = [
-            LangchainDocument(
+        chunks = []
+        # Children are the small chunks that get embedded, parents are the sections of the heading tree
+        sections: Dict[Tuple[str, ...], List[str]] = {}
+        for chunk in chunker.chunk(doc):
+            headings = tuple(chunk.meta.headings or ())
+            chunks.append(LangchainDocument(
                 page_content=chunker.serialize(chunk=chunk),
-                metadata={"file_path": file.filename}
+                metadata={
+                    "file_path": file.filename,
+                    "headings": list(headings),
+                    "parent_id": self.parent_id(file.filename, headings),
+                }
+            ))
+            sections.setdefault(headings, []).append(chunk.text)
+
+        parents = [
+            LangchainDocument(
+                page_content="\n".join([*headings, *texts]),
+                metadata={
+                    "file_path": file.filename,
+                    "headings": list(headings),
+                    "parent_id": self.parent_id(file.filename, headings),
+                }
             )
-            for chunk in chunk_iter
+            for headings, texts in sections.items()
         ]
 
         # Store all chunks
         self.all_chunks.extend(chunks)
-        self.logger.info(f"Chunking completed successfully. Total chunks: {len(self.all_chunks)}")
+        self.all_parents.extend(parents)
+        self.all_tables.extend(tables)
+        self.logger.info(f"Chunking completed successfully. Total chunks: {len(self.all_chunks)}, "
+                         f"parent sections: {len(self.all_parents)}")
         return self.all_chunks
@@ -0,0 +1,319 @@
+"""
+This module contains functions to detect and merge near-duplicate chunks before indexing.
+
+Candidates are found with MinHash + LSH banding over character shingles, then confirmed with
+dense vector similarity. Chunks that differ in their numbers (years, scores, fees, quotas) are never
+duplicates, however similar they are. Duplicates are collapsed into one chunk that records every
+source file and the parent section of each source.
+"""
+import asyncio
+import hashlib
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+from langchain_core.documents.base import Document as LangchainDocument
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient, models
+
+from api.logging_theme import setup_logger
+from utils.configs import get_embeddings, get_qdrant_client
+from utils.text import normalize_text
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+LSH_BANDS_KEY = "lsh_bands"
+_NUMBER = re.compile(r"\d+")
+
+
+@dataclass
+class DeduplicationReport:
+    """
+    Summary of a deduplication run.
+    """
+    input_chunks: int
+    output_chunks: int
+    merged_into_existing: int = 0
+
+    @property
+    def reduction_ratio(self) -> float:
+        """Share of input chunks that were not indexed as new points."""
+        if not self.input_chunks:
+            return 0.0
+        return 1 - self.output_chunks / self.input_chunks
+
+
+class MinHasher:
+    """
+    MinHash signatures over character shingles, with LSH band keys for candidate lookup.
+    """
+    def __init__(self, num_perm: int = 64, bands: int = 16, shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        generator = np.random.RandomState(seed)
+        self.a = generator.randint(1, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self.b = generator.randint(0, (1 << 61) - 1, size=num_perm, dtype=np.uint64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+
+    def signature(self, text: str) -> np.ndarray:
+        """
+        Compute the MinHash signature of a text.
+
+        Args:
+            text (str): Text to hash.
+
+        Returns:
+            np.ndarray: Signature of num_perm unsigned integers.
+        """
+        normalized = re.sub(r"\s+", " ", text.lower()).strip()
+        size = self.shingle_size
+        shingles = {normalized[i:i + size] for i in range(max(1, len(normalized) - size + 1))}
+        hashes = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        permuted = np.bitwise_and((hashes[:, None] * self.a + self.b) % _MERSENNE_PRIME, _MAX_HASH)
+        return permuted.min(axis=0)
+
+    def band_keys(self, signature: np.ndarray) -> List[str]:
+        """
+        Split a signature into LSH band keys. Two texts sharing a key are duplicate candidates.
+
+        Args:
+            signature (np.ndarray): MinHash signature.
+
+        Returns:
+            List[str]: One key per band.
+        """
+        return [
+            f"{band}:{hashlib.blake2b(signature[band * self.rows:(band + 1) * self.rows].tobytes(), digest_size=8).hexdigest()}"
+            for band in range(self.bands)
+        ]
+
+    @staticmethod
+    def jaccard(first: np.ndarray, second: np.ndarray) -> float:
+        """Estimate the Jaccard similarity of two texts from their signatures."""
+        return float(np.mean(first == second))
+
+
+def _cosine(first: List[float], second: List[float]) -> float:
+    first, second = np.asarray(first), np.asarray(second)
+    return float(first @ second / (np.linalg.norm(first) * np.linalg.norm(second) or 1.0))
+
+
+def _dense_vector(point) -> List[float]:
+    """Qdrant returns the unnamed ("") dense vector either as a list or inside the named-vector dict."""
+    if isinstance(point.vector, dict):
+        return point.vector[QdrantVectorStore.VECTOR_NAME]
+    return point.vector
+
+
+def _numbers(normalized: str) -> List[str]:
+    return _NUMBER.findall(normalized)
+
+
+def _source_parents(metadata: dict) -> Dict[str, str]:
+    """Parent section id of each source of a chunk; single-source chunks only carry their own parent_id."""
+    parents = dict(metadata.get("source_parents") or {})
+    if metadata.get("file_path") and metadata.get("parent_id"):
+        parents.setdefault(metadata["file_path"], metadata["parent_id"])
+    return parents
+
+
+def _merge_sources(metadata: dict, others: List[dict]) -> dict:
+    merged = dict(metadata)
+    sources = set(metadata.get("sources", [metadata.get("file_path")]))
+    source_parents = _source_parents(metadata)
+    for other in others:
+        sources |= set(other.get("sources", [other.get("file_path")]))
+        for source, parent_id in _source_parents(other).items():
+            source_parents.setdefault(source, parent_id)
+    merged["sources"] = sorted(sources - {None})
+    merged["duplicate_count"] = len(merged["sources"])
+    merged["source_parents"] = source_parents
+    return merged
+
+
+class ChunkDeduplicator:
+    """
+    Collapse near-duplicate chunks within a batch and against the points already in a collection.
+    """
+    def __init__(self, collection_name: str, jaccard_threshold: float = 0.8, similarity_threshold: float = 0.95,
+                 client: Optional[QdrantClient] = None):
+        self.collection_name = collection_name
+        self.jaccard_threshold = jaccard_threshold
+        self.similarity_threshold = similarity_threshold
+        self.client = client or get_qdrant_client()
+        self.hasher = MinHasher()
+        self.logger = setup_logger(__name__)
+
+    def _needs_vectors(self, first: str, second: str) -> bool:
+        """
+        Whether two normalized texts are duplicates only if their vectors agree: equal texts are duplicates
+        outright, texts with different numbers never are.
+        """
+        return first != second and _numbers(first) == _numbers(second)
+
+    async def _embed(self, chunks: List[LangchainDocument], indexes: Set[int]) -> Dict[int, List[float]]:
+        """Embed only the chunks that need a vector similarity check."""
+        ordered = sorted(indexes)
+        if not ordered:
+            return {}
+        vectors = await get_embeddings().aembed_documents([chunks[i].page_content for i in ordered])
+        return dict(zip(ordered, vectors))
+
+    async def _deduplicate_batch(self, chunks: List[LangchainDocument]) -> List[LangchainDocument]:
+        normalized = [normalize_text(chunk.page_content) for chunk in chunks]
+        signatures = [self.hasher.signature(chunk.page_content) for chunk in chunks]
+        band_keys = [self.hasher.band_keys(signature) for signature in signatures]
+
+        buckets: Dict[str, List[int]] = {}
+        for index, keys in enumerate(band_keys):
+            for key in keys:
+                buckets.setdefault(key, []).append(index)
+
+        candidate_pairs = {
+            (members[0], other)
+            for members in buckets.values() if len(members) > 1
+            for other in members[1:]
+            if self.hasher.jaccard(signatures[members[0]], signatures[other]) >= self.jaccard_threshold
+        }
+        vector_pairs = {pair for pair in candidate_pairs if self._needs_vectors(*(normalized[i] for i in pair))}
+        vectors = await self._embed(chunks, {index for pair in vector_pairs for index in pair})
+
+        parent = list(range(len(chunks)))
+
+        def find(index: int) -> int:
+            while parent[index] != index:
+                parent[index] = parent[parent[index]]
+                index = parent[index]
+            return index
+
+        for first, second in candidate_pairs:
+            duplicate = normalized[first] == normalized[second] or (
+                (first, second) in vector_pairs
+                and _cosine(vectors[first], vectors[second]) >= self.similarity_threshold
+            )
+            if duplicate:
+                parent[max(find(first), find(second))] = min(find(first), find(second))
+
+        groups: Dict[int, List[int]] = {}
+        for index in range(len(chunks)):
+            groups.setdefault(find(index), []).append(index)
+
+        unique_chunks = []
+        for representative, members in groups.items():
+            metadata = _merge_sources(chunks[representative].metadata, [chunks[member].metadata for member in members])
+            metadata[LSH_BANDS_KEY] = band_keys[representative]
+            unique_chunks.append(LangchainDocument(page_content=chunks[representative].page_content, metadata=metadata))
+        return unique_chunks
+
+    def _find_candidates(self, chunks: List[LangchainDocument], per_chunk: int = 5,
+                         group_size: int = 64) -> Dict[int, list]:
+        """
+        Stored points sharing an LSH band with each chunk, looked up with one MatchAny filter per group of chunks
+        """
+        band_field = f"{QdrantVectorStore.METADATA_KEY}.{LSH_BANDS_KEY}"
+        candidates: Dict[int, list] = {}
+        for start in range(0, len(chunks), group_size):
+            group = range(start, min(start + group_size, len(chunks)))
+            chunks_by_band: Dict[str, List[int]] = {}
+            for index in group:
+                for key in chunks[index].metadata[LSH_BANDS_KEY]:
+                    chunks_by_band.setdefault(key, []).append(index)
+            offset = None
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=models.Filter(must=[
+                        models.FieldCondition(key=band_field, match=models.MatchAny(any=list(chunks_by_band)))
+                    ]),
+                    limit=256,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=[QdrantVectorStore.VECTOR_NAME],
+                )
+                for point in points:
+                    stored_bands = (point.payload.get(QdrantVectorStore.METADATA_KEY) or {}).get(LSH_BANDS_KEY, [])
+                    for index in {index for key in stored_bands for index in chunks_by_band.get(key, [])}:
+                        if len(candidates.setdefault(index, [])) < per_chunk:
+                            candidates[index].append(point)
+                if offset is None:
+                    break
+        return candidates
+
+    async def _merge_into_existing(self, chunks: List[LangchainDocument]) -> List[LangchainDocument]:
+        """
+        Drop chunks that already exist in the collection, adding their sources to the stored point.
+
+        Points of the chunk's own file are never merged into: a re-uploaded file replaces its previous version.
+        """
+        if not await asyncio.to_thread(self.client.collection_exists, self.collection_name):
+            return chunks
+
+        found = await asyncio.to_thread(self._find_candidates, chunks)
+        candidates: Dict[int, list] = {}
+        for index, points in found.items():
+            sources = set(chunks[index].metadata["sources"])
+            text = normalize_text(chunks[index].page_content)
+            for point in points:
+                stored_metadata = point.payload.get(QdrantVectorStore.METADATA_KEY) or {}
+                stored_sources = set(stored_metadata.get("sources", [stored_metadata.get("file_path")]))
+                stored_text = normalize_text(point.payload.get(QdrantVectorStore.CONTENT_KEY, ""))
+                if sources & stored_sources or _numbers(text) != _numbers(stored_text):
+                    continue
+                candidates.setdefault(index, []).append((point, text == stored_text))
+
+        vectors = await self._embed(chunks, {
+            index for index, points in candidates.items() if not any(equal for _, equal in points)
+        })
+        new_chunks, merges = [], []
+        for index, chunk in enumerate(chunks):
+            duplicate = next(
+                (point for point, equal in candidates.get(index, [])
+                 if equal or (index in vectors
+                              and _cosine(vectors[index], _dense_vector(point)) >= self.similarity_threshold)),
+                None,
+            )
+            if duplicate is None:
+                new_chunks.append(chunk)
+                continue
+            stored_metadata = duplicate.payload.get(QdrantVectorStore.METADATA_KEY, {})
+            merges.append((duplicate.id, _merge_sources(stored_metadata, [chunk.metadata])))
+
+        def apply_merges():
+            for point_id, metadata in merges:
+                self.client.set_payload(collection_name=self.collection_name,
+                                        payload={QdrantVectorStore.METADATA_KEY: metadata}, points=[point_id])
+
+        await asyncio.to_thread(apply_merges)
+        return new_chunks
+
+    async def deduplicate(self, chunks: List[LangchainDocument]) -> tuple[List[LangchainDocument], DeduplicationReport]:
+        """
+        Remove near-duplicate chunks.
+
+        Args:
+            chunks (List[LangchainDocument]): Chunks about to be indexed.
+
+        Returns:
+            tuple[List[LangchainDocument], DeduplicationReport]: Chunks that still need indexing and a report.
+        """
+        try:
+            unique_chunks = await self._deduplicate_batch(chunks)
+            new_chunks = await self._merge_into_existing(unique_chunks)
+        except Exception as e:
+            self.logger.error(f"Error deduplicating chunks for collection {self.collection_name}: {e}")
+            raise ValueError(f"Error deduplicating chunks for collection {self.collection_name}: {e}")
+
+        report = DeduplicationReport(
+            input_chunks=len(chunks),
+            output_chunks=len(new_chunks),
+            merged_into_existing=len(unique_chunks) - len(new_chunks),
+        )
+        self.logger.info(
+            f"Deduplication: {report.input_chunks} -> {report.output_chunks} chunks "
+            f"({report.merged_into_existing} merged into existing points, reduction {report.reduction_ratio:.1%})"
+        )
+        return new_chunks, report
@@ -2,14 +2,17 @@
 """
 This module contains functions for parsing files.
 """
-import io
+import os
 from typing import List
 
-import pandas as pd
 from fastapi import UploadFile, File
 from langchain_core.documents.base import Document as LangchainDocument
 
 from api.logging_theme import setup_logger
+from domain.ingestion.uploads import MAX_FAQ_UPLOAD_BYTES, UploadError, check_upload_size, sniff_csv
+
+# Rows parsed at a time, so a large sheet is never held as one DataFrame
+FAQ_CSV_CHUNK_ROWS = int(os.getenv("FAQ_CSV_CHUNK_ROWS", "1000"))
 
 
 class DocxParser:
@@ -33,17 +36,30 @@ class DocxParser:
 
         Returns:
             List[LangchainDocument]: A list of LangchainDocument objects with page content set to the question
-                                     and metadata containing the answer.
+                                     and metadata containing the answer. Rows without a question are skipped.
+
+        Raises:
+            UploadError: If the file is too large, not a UTF-8 CSV or lacks the question and answer columns.
         """
+        import pandas as pd
+
+        # The upload is already spooled to disk by Starlette: parse it in place, FAQ_CSV_CHUNK_ROWS rows at a time
+        check_upload_size(upload_file, MAX_FAQ_UPLOAD_BYTES)
+        sniff_csv(upload_file.file, upload_file.filename)
         try:
-            content = await upload_file.read()
-            faq = pd.read_csv(io.BytesIO(content), header=header)
-            self.logger.debug(faq)
-            for item in faq.to_dict(orient="records"):
-                self.results.append(LangchainDocument(page_content=item[question_column_name],
-                                                      metadata={"answer": item[answer_column_name]}))
-            self.logger.info(f"Successfully parsed {len(self.results)} FAQ data")
-            return self.results
+            for faq in pd.read_csv(upload_file.file, header=header, encoding="utf-8-sig", chunksize=FAQ_CSV_CHUNK_ROWS):
+                missing = {question_column_name, answer_column_name} - set(faq.columns)
+                if missing:
+                    raise UploadError(422, "missing_columns",
+                                      f"Missing FAQ columns {sorted(missing)}, found {list(faq.columns)}")
+                faq = faq[faq[question_column_name].notna()]
+                for question, answer in zip(faq[question_column_name], faq[answer_column_name]):
+                    self.results.append(LangchainDocument(page_content=str(question), metadata={"answer": answer}))
+        except UploadError as e:
+            self.logger.error(f"Error parsing FAQ data: {str(e)}")
+            raise
         except Exception as e:
             self.logger.error(f"Error parsing FAQ data: {str(e)}")
-            raise ValueError(f"Error parsing FAQ data: {str(e)}")
+            raise UploadError(422, "invalid_csv", f"Error parsing FAQ data: {str(e)}")
+        self.logger.info(f"Successfully parsed {len(self.results)} FAQ data")
+        return self.results
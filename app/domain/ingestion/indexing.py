@@ -5,9 +5,19 @@ from typing import List
 
 from langchain_core.documents import Document as LangchainDocument
 from langchain_qdrant import QdrantVectorStore, RetrievalMode
+from qdrant_client import models
 
 from api.logging_theme import setup_logger
-from utils.configs import embeddings, spare_embeddings
+from domain.ingestion.deduplication import LSH_BANDS_KEY
+from utils.configs import (QDRANT_URL, SPARSE_EMBEDDING_BACKEND, get_embeddings, get_qdrant_client,
+                           get_sparse_embeddings, get_sparse_index_stats)
+
+# Sparse vectors hold BM25 term weights; Qdrant multiplies them by the collection-wide IDF at query time
+SPARSE_VECTOR_PARAMS = {"modifier": models.Modifier.IDF}
+# Only the Vietnamese BM25 encoder reads the per-collection statistics; `manage.py reindex-sparse` backfills them
+# when a collection switches to it
+KEEP_SPARSE_STATS = SPARSE_EMBEDDING_BACKEND == "vietnamese_bm25"
+
 
 class IngestionPipeline:
     """
@@ -17,6 +27,34 @@ class IngestionPipeline:
         self.collection_name = collection_name
         self.logger = setup_logger(__name__)
 
+    def ensure_idf_modifier(self):
+        """
+        Enable the IDF modifier on the sparse vectors of a collection created before it was used.
+        """
+        client = get_qdrant_client()
+        if not client.collection_exists(self.collection_name):
+            return
+        sparse_vectors = client.get_collection(self.collection_name).config.params.sparse_vectors or {}
+        params = sparse_vectors.get(QdrantVectorStore.SPARSE_VECTOR_NAME)
+        if params is not None and params.modifier != models.Modifier.IDF:
+            client.update_collection(
+                collection_name=self.collection_name,
+                sparse_vectors_config={
+                    QdrantVectorStore.SPARSE_VECTOR_NAME: models.SparseVectorParams(**SPARSE_VECTOR_PARAMS)
+                },
+            )
+            self.logger.info(f"Enabled the IDF modifier on the sparse vectors of {self.collection_name}")
+
+    def ensure_payload_indexes(self):
+        """
+        Create the keyword index on the LSH band keys used by deduplication, once, after the collection exists.
+        """
+        client = get_qdrant_client()
+        band_field = f"{QdrantVectorStore.METADATA_KEY}.{LSH_BANDS_KEY}"
+        if band_field not in (client.get_collection(self.collection_name).payload_schema or {}):
+            client.create_payload_index(self.collection_name, field_name=band_field,
+                                        field_schema=models.PayloadSchemaType.KEYWORD)
+
     async def ingest_data(self, chunks: List[LangchainDocument]):
         """
         Ingest data into collection.
@@ -26,19 +64,85 @@ class IngestionPipeline:
         Returns:
             bool: True if collection was successfully ingested else False
         """
+        stats = get_sparse_index_stats()
+        texts = [chunk.page_content for chunk in chunks]
         try:
+            self.ensure_idf_modifier()
+            # Count the new chunks first so that they are encoded with the updated average length
+            if KEEP_SPARSE_STATS:
+                stats.add_documents(self.collection_name, texts)
             # Init Vector store
             await QdrantVectorStore.afrom_documents(
                 documents=chunks,
-                embedding=embeddings,
-                sparse_embedding=spare_embeddings,
-                url="http://qdrant:6333/",
+                embedding=get_embeddings(),
+                sparse_embedding=get_sparse_embeddings(self.collection_name),
+                url=QDRANT_URL,
                 prefer_grpc=True,
                 collection_name=self.collection_name,
-                retrieval_mode=RetrievalMode.HYBRID
+                retrieval_mode=RetrievalMode.HYBRID,
+                sparse_vector_params=SPARSE_VECTOR_PARAMS,
             )
+            self.ensure_payload_indexes()
             self.logger.info(f"Successfully ingest into Qdrant collection: {self.collection_name}")
             return True
         except Exception as e:
+            if KEEP_SPARSE_STATS:
+                stats.remove_documents(self.collection_name, texts)
             self.logger.error(f"Error ingesting data into Qdrant collection: {str(e)}")
-            raise ValueError(f"Error ingesting data into Qdrant collection: {str(e)}")
\ No newline at end of file
+            raise ValueError(f"Error ingesting data into Qdrant collection: {str(e)}")
+
+    def remove_file(self, file_path: str) -> int:
+        """
+        Remove the chunks of a source file from the collection and from its sparse statistics.
+
+        Chunks merged from several sources by deduplication only lose this source and stay indexed, pointing at
+        the parent section of their next source.
+
+        Args:
+            file_path (str): Source file name, as stored in the chunk metadata.
+
+        Returns:
+            int: Number of deleted chunks.
+        """
+        client = get_qdrant_client()
+        metadata_key = QdrantVectorStore.METADATA_KEY
+        try:
+            if not client.collection_exists(self.collection_name):
+                return 0
+            source_filter = models.Filter(should=[
+                models.FieldCondition(key=f"{metadata_key}.file_path", match=models.MatchValue(value=file_path)),
+                models.FieldCondition(key=f"{metadata_key}.sources", match=models.MatchValue(value=file_path)),
+            ])
+            deleted_ids, deleted_texts = [], []
+            offset = None
+            while True:
+                points, offset = client.scroll(self.collection_name, scroll_filter=source_filter, limit=256,
+                                               offset=offset, with_payload=True, with_vectors=False)
+                for point in points:
+                    metadata = point.payload.get(metadata_key) or {}
+                    remaining = [source for source in metadata.get("sources", []) if source != file_path]
+                    if remaining:
+                        source_parents = {source: parent_id
+                                          for source, parent_id in (metadata.get("source_parents") or {}).items()
+                                          if source != file_path}
+                        metadata = {**metadata, "sources": remaining, "duplicate_count": len(remaining),
+                                    "file_path": remaining[0], "source_parents": source_parents}
+                        # The chunk now expands to the parent section of its new primary source
+                        metadata.pop("parent_id", None)
+                        if remaining[0] in source_parents:
+                            metadata["parent_id"] = source_parents[remaining[0]]
+                        client.set_payload(self.collection_name, payload={metadata_key: metadata}, points=[point.id])
+                    else:
+                        deleted_ids.append(point.id)
+                        deleted_texts.append(point.payload.get(QdrantVectorStore.CONTENT_KEY, ""))
+                if offset is None:
+                    break
+            if deleted_ids:
+                client.delete(self.collection_name, points_selector=models.PointIdsList(points=deleted_ids))
+            if deleted_ids and KEEP_SPARSE_STATS:
+                get_sparse_index_stats().remove_documents(self.collection_name, deleted_texts)
+            self.logger.info(f"Removed {len(deleted_ids)} chunks of {file_path} from {self.collection_name}")
+            return len(deleted_ids)
+        except Exception as e:
+            self.logger.error(f"Error removing {file_path} from Qdrant collection {self.collection_name}: {e}")
+            raise ValueError(f"Error removing {file_path} from Qdrant collection {self.collection_name}: {e}")
@@ -0,0 +1,158 @@
+"""
+This module contains functions to re-embed an existing Qdrant collection with another dense or sparse embedding backend.
+"""
+from typing import Optional
+
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient, models
+
+from api.logging_theme import setup_logger
+from domain.ingestion.indexing import IngestionPipeline
+from utils.configs import get_embeddings, get_qdrant_client, get_sparse_embeddings, get_sparse_index_stats
+
+
+class EmbeddingMigrator:
+    """
+    Copy a collection into a new one, re-computing the dense vectors with another backend.
+
+    Payloads and sparse vectors are copied unchanged, so the BM25 side of hybrid search is preserved.
+    """
+    def __init__(self, source_collection: str, target_collection: str, backend: str,
+                 client: Optional[QdrantClient] = None, batch_size: int = 256):
+        self.source_collection = source_collection
+        self.target_collection = target_collection
+        self.backend = backend
+        self.client = client or get_qdrant_client()
+        self.batch_size = batch_size
+        self.logger = setup_logger(__name__)
+
+    def _create_target(self, dimension: int):
+        """
+        Create the target collection with the new dense size and the source sparse configuration.
+
+        Args:
+            dimension (int): Size of the new dense vectors.
+        """
+        if self.client.collection_exists(self.target_collection):
+            raise ValueError(f"Target collection {self.target_collection} already exists")
+
+        source_params = self.client.get_collection(self.source_collection).config.params
+        self.client.create_collection(
+            collection_name=self.target_collection,
+            vectors_config={
+                QdrantVectorStore.VECTOR_NAME: models.VectorParams(size=dimension, distance=models.Distance.COSINE)
+            },
+            sparse_vectors_config=source_params.sparse_vectors,
+        )
+
+    def migrate(self) -> int:
+        """
+        Re-embed every point of the source collection into the target collection.
+
+        Returns:
+            int: Number of migrated points.
+        """
+        embeddings = get_embeddings(self.backend)
+        try:
+            self._create_target(dimension=len(embeddings.embed_query("dimension probe")))
+        except Exception as e:
+            self.logger.error(f"Error creating collection {self.target_collection}: {e}")
+            raise ValueError(f"Error creating collection {self.target_collection}: {e}")
+
+        migrated = 0
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=self.source_collection,
+                limit=self.batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=[QdrantVectorStore.SPARSE_VECTOR_NAME],
+            )
+            if not points:
+                break
+
+            texts = [point.payload.get(QdrantVectorStore.CONTENT_KEY, "") for point in points]
+            dense_vectors = embeddings.embed_documents(texts)
+            self.client.upsert(
+                collection_name=self.target_collection,
+                points=[
+                    models.PointStruct(
+                        id=point.id,
+                        payload=point.payload,
+                        vector={
+                            **(point.vector or {}),
+                            QdrantVectorStore.VECTOR_NAME: dense_vector,
+                        },
+                    )
+                    for point, dense_vector in zip(points, dense_vectors)
+                ],
+            )
+            migrated += len(points)
+            self.logger.info(f"Migrated {migrated} points into {self.target_collection}")
+            if offset is None:
+                break
+
+        get_sparse_index_stats().copy_collection(self.source_collection, self.target_collection)
+        self.logger.info(
+            f"Successfully re-embedded {self.source_collection} into {self.target_collection} "
+            f"with backend {self.backend} ({migrated} points)"
+        )
+        return migrated
+
+
+class SparseReindexer:
+    """
+    Rebuild the sparse statistics of a collection from its payloads and re-encode its sparse vectors in place,
+    e.g. after switching SPARSE_EMBEDDING_BACKEND or for collections ingested before statistics were kept.
+    """
+    def __init__(self, collection_name: str, client: Optional[QdrantClient] = None, batch_size: int = 256):
+        self.collection_name = collection_name
+        self.client = client or get_qdrant_client()
+        self.batch_size = batch_size
+        self.logger = setup_logger(__name__)
+
+    def _scroll_texts(self):
+        offset = None
+        while True:
+            points, offset = self.client.scroll(collection_name=self.collection_name, limit=self.batch_size,
+                                                offset=offset, with_payload=True, with_vectors=False)
+            if points:
+                yield [point.id for point in points], [point.payload.get(QdrantVectorStore.CONTENT_KEY, "")
+                                                        for point in points]
+            if offset is None:
+                break
+
+    def reindex(self) -> int:
+        """
+        Recount the collection, then overwrite every sparse vector.
+
+        Returns:
+            int: Number of re-encoded points.
+        """
+        stats = get_sparse_index_stats()
+        try:
+            IngestionPipeline(self.collection_name).ensure_idf_modifier()
+            stats.drop_collection(self.collection_name)
+            for _, texts in self._scroll_texts():
+                stats.add_documents(self.collection_name, texts)
+
+            sparse_embeddings = get_sparse_embeddings(self.collection_name)
+            reindexed = 0
+            for ids, texts in self._scroll_texts():
+                self.client.update_vectors(
+                    collection_name=self.collection_name,
+                    points=[
+                        models.PointVectors(id=point_id, vector={
+                            QdrantVectorStore.SPARSE_VECTOR_NAME: models.SparseVector(
+                                indices=sparse_vector.indices, values=sparse_vector.values),
+                        })
+                        for point_id, sparse_vector in zip(ids, sparse_embeddings.embed_documents(texts))
+                    ],
+                )
+                reindexed += len(ids)
+                self.logger.info(f"Re-encoded {reindexed} sparse vectors of {self.collection_name}")
+        except Exception as e:
+            self.logger.error(f"Error re-encoding the sparse vectors of {self.collection_name}: {e}")
+            raise ValueError(f"Error re-encoding the sparse vectors of {self.collection_name}: {e}")
+        return reindexed
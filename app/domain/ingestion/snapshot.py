@@ -0,0 +1,305 @@
+"""
+This module contains functions to export a Qdrant collection into a local archive and to restore it, so that a new
+environment can be bootstrapped without re-running docling, the embedding models and the BM25 encoder.
+
+An archive is a directory of uncompressed NumPy arrays, loaded with ``mmap_mode="r"`` on import:
+
+- ``manifest.json``: collection configuration, embedding backends and the source files it was ingested from
+- ``dense.npy``: float32 dense vectors, one row per point
+- ``sparse_indptr.npy`` / ``sparse_indices.npy`` / ``sparse_values.npy``: sparse vectors in CSR layout
+- ``payloads.jsonl``: point id and payload, one line per point, in the same order as the vectors
+- ``parents.jsonl``: parent sections of the collection, if any
+- ``tables.jsonl``: rows of the tables extracted from its documents
+
+The sparse length statistics (chunk count and total length) are kept in the manifest.
+"""
+import json
+import os
+import shutil
+import time
+from array import array
+from collections import Counter
+from typing import Iterator, Optional
+
+import numpy as np
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient, models
+
+from api.logging_theme import setup_logger
+from utils.configs import (DENSE_EMBEDDING_BACKEND, FASTEMBED_DENSE_MODEL, SPARSE_EMBEDDING_BACKEND,
+                           SPARSE_MODEL_NAME, get_qdrant_client, get_sparse_index_stats, get_table_store)
+
+SNAPSHOT_DIR = os.getenv("SNAPSHOT_DIR", "data/snapshots")
+SNAPSHOT_FORMAT_VERSION = 1
+
+
+def read_manifest(path: str) -> dict:
+    """
+    Read the manifest of an archive
+    Args:
+        path (str): archive directory
+    Returns:
+        dict: manifest
+    """
+    with open(os.path.join(path, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _embedding_config() -> dict:
+    return {
+        "dense_backend": DENSE_EMBEDDING_BACKEND,
+        "dense_model": FASTEMBED_DENSE_MODEL if DENSE_EMBEDDING_BACKEND == "fastembed"
+        else os.getenv("OPENAI_EMBEDDING_MODEL"),
+        "sparse_backend": SPARSE_EMBEDDING_BACKEND,
+        "sparse_model": SPARSE_MODEL_NAME if SPARSE_EMBEDDING_BACKEND == "fastembed" else SPARSE_EMBEDDING_BACKEND,
+    }
+
+
+class CollectionSnapshot:
+    """
+    Export a collection (with its parent sections, tables and sparse statistics) to an archive, or restore one.
+    """
+    def __init__(self, collection_name: str, client: Optional[QdrantClient] = None, batch_size: int = 512):
+        self.collection_name = collection_name
+        self.parents_collection_name = f"{collection_name}_parents"
+        self.client = client or get_qdrant_client()
+        self.batch_size = batch_size
+        self.logger = setup_logger(__name__)
+
+    def _scroll(self, collection_name: str, with_vectors) -> Iterator[list]:
+        offset = None
+        while True:
+            points, offset = self.client.scroll(collection_name=collection_name, limit=self.batch_size,
+                                                offset=offset, with_payload=True, with_vectors=with_vectors)
+            if points:
+                yield points
+            if offset is None:
+                break
+
+    def _collection_config(self) -> dict:
+        info = self.client.get_collection(self.collection_name)
+        vectors = info.config.params.vectors
+        dense = vectors[QdrantVectorStore.VECTOR_NAME] if isinstance(vectors, dict) else vectors
+        sparse = (info.config.params.sparse_vectors or {}).get(QdrantVectorStore.SPARSE_VECTOR_NAME)
+        return {
+            "dense_size": dense.size,
+            "distance": dense.distance.value,
+            "sparse": sparse is not None,
+            "sparse_modifier": sparse.modifier.value if sparse is not None and sparse.modifier else None,
+            "payload_indexes": {
+                field: schema.data_type.value for field, schema in (info.payload_schema or {}).items()
+            },
+        }
+
+    def export(self, path: str) -> dict:
+        """
+        Write the collection to an archive directory, replacing any previous archive at that path.
+
+        Args:
+            path (str): Archive directory.
+
+        Returns:
+            dict: The archive manifest.
+        """
+        start = time.perf_counter()
+        partial_path = f"{path}.partial"
+        shutil.rmtree(partial_path, ignore_errors=True)
+        os.makedirs(partial_path)
+        try:
+            config = self._collection_config()
+            capacity = self.client.count(self.collection_name, exact=True).count
+            dense = np.lib.format.open_memmap(os.path.join(partial_path, "dense.npy"), mode="w+",
+                                              dtype=np.float32, shape=(capacity, config["dense_size"]))
+            indptr, sparse_indices, sparse_values = array("q", [0]), array("I"), array("f")
+            files = Counter()
+            written = 0
+            with open(os.path.join(partial_path, "payloads.jsonl"), "w", encoding="utf-8") as payloads:
+                for points in self._scroll(self.collection_name, with_vectors=True):
+                    if written + len(points) > capacity:
+                        raise ValueError("collection grew during the export")
+                    for point in points:
+                        vectors = point.vector if isinstance(point.vector, dict) else \
+                            {QdrantVectorStore.VECTOR_NAME: point.vector}
+                        dense[written] = vectors[QdrantVectorStore.VECTOR_NAME]
+                        sparse = vectors.get(QdrantVectorStore.SPARSE_VECTOR_NAME)
+                        if sparse is not None:
+                            sparse_indices.extend(sparse.indices)
+                            sparse_values.extend(sparse.values)
+                        indptr.append(len(sparse_indices))
+                        payloads.write(json.dumps({"id": point.id, "payload": point.payload}, ensure_ascii=False))
+                        payloads.write("\n")
+                        metadata = (point.payload or {}).get(QdrantVectorStore.METADATA_KEY) or {}
+                        files.update(metadata.get("sources") or [metadata.get("file_path")])
+                        written += 1
+            dense.flush()
+            del dense
+
+            np.save(os.path.join(partial_path, "sparse_indptr.npy"), np.frombuffer(indptr, dtype=np.int64))
+            np.save(os.path.join(partial_path, "sparse_indices.npy"), np.frombuffer(sparse_indices, dtype=np.uint32))
+            np.save(os.path.join(partial_path, "sparse_values.npy"), np.frombuffer(sparse_values, dtype=np.float32))
+
+            parents = 0
+            if self.client.collection_exists(self.parents_collection_name):
+                with open(os.path.join(partial_path, "parents.jsonl"), "w", encoding="utf-8") as f:
+                    for points in self._scroll(self.parents_collection_name, with_vectors=False):
+                        for point in points:
+                            f.write(json.dumps({"id": point.id, "payload": point.payload}, ensure_ascii=False))
+                            f.write("\n")
+                        parents += len(points)
+
+            tables = get_table_store().export_collection(self.collection_name)
+            with open(os.path.join(partial_path, "tables.jsonl"), "w", encoding="utf-8") as f:
+                for table in tables:
+                    f.write(json.dumps(table, ensure_ascii=False))
+                    f.write("\n")
+
+            stats = get_sparse_index_stats().export_collection(self.collection_name)
+
+            manifest = {
+                "format_version": SNAPSHOT_FORMAT_VERSION,
+                "collection_name": self.collection_name,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                "points_count": written,
+                "parents_count": parents,
+                "tables_count": len(tables),
+                "collection": config,
+                "embeddings": _embedding_config(),
+                "sparse_stats": {"doc_count": stats["doc_count"], "total_length": stats["total_length"]},
+                "files": dict(sorted((file, count) for file, count in files.items() if file)),
+            }
+            with open(os.path.join(partial_path, "manifest.json"), "w", encoding="utf-8") as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(partial_path, path)
+        except Exception as e:
+            shutil.rmtree(partial_path, ignore_errors=True)
+            self.logger.error(f"Error exporting collection {self.collection_name}: {e}")
+            raise ValueError(f"Error exporting collection {self.collection_name}: {e}")
+
+        self.logger.info(f"Exported {written} points of {self.collection_name} to {path} "
+                         f"in {time.perf_counter() - start:.2f}s")
+        return manifest
+
+    def _points(self, path: str, manifest: dict) -> Iterator[models.PointStruct]:
+        dense = np.load(os.path.join(path, "dense.npy"), mmap_mode="r")
+        indptr = np.load(os.path.join(path, "sparse_indptr.npy"), mmap_mode="r")
+        sparse_indices = np.load(os.path.join(path, "sparse_indices.npy"), mmap_mode="r")
+        sparse_values = np.load(os.path.join(path, "sparse_values.npy"), mmap_mode="r")
+        with open(os.path.join(path, "payloads.jsonl"), encoding="utf-8") as payloads:
+            for row, line in zip(range(manifest["points_count"]), payloads):
+                record = json.loads(line)
+                vector = {QdrantVectorStore.VECTOR_NAME: dense[row].tolist()}
+                if manifest["collection"]["sparse"]:
+                    start, end = indptr[row], indptr[row + 1]
+                    vector[QdrantVectorStore.SPARSE_VECTOR_NAME] = models.SparseVector(
+                        indices=sparse_indices[start:end].tolist(), values=sparse_values[start:end].tolist())
+                yield models.PointStruct(id=record["id"], vector=vector, payload=record["payload"])
+
+    def _recreate(self, collection_name: str, overwrite: bool, **config):
+        if self.client.collection_exists(collection_name):
+            if not overwrite:
+                raise ValueError(f"Collection {collection_name} already exists")
+            self.client.delete_collection(collection_name)
+        self.client.create_collection(collection_name, **config)
+
+    def validate(self, path: str) -> dict:
+        """
+        Check that an archive is complete and consistent: format version, array shapes, one payload per point.
+
+        Args:
+            path (str): Archive directory.
+
+        Returns:
+            dict: The archive manifest.
+
+        Raises:
+            ValueError: If the archive is incomplete or inconsistent.
+        """
+        try:
+            manifest = read_manifest(path)
+            if manifest.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+                raise ValueError(f"unsupported format version {manifest.get('format_version')}")
+            count, config = manifest["points_count"], manifest["collection"]
+            dense = np.load(os.path.join(path, "dense.npy"), mmap_mode="r")
+            if dense.shape[0] < count or dense.shape[1] != config["dense_size"]:
+                raise ValueError(f"dense.npy has shape {dense.shape}, expected ({count}, {config['dense_size']})")
+            indptr = np.load(os.path.join(path, "sparse_indptr.npy"), mmap_mode="r")
+            nnz = [np.load(os.path.join(path, f"sparse_{name}.npy"), mmap_mode="r").shape[0]
+                   for name in ("indices", "values")]
+            if len(indptr) != count + 1 or nnz != [int(indptr[-1])] * 2:
+                raise ValueError("sparse arrays do not match the number of points")
+            with open(os.path.join(path, "payloads.jsonl"), encoding="utf-8") as f:
+                payloads = sum(1 for line in f if {"id", "payload"} <= json.loads(line).keys())
+            if payloads != count:
+                raise ValueError(f"payloads.jsonl has {payloads} points, expected {count}")
+        except (OSError, KeyError, IndexError, TypeError, ValueError) as e:
+            self.logger.error(f"Invalid snapshot {path}: {e}")
+            raise ValueError(f"Invalid snapshot {path}: {e}")
+        return manifest
+
+    def restore(self, path: str, overwrite: bool = False, parallel: int = 1) -> dict:
+        """
+        Create the collection from an archive with bulk upserts. The archive may come from another collection name.
+
+        Args:
+            path (str): Archive directory.
+            overwrite (bool): Replace the collection if it already exists.
+            parallel (int): Number of upload processes.
+
+        Returns:
+            dict: The archive manifest.
+        """
+        start = time.perf_counter()
+        # The existing collection is only deleted once the whole archive is known to be readable
+        manifest = self.validate(path)
+        if manifest["embeddings"] != _embedding_config():
+            self.logger.warning(f"Snapshot was built with {manifest['embeddings']}, queries will be encoded with "
+                                f"{_embedding_config()}")
+
+        config = manifest["collection"]
+        try:
+            sparse_modifier = config["sparse_modifier"]
+            self._recreate(
+                self.collection_name, overwrite,
+                vectors_config={QdrantVectorStore.VECTOR_NAME: models.VectorParams(
+                    size=config["dense_size"], distance=models.Distance(config["distance"]))},
+                sparse_vectors_config={QdrantVectorStore.SPARSE_VECTOR_NAME: models.SparseVectorParams(
+                    modifier=models.Modifier(sparse_modifier) if sparse_modifier else None)}
+                if config["sparse"] else None,
+            )
+            for field, data_type in config["payload_indexes"].items():
+                self.client.create_payload_index(self.collection_name, field_name=field,
+                                                 field_schema=models.PayloadSchemaType(data_type))
+            self.client.upload_points(self.collection_name, self._points(path, manifest),
+                                      batch_size=self.batch_size, parallel=parallel, wait=True)
+
+            parents_path = os.path.join(path, "parents.jsonl")
+            if os.path.exists(parents_path):
+                self._recreate(self.parents_collection_name, True, vectors_config={})
+                with open(parents_path, encoding="utf-8") as f:
+                    parents = (json.loads(line) for line in f)
+                    self.client.upload_points(
+                        self.parents_collection_name,
+                        (models.PointStruct(id=parent["id"], vector={}, payload=parent["payload"])
+                         for parent in parents),
+                        batch_size=self.batch_size, wait=True,
+                    )
+
+            tables_path = os.path.join(path, "tables.jsonl")
+            if os.path.exists(tables_path):
+                with open(tables_path, encoding="utf-8") as f:
+                    get_table_store().import_collection(self.collection_name, [json.loads(line) for line in f])
+
+            get_sparse_index_stats().import_collection(
+                self.collection_name,
+                doc_count=manifest["sparse_stats"]["doc_count"],
+                total_length=manifest["sparse_stats"]["total_length"],
+            )
+        except Exception as e:
+            self.logger.error(f"Error restoring collection {self.collection_name} from {path}: {e}")
+            raise ValueError(f"Error restoring collection {self.collection_name} from {path}: {e}")
+
+        self.logger.info(f"Restored {manifest['points_count']} points into {self.collection_name} from {path} "
+                         f"in {time.perf_counter() - start:.2f}s")
+        return manifest
@@ -0,0 +1,181 @@
+"""
+This module contains the upload guards of the ingestion endpoints: size caps, spooling to disk and format sniffing.
+
+The request body is capped while it is received (UploadSizeLimitMiddleware), before Starlette spools the multipart
+file to disk. Parsers then read the upload from disk instead of from an in-memory copy: pandas reads the spooled
+file in place, docling opens a named copy of it.
+"""
+import codecs
+import os
+import tempfile
+import zipfile
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Dict
+
+from fastapi import HTTPException, UploadFile
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from api.logging_theme import setup_logger
+
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+MAX_FAQ_UPLOAD_BYTES = int(os.getenv("MAX_FAQ_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+MAX_BATCH_UPLOAD_BYTES = int(os.getenv("MAX_BATCH_UPLOAD_BYTES", str(5 * 1024 * 1024)))
+UPLOAD_TMP_DIR = os.getenv("UPLOAD_TMP_DIR") or None
+UPLOAD_READ_CHUNK_BYTES = 1024 * 1024
+# Bytes of a CSV checked for binary content and encoding before it is parsed
+CSV_SNIFF_BYTES = 64 * 1024
+# Room for the multipart boundaries and headers around the file in the request body
+MULTIPART_OVERHEAD_BYTES = 64 * 1024
+
+logger = setup_logger(__name__)
+
+
+class UploadError(ValueError):
+    """
+    A rejected upload, with the HTTP status and machine-readable code to report.
+    """
+    def __init__(self, status_code: int, code: str, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+    def detail(self) -> Dict[str, str]:
+        return {"code": self.code, "message": str(self)}
+
+
+def _reject(status_code: int, code: str, message: str) -> UploadError:
+    logger.error(message)
+    return UploadError(status_code, code, message)
+
+
+def check_upload_size(file: UploadFile, max_bytes: int):
+    """
+    Check the size of a received upload
+    Args:
+        file (UploadFile): uploaded file
+        max_bytes (int): size cap
+    Raises:
+        UploadError: 413 if the upload is larger than max_bytes, 422 if it is empty
+    """
+    if file.size is not None and file.size > max_bytes:
+        raise _reject(413, "file_too_large", f"{file.filename} is {file.size} bytes, the limit is {max_bytes}")
+    if file.size == 0:
+        raise _reject(422, "empty_file", f"{file.filename} is empty")
+
+
+@asynccontextmanager
+async def spooled_upload(file: UploadFile, max_bytes: int, suffix: str = "") -> AsyncIterator[Path]:
+    """
+    Copy an upload to a named temporary file, block by block, for parsers that need a path, and remove it on exit
+    Args:
+        file (UploadFile): uploaded file
+        max_bytes (int): size cap
+        suffix (str): suffix of the temporary file, parsers may detect the format from it
+    Yields:
+        Path: path of the temporary file
+    Raises:
+        UploadError: 413 if the upload is larger than max_bytes, 422 if it is empty
+    """
+    check_upload_size(file, max_bytes)
+    spool = tempfile.NamedTemporaryFile(suffix=suffix, dir=UPLOAD_TMP_DIR, delete=False)
+    try:
+        size = 0
+        while block := await file.read(UPLOAD_READ_CHUNK_BYTES):
+            size += len(block)
+            if size > max_bytes:
+                raise _reject(413, "file_too_large", f"{file.filename} is larger than the limit of {max_bytes} bytes")
+            spool.write(block)
+        spool.close()
+        if not size:
+            raise _reject(422, "empty_file", f"{file.filename} is empty")
+        yield Path(spool.name)
+    finally:
+        spool.close()
+        os.unlink(spool.name)
+
+
+def sniff_docx(path: Path, filename: str):
+    """
+    Check that a file is a Word document (a zip archive with word/document.xml) before handing it to docling
+    Args:
+        path (Path): spooled upload
+        filename (str): name the file was uploaded with
+    Raises:
+        UploadError: 415 if it is not a .docx file
+    """
+    try:
+        with zipfile.ZipFile(path) as archive:
+            archive.getinfo("word/document.xml")
+    except (zipfile.BadZipFile, KeyError):
+        raise _reject(415, "invalid_format", f"{filename} is not a Word (.docx) document")
+
+
+def sniff_csv(stream: BinaryIO, filename: str, encoding: str = "utf-8-sig"):
+    """
+    Check that the beginning of a file is text in the expected encoding before handing it to pandas
+    Args:
+        stream (BinaryIO): uploaded file, rewound after the check
+        filename (str): name the file was uploaded with
+        encoding (str): expected encoding
+    Raises:
+        UploadError: 415 if it is a workbook, binary or not in the expected encoding
+    """
+    stream.seek(0)
+    head = stream.read(CSV_SNIFF_BYTES)
+    stream.seek(0)
+    if head.startswith(b"PK\x03\x04") or head.startswith(b"\xd0\xcf\x11\xe0"):
+        raise _reject(415, "invalid_format", f"{filename} is an Excel workbook, export it as CSV")
+    if b"\x00" in head:
+        raise _reject(415, "invalid_format", f"{filename} is not a text file")
+    try:
+        # Incremental decoding: a truncated sample may end in the middle of a multi-byte character
+        codecs.getincrementaldecoder(encoding)().decode(head, final=len(head) < CSV_SNIFF_BYTES)
+    except UnicodeDecodeError:
+        raise _reject(415, "invalid_encoding", f"{filename} is not a {encoding.split('-sig')[0].upper()} file")
+
+
+UPLOAD_LIMITS = {"/upload": MAX_UPLOAD_BYTES, "/upload_faq": MAX_FAQ_UPLOAD_BYTES,
+                 "/chat/batch": MAX_BATCH_UPLOAD_BYTES}
+
+
+class UploadSizeLimitMiddleware:
+    """
+    ASGI middleware capping the request body of the upload endpoints, other routes pass through untouched.
+
+    A declared Content-Length above the cap is answered with 413 before anything is read; otherwise (e.g. chunked
+    uploads) the body is counted as it is received and the request fails with 413 once it exceeds the cap.
+    """
+    def __init__(self, app: ASGIApp, limits: Dict[str, int] = UPLOAD_LIMITS):
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        limit = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        max_body = limit + MULTIPART_OVERHEAD_BYTES
+        headers = dict(scope["headers"])
+        length = headers.get(b"content-length", b"").decode("latin-1")
+        if length.isdigit() and int(length) > max_body:
+            error = _reject(413, "file_too_large", f"Request body is {length} bytes, the limit is {limit}")
+            await JSONResponse(status_code=error.status_code, content={"detail": error.detail()})(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_body:
+                    error = _reject(413, "file_too_large", f"Request body is larger than the limit of {limit} bytes")
+                    # Raised inside the request, so FastAPI's exception handling turns it into the response
+                    raise HTTPException(status_code=error.status_code, detail=error.detail())
+            return message
+
+        await self.app(scope, limited_receive, send)
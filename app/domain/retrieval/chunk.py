@@ -0,0 +1,82 @@
+"""
+This module contains the compact chunk record used between Qdrant result decoding and context packing.
+"""
+import sys
+from typing import Iterable, List, Optional
+
+from langchain_core.documents import Document as LangchainDocument
+from langchain_qdrant import QdrantVectorStore
+
+
+class Chunk:
+    """
+    A retrieved chunk.
+
+    Slotted so that a result set of k chunks costs k small fixed-size objects: the text is the string decoded
+    from the Qdrant payload (never copied), the source path is interned so every chunk of the same file shares
+    one string, and the payload metadata is only referenced, not merged into a new dict. Convert to a
+    LangchainDocument only where a LangChain API requires one.
+    """
+    __slots__ = ("id", "score", "text", "source", "metadata")
+
+    def __init__(self, id: str, score: float, text: str, source: Optional[str] = None,
+                 metadata: Optional[dict] = None):
+        self.id = id
+        self.score = score
+        self.text = text
+        self.source = sys.intern(source) if source else None
+        self.metadata = metadata
+
+    def __repr__(self) -> str:
+        return f"Chunk(id={self.id!r}, score={self.score:.4f}, source={self.source!r}, text={self.text[:40]!r}...)"
+
+    @classmethod
+    def from_point(cls, point) -> "Chunk":
+        """
+        Decode a Qdrant ScoredPoint/Record.
+
+        Args:
+            point: Point returned by Qdrant with its payload.
+
+        Returns:
+            Chunk: The decoded chunk.
+        """
+        payload = point.payload or {}
+        metadata = payload.get(QdrantVectorStore.METADATA_KEY) or {}
+        return cls(
+            id=str(point.id),
+            score=getattr(point, "score", 0.0) or 0.0,
+            text=payload.get(QdrantVectorStore.CONTENT_KEY, ""),
+            source=metadata.get("file_path"),
+            metadata=metadata,
+        )
+
+    @classmethod
+    def from_document(cls, document: LangchainDocument, score: float = 0.0) -> "Chunk":
+        """Wrap a LangchainDocument returned by a LangChain retriever."""
+        metadata = document.metadata
+        return cls(id=str(metadata.get("_id", document.id)), score=score, text=document.page_content,
+                   source=metadata.get("file_path"), metadata=metadata)
+
+    def to_document(self) -> LangchainDocument:
+        """Convert to a LangchainDocument at a LangChain boundary."""
+        return LangchainDocument(page_content=self.text, metadata={**(self.metadata or {}), "_id": self.id})
+
+
+def pack_context(chunks: Iterable[Chunk], separator: str = "\n\n") -> str:
+    """
+    Join chunk texts into the context block of the prompt.
+
+    Args:
+        chunks (Iterable[Chunk]): Retrieved chunks, best first.
+        separator (str): Separator between chunks.
+
+    Returns:
+        str: The context text.
+    """
+    return separator.join(chunk.text for chunk in chunks)
+
+
+def to_documents(chunks: List[Chunk]) -> List[LangchainDocument]:
+    """Convert a result set at a LangChain boundary."""
+    return [chunk.to_document() for chunk in chunks]
@@ -0,0 +1,116 @@
+"""
+This module assembles the retrieved context of a question: exact table rows, then parent sections of child hits.
+"""
+import asyncio
+import os
+from typing import Dict, List, Optional, Tuple
+
+from langchain_core.callbacks import AsyncCallbackManagerForRetrieverRun, CallbackManagerForRetrieverRun
+from langchain_core.documents import Document as LangchainDocument
+from langchain_core.retrievers import BaseRetriever
+from langchain_qdrant import RetrievalMode
+
+from domain.retrieval.chunk import Chunk, to_documents
+from api.logging_theme import setup_logger
+from domain.retrieval.parents import PARENT_CONTEXT_TOKEN_BUDGET, ParentStore
+from domain.retrieval.routing import ADAPTIVE_RETRIEVAL, QueryRouter, RetrievalPlan, cut_at_score_gap
+from domain.retrieval.search import SearchEngine
+from utils.configs import get_table_store
+from utils.tokens import count_tokens
+
+logger = setup_logger(__name__)
+
+TABLE_LOOKUP = os.getenv("TABLE_LOOKUP", "true").lower() == "true"
+# Prose budget left when exact table rows were found: the rows answer the table part of the question
+TABLE_HIT_TOKEN_BUDGET = int(os.getenv("TABLE_HIT_TOKEN_BUDGET", "1000"))
+
+
+def assemble_context(collection_name: str, question: str, children: List[Chunk],
+                     token_budget: int = PARENT_CONTEXT_TOKEN_BUDGET) -> List[Chunk]:
+    """
+    Build the context blocks of a question.
+
+    Args:
+        collection_name (str): Collection that was searched.
+        question (str): The user's question.
+        children (List[Chunk]): Child hits, best first.
+        token_budget (int): Token budget of the prose context.
+
+    Returns:
+        List[Chunk]: Matched table rows followed by expanded parent sections.
+    """
+    rows = get_table_store().lookup(collection_name, question) if TABLE_LOOKUP else []
+    if rows:
+        token_budget = min(token_budget, TABLE_HIT_TOKEN_BUDGET)
+    return rows + ParentStore(collection_name=collection_name).expand(children, token_budget=token_budget)
+
+
+def routed_contexts(collection_name: str, questions: List[str], router: Optional[QueryRouter] = None,
+                    retrieval_mode: RetrievalMode = RetrievalMode.HYBRID) -> List[Tuple[RetrievalPlan, List[Chunk]]]:
+    """
+    Route each question, search the collections of its plan and build its context within the plan's token budget.
+
+    Questions are searched together, one batch query per collection, with the deepest k of the questions that
+    use it; each question then keeps at most its own k. Dense and sparse hits are cut at the first score gap of
+    each collection. Hybrid (RRF) scores only encode ranks, so hybrid hits are not cut, and hits of different
+    collections are never compared by score: each collection gets a share of the budget by its number of hits.
+
+    Args:
+        collection_name (str): Collection the questions are asked against.
+        questions (List[str]): The questions.
+        router (Optional[QueryRouter]): Router to use. Defaults to a QueryRouter with the environment settings.
+        retrieval_mode (RetrievalMode): Search mode.
+
+    Returns:
+        List[Tuple[RetrievalPlan, List[Chunk]]]: The plan and context blocks of each question, in input order.
+    """
+    router = router or QueryRouter()
+    plans = [router.route(question, collection_name) for question in questions]
+    hits: List[Dict[str, List[Chunk]]] = [{} for _ in questions]
+    for collection in dict.fromkeys(collection for plan in plans for collection in plan.collections):
+        indexes = [i for i, plan in enumerate(plans) if collection in plan.collections]
+        results = SearchEngine(collection_name=collection, k=max(plans[i].k for i in indexes),
+                               retrieval_mode=retrieval_mode).search_chunks([questions[i] for i in indexes])
+        for i, chunks in zip(indexes, results):
+            chunks = chunks[:plans[i].k]
+            hits[i][collection] = chunks if retrieval_mode == RetrievalMode.HYBRID \
+                else cut_at_score_gap(chunks, plans[i].min_k)
+
+    contexts = []
+    for question, plan, by_collection in zip(questions, plans, hits):
+        kept = sum(len(children) for children in by_collection.values())
+        blocks = []
+        for collection in plan.collections:
+            children = by_collection.get(collection, [])
+            if children or collection == collection_name:
+                share = len(children) / kept if kept else 1.0
+                blocks += assemble_context(collection, question, children, token_budget=int(plan.token_budget * share))
+        logger.info(f"Route {plan.category}: kept {kept} hits from "
+                    f"{len(plan.collections)} collections, {sum(count_tokens(block.text) for block in blocks)} "
+                    f"context tokens")
+        contexts.append((plan, blocks))
+    return contexts
+
+
+class ContextRetriever(BaseRetriever):
+    """
+    Retrieve small child chunks for precise matching, then return exact table rows and the deduplicated
+    parent sections of the hits.
+    """
+    collection_name: str
+    k: int = 10
+    token_budget: int = PARENT_CONTEXT_TOKEN_BUDGET
+    # Let the query router choose k, the budget and the collections per question
+    adaptive: bool = ADAPTIVE_RETRIEVAL
+
+    def _get_relevant_documents(self, query: str, *,
+                                run_manager: CallbackManagerForRetrieverRun) -> List[LangchainDocument]:
+        if self.adaptive:
+            _, blocks = routed_contexts(self.collection_name, [query])[0]
+            return to_documents(blocks)
+        children = SearchEngine(collection_name=self.collection_name, k=self.k).search_chunks([query])[0]
+        return to_documents(assemble_context(self.collection_name, query, children, token_budget=self.token_budget))
+
+    async def _aget_relevant_documents(self, query: str, *,
+                                       run_manager: AsyncCallbackManagerForRetrieverRun) -> List[LangchainDocument]:
+        return await asyncio.to_thread(self._get_relevant_documents, query, run_manager=run_manager.get_sync())
@@ -0,0 +1,80 @@
+"""
+This module contains a local dense embedding backend running FastEmbed (ONNX) on CPU.
+"""
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+from api.logging_theme import setup_logger
+
+
+class FastEmbedDenseEmbeddings(Embeddings):
+    """
+    Dense embeddings computed locally with a FastEmbed multilingual model.
+    """
+    def __init__(self, model_name: str, batch_size: int = 64, threads: Optional[int] = None,
+                 parallel: Optional[int] = None):
+        """
+        Load the ONNX model.
+
+        Args:
+            model_name (str): FastEmbed model name, e.g. "intfloat/multilingual-e5-large".
+            batch_size (int): Number of texts encoded per ONNX run.
+            threads (Optional[int]): ONNX intra-op threads. None lets onnxruntime decide.
+            parallel (Optional[int]): Number of data-parallel worker processes for large
+                document batches. None encodes in the current process, 0 uses all cores.
+        """
+        from fastembed import TextEmbedding
+
+        self.logger = setup_logger(__name__)
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.parallel = parallel
+        self.model = TextEmbedding(model_name=model_name, threads=threads)
+        # e5 models are trained with asymmetric "query: " / "passage: " prefixes
+        is_e5 = "e5" in model_name.lower()
+        self.query_prefix = "query: " if is_e5 else ""
+        self.passage_prefix = "passage: " if is_e5 else ""
+        self.logger.info(f"Loaded FastEmbed dense model {model_name}")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed documents in batches.
+
+        Args:
+            texts (List[str]): Texts to embed.
+
+        Returns:
+            List[List[float]]: One vector per text.
+        """
+        vectors = self.model.embed(
+            [self.passage_prefix + text for text in texts],
+            batch_size=self.batch_size,
+            parallel=self.parallel,
+        )
+        return [vector.tolist() for vector in vectors]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several queries in one batched run.
+
+        Args:
+            texts (List[str]): Queries to embed.
+
+        Returns:
+            List[List[float]]: One vector per query.
+        """
+        vectors = self.model.embed([self.query_prefix + text for text in texts], batch_size=self.batch_size)
+        return [vector.tolist() for vector in vectors]
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a single query.
+
+        Args:
+            text (str): Query to embed.
+
+        Returns:
+            List[float]: The query vector.
+        """
+        return next(iter(self.model.embed([self.query_prefix + text]))).tolist()
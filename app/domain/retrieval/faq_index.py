@@ -0,0 +1,244 @@
+"""
+This module contains the in-process FAQ index: exact, fuzzy (character trigram) and dense lookups over a FAQ
+collection small enough to be held in every worker.
+
+Each worker loads the index at startup and rebuilds it when the collection version kept in the state backend
+changes (it is bumped by every FAQ upload), so all workers pick up a new FAQ sheet. Collections larger than
+FAQ_INDEX_MAX_SIZE are not loaded and stay served by Qdrant.
+"""
+import asyncio
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.documents import Document as LangchainDocument
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient
+
+from api.logging_theme import setup_logger
+from utils.configs import get_qdrant_client, get_state_backend
+from utils.text import normalize_text
+
+FAQ_COLLECTION = os.getenv("FAQ_COLLECTION", "faq")
+FAQ_INDEX_MAX_SIZE = int(os.getenv("FAQ_INDEX_MAX_SIZE", "5000"))
+# Dice similarity of character trigrams above which a FAQ question is a fuzzy candidate
+FAQ_FUZZY_THRESHOLD = float(os.getenv("FAQ_FUZZY_THRESHOLD", "0.8"))
+# How often a worker checks whether another worker uploaded a new FAQ sheet
+FAQ_VERSION_CHECK_S = float(os.getenv("FAQ_VERSION_CHECK_S", "5"))
+
+logger = setup_logger(__name__)
+
+
+def faq_version(collection_name: str) -> str:
+    """
+    Current version of a FAQ collection, shared by every worker and node
+    Args:
+        collection_name (str): FAQ collection
+    Returns:
+        str: version
+    """
+    return get_state_backend().get(f"faq_version:{collection_name}") or "0"
+
+
+def bump_faq_version(collection_name: str) -> str:
+    """
+    Mark a FAQ collection as changed
+    Args:
+        collection_name (str): FAQ collection
+    Returns:
+        str: new version
+    """
+    return str(get_state_backend().incr(f"faq_version:{collection_name}"))
+
+
+def _trigrams(normalized: str) -> set:
+    padded = f"  {normalized} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class FAQMatch:
+    """A FAQ entry matched to a question."""
+    question: str
+    answer: str
+    score: float
+    kind: str
+
+    def to_document(self) -> LangchainDocument:
+        return LangchainDocument(page_content=self.question, metadata={"answer": self.answer})
+
+
+class FAQIndex:
+    """
+    Normalized-text hash map, trigram inverted index and normalized float32 embedding matrix of a FAQ collection.
+    """
+    def __init__(self, collection_name: str, client: Optional[QdrantClient] = None,
+                 max_size: int = FAQ_INDEX_MAX_SIZE):
+        self.collection_name = collection_name
+        self.client = client
+        self.max_size = max_size
+        self.enabled = False
+        self.version = "0"
+        self.checked_at = 0.0
+        self.questions: List[str] = []
+        self.answers: List[str] = []
+        self._exact: Dict[str, int] = {}
+        self._postings: Dict[str, np.ndarray] = {}
+        self._trigram_counts = np.zeros(0, dtype=np.int32)
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+    @property
+    def size(self) -> int:
+        return len(self.questions)
+
+    @property
+    def nbytes(self) -> int:
+        return self._matrix.nbytes + sum(posting.nbytes for posting in self._postings.values())
+
+    def load(self) -> "FAQIndex":
+        """
+        Read the collection and build the lookup structures; disable the index if the collection is too large.
+
+        Returns:
+            FAQIndex: self
+        """
+        client = self.client or get_qdrant_client()
+        self.version = faq_version(self.collection_name)
+        self.checked_at = time.monotonic()
+        try:
+            count = client.count(self.collection_name, exact=True).count \
+                if client.collection_exists(self.collection_name) else 0
+            if count > self.max_size:
+                self.enabled = False
+                logger.info(f"FAQ collection {self.collection_name} has {count} entries (> {self.max_size}), "
+                            f"served by Qdrant")
+                return self
+
+            questions, answers, vectors = [], [], []
+            offset = None
+            while count:
+                points, offset = client.scroll(self.collection_name, limit=512, offset=offset, with_payload=True,
+                                               with_vectors=[QdrantVectorStore.VECTOR_NAME])
+                for point in points:
+                    metadata = point.payload.get(QdrantVectorStore.METADATA_KEY) or {}
+                    vector = point.vector.get(QdrantVectorStore.VECTOR_NAME) if isinstance(point.vector, dict) \
+                        else point.vector
+                    questions.append(point.payload.get(QdrantVectorStore.CONTENT_KEY, ""))
+                    answers.append(metadata.get("answer"))
+                    vectors.append(vector)
+                if offset is None:
+                    break
+        except Exception as e:
+            logger.error(f"Error loading FAQ index of {self.collection_name}: {e}")
+            raise ValueError(f"Error loading FAQ index of {self.collection_name}: {e}")
+
+        normalized = [normalize_text(question) for question in questions]
+        self.questions, self.answers = questions, answers
+        self._exact = {text: i for i, text in enumerate(normalized)}
+        postings: Dict[str, List[int]] = {}
+        trigram_sets = [_trigrams(text) for text in normalized]
+        for i, trigrams in enumerate(trigram_sets):
+            for trigram in trigrams:
+                postings.setdefault(trigram, []).append(i)
+        self._postings = {trigram: np.asarray(ids, dtype=np.int32) for trigram, ids in postings.items()}
+        self._trigram_counts = np.asarray([len(trigrams) for trigrams in trigram_sets], dtype=np.int32)
+        matrix = np.asarray(vectors, dtype=np.float32) if vectors else np.zeros((0, 0), dtype=np.float32)
+        if matrix.size:
+            matrix /= np.linalg.norm(matrix, axis=1, keepdims=True).clip(min=1e-12)
+        self._matrix = matrix
+        self.enabled = True
+        logger.info(f"Loaded FAQ index of {self.collection_name}: {self.size} entries, "
+                    f"{self.nbytes / 1e6:.1f} MB, version {self.version}")
+        return self
+
+    def _match(self, i: int, score: float, kind: str) -> FAQMatch:
+        return FAQMatch(question=self.questions[i], answer=self.answers[i], score=score, kind=kind)
+
+    def exact(self, question: str) -> Optional[FAQMatch]:
+        """
+        FAQ entry whose normalized question (case, punctuation and diacritics removed) equals the question's.
+
+        Args:
+            question (str): The user's question.
+
+        Returns:
+            Optional[FAQMatch]: The entry, or None.
+        """
+        i = self._exact.get(normalize_text(question))
+        return self._match(i, 1.0, "exact") if i is not None else None
+
+    def fuzzy(self, question: str, threshold: float = FAQ_FUZZY_THRESHOLD) -> Optional[FAQMatch]:
+        """
+        FAQ entry with the highest character-trigram Dice similarity to the question, if above the threshold.
+
+        Args:
+            question (str): The user's question.
+            threshold (float): Minimum similarity.
+
+        Returns:
+            Optional[FAQMatch]: The best entry, or None.
+        """
+        trigrams = _trigrams(normalize_text(question))
+        postings = [self._postings[trigram] for trigram in trigrams if trigram in self._postings]
+        if not postings:
+            return None
+        shared = np.bincount(np.concatenate(postings), minlength=self.size)
+        dice = 2 * shared / (len(trigrams) + self._trigram_counts)
+        best = int(np.argmax(dice))
+        return self._match(best, float(dice[best]), "fuzzy") if dice[best] >= threshold else None
+
+    def nearest(self, vector: List[float]) -> Optional[FAQMatch]:
+        """
+        FAQ entry whose stored embedding has the highest cosine similarity with the query embedding.
+
+        Args:
+            vector (List[float]): Query embedding, from the backend the collection was embedded with.
+
+        Returns:
+            Optional[FAQMatch]: The nearest entry, or None if the index is empty.
+        """
+        if not self._matrix.size:
+            return None
+        query = np.asarray(vector, dtype=np.float32)
+        scores = self._matrix @ (query / max(float(np.linalg.norm(query)), 1e-12))
+        best = int(np.argmax(scores))
+        return self._match(best, float(scores[best]), "dense")
+
+
+_indexes: Dict[str, FAQIndex] = {}
+_lock = threading.Lock()
+
+
+def refresh_faq_index(collection_name: str = FAQ_COLLECTION) -> FAQIndex:
+    """
+    Rebuild the FAQ index of this worker
+    Args:
+        collection_name (str): FAQ collection
+    Returns:
+        FAQIndex: the new index
+    """
+    index = FAQIndex(collection_name).load()
+    with _lock:
+        _indexes[collection_name] = index
+    return index
+
+
+async def aget_faq_index(collection_name: str = FAQ_COLLECTION) -> FAQIndex:
+    """
+    FAQ index of this worker, rebuilt in a thread when missing or when another worker changed the collection
+    Args:
+        collection_name (str): FAQ collection
+    Returns:
+        FAQIndex: the current index
+    """
+    index = _indexes.get(collection_name)
+    if index is not None and time.monotonic() - index.checked_at < FAQ_VERSION_CHECK_S:
+        return index
+    if index is not None:
+        index.checked_at = time.monotonic()
+        if await asyncio.to_thread(faq_version, collection_name) == index.version:
+            return index
+    return await asyncio.to_thread(refresh_faq_index, collection_name)
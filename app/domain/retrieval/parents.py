@@ -0,0 +1,121 @@
+"""
+This module contains the parent-section store used to expand child hits to their parent sections.
+"""
+import os
+from typing import List, Optional
+
+from langchain_core.documents import Document as LangchainDocument
+from langchain_qdrant import QdrantVectorStore
+from qdrant_client import QdrantClient, models
+
+from api.logging_theme import setup_logger
+from domain.retrieval.chunk import Chunk
+from utils.configs import get_qdrant_client
+from utils.tokens import count_tokens
+
+PARENT_CONTEXT_TOKEN_BUDGET = int(os.getenv("PARENT_CONTEXT_TOKEN_BUDGET", "3000"))
+
+
+class ParentStore:
+    """
+    Section-level parents of a collection, stored by id in a payload-only Qdrant collection "<collection>_parents".
+    """
+    def __init__(self, collection_name: str, client: Optional[QdrantClient] = None):
+        self.collection_name = collection_name
+        self.parents_collection_name = f"{collection_name}_parents"
+        self.client = client or get_qdrant_client()
+        self.logger = setup_logger(__name__)
+
+    def save(self, parents: List[LangchainDocument]):
+        """
+        Store parent sections, overwriting sections with the same id.
+
+        Args:
+            parents (List[LangchainDocument]): Parent sections with a "parent_id" in their metadata.
+        """
+        if not parents:
+            return
+        try:
+            if not self.client.collection_exists(self.parents_collection_name):
+                self.client.create_collection(self.parents_collection_name, vectors_config={})
+            self.client.upsert(
+                collection_name=self.parents_collection_name,
+                points=[
+                    models.PointStruct(
+                        id=parent.metadata["parent_id"],
+                        vector={},
+                        payload={
+                            QdrantVectorStore.CONTENT_KEY: parent.page_content,
+                            QdrantVectorStore.METADATA_KEY: parent.metadata,
+                        },
+                    )
+                    for parent in parents
+                ],
+            )
+            self.logger.info(f"Stored {len(parents)} parent sections in {self.parents_collection_name}")
+        except Exception as e:
+            self.logger.error(f"Error storing parent sections in {self.parents_collection_name}: {e}")
+            raise ValueError(f"Error storing parent sections in {self.parents_collection_name}: {e}")
+
+    def delete_file(self, file_path: str):
+        """
+        Delete the parent sections of a source file.
+
+        Args:
+            file_path (str): Source file name, as stored in the section metadata.
+        """
+        if not self.client.collection_exists(self.parents_collection_name):
+            return
+        self.client.delete(
+            collection_name=self.parents_collection_name,
+            points_selector=models.FilterSelector(filter=models.Filter(must=[
+                models.FieldCondition(key=f"{QdrantVectorStore.METADATA_KEY}.file_path",
+                                      match=models.MatchValue(value=file_path)),
+            ])),
+        )
+        self.logger.info(f"Deleted the parent sections of {file_path} from {self.parents_collection_name}")
+
+    def expand(self, children: List[Chunk], token_budget: int = PARENT_CONTEXT_TOKEN_BUDGET) -> List[Chunk]:
+        """
+        Replace child hits by their parent sections, best first, without exceeding the token budget.
+
+        Children sharing a parent yield it once. A parent that does not fit the remaining budget is replaced by
+        its child, and children without a stored parent (collections ingested before parents existed) are kept.
+
+        Args:
+            children (List[Chunk]): Child hits, best first.
+            token_budget (int): Maximum number of context tokens.
+
+        Returns:
+            List[Chunk]: Context blocks, best first.
+        """
+        parent_ids = list(dict.fromkeys(
+            child.metadata["parent_id"] for child in children if child.metadata and child.metadata.get("parent_id")
+        ))
+        parents = {}
+        if parent_ids and self.client.collection_exists(self.parents_collection_name):
+            parents = {
+                str(point.id): Chunk.from_point(point)
+                for point in self.client.retrieve(self.parents_collection_name, ids=parent_ids, with_payload=True)
+            }
+
+        blocks, seen, used_tokens = [], set(), 0
+        for child in children:
+            parent_id = (child.metadata or {}).get("parent_id")
+            if parent_id in seen:
+                continue
+            block = parents.get(parent_id, child)
+            tokens = count_tokens(block.text)
+            if block is not child and used_tokens + tokens > token_budget:
+                block, tokens = child, count_tokens(child.text)
+            if used_tokens + tokens > token_budget:
+                continue
+            if block is not child:
+                block.score = child.score
+                seen.add(parent_id)
+            blocks.append(block)
+            used_tokens += tokens
+
+        self.logger.info(f"Expanded {len(children)} child hits to {len(blocks)} context blocks ({used_tokens} tokens)")
+        return blocks
+
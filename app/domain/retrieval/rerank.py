@@ -0,0 +1,38 @@
+"""
+This module contains a cross-encoder reranker running locally with FastEmbed.
+"""
+from typing import List, Tuple
+
+from langchain_core.documents import Document as LangchainDocument
+
+from api.logging_theme import setup_logger
+
+
+class CrossEncoderReranker:
+    """
+    Re-score retrieved documents against the question with a multilingual cross-encoder.
+    """
+    def __init__(self, model_name: str):
+        from fastembed.rerank.cross_encoder import TextCrossEncoder
+
+        self.logger = setup_logger(__name__)
+        self.model = TextCrossEncoder(model_name=model_name)
+        self.logger.info(f"Loaded reranker model {model_name}")
+
+    def rerank(self, question: str, documents: List[LangchainDocument], k: int) -> List[Tuple[LangchainDocument, float]]:
+        """
+        Rerank documents and keep the best k.
+
+        Args:
+            question (str): The user's question.
+            documents (List[LangchainDocument]): Retrieved candidates.
+            k (int): Number of documents to keep.
+
+        Returns:
+            List[Tuple[LangchainDocument, float]]: The top-k documents with their cross-encoder scores.
+        """
+        if not documents:
+            return []
+        scores = self.model.rerank(question, [document.page_content for document in documents])
+        ranked = sorted(zip(documents, scores), key=lambda pair: pair[1], reverse=True)
+        return [(document, float(score)) for document, score in ranked[:k]]
@@ -0,0 +1,138 @@
+"""
+This module contains the query router: a lightweight local classifier that picks, per question, how deep to
+retrieve, which collections to search and whether to try the FAQ first.
+"""
+import json
+import os
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+from domain.retrieval.chunk import Chunk
+from domain.retrieval.parents import PARENT_CONTEXT_TOKEN_BUDGET
+from utils.text import normalize_text, syllable_ngrams
+
+ADAPTIVE_RETRIEVAL = os.getenv("ADAPTIVE_RETRIEVAL", "true").lower() == "true"
+# Stop taking hits when the score drops by more than this fraction of the top score between two consecutive hits
+SCORE_GAP_RATIO = float(os.getenv("SCORE_GAP_RATIO", "0.25"))
+# Extra collections searched when the question mentions one of their keywords, e.g. {"ktx": ["ky tuc xa"]}
+ROUTER_COLLECTION_KEYWORDS: Dict[str, List[str]] = json.loads(os.getenv("ROUTER_COLLECTION_KEYWORDS", "{}"))
+
+# Markers are matched against diacritic-folded syllable n-grams of the question. Single syllables are too
+# ambiguous once folded ("giua" is also "giữa kỳ", "cach" also "tư cách"), so markers are phrases
+CHITCHAT_MARKERS = {"xin chao", "chao ban", "cam on", "hello", "hi", "tam biet", "ban la ai"}
+COMPARISON_MARKERS = {"so sanh", "khac nhau", "khac gi", "giong nhau", "tot hon", "nen chon", "hay la"}
+ENUMERATION_MARKERS = {"liet ke", "danh sach", "tat ca cac", "cac nganh", "nhung nganh"}
+PROCEDURAL_MARKERS = {"nhu the nao", "the nao", "lam sao", "cach nao", "cach thuc", "bang cach", "quy trinh",
+                      "thu tuc", "cac buoc", "ho so", "dang ky"}
+FACTUAL_MARKERS = {"bao nhieu", "la gi", "khi nao", "o dau", "diem chuan", "hoc phi", "chi tieu", "ma nganh",
+                   "han nop", "thoi han"}
+
+
+@dataclass(frozen=True)
+class RetrievalPlan:
+    """Retrieval settings chosen for one question."""
+    category: str
+    k: int
+    min_k: int
+    token_budget: int
+    collections: Tuple[str, ...] = ()
+    skip_faq: bool = False
+
+
+# Short factual lookups need a few chunks; comparisons and enumerations need many. Comparisons are never FAQ
+# entries, enumerations may be ("Học phí bao gồm những khoản nào?"), see QueryRouter.route
+ROUTE_PLANS = {
+    "chitchat": RetrievalPlan("chitchat", k=2, min_k=1, token_budget=500, skip_faq=True),
+    "factual": RetrievalPlan("factual", k=5, min_k=2, token_budget=1500),
+    "procedural": RetrievalPlan("procedural", k=10, min_k=3, token_budget=PARENT_CONTEXT_TOKEN_BUDGET),
+    "complex": RetrievalPlan("complex", k=20, min_k=6, token_budget=int(PARENT_CONTEXT_TOKEN_BUDGET * 1.5)),
+}
+
+
+def cut_at_score_gap(chunks: List[Chunk], min_k: int, gap_ratio: float = SCORE_GAP_RATIO) -> List[Chunk]:
+    """
+    Keep the hits before the first large score drop, and at least min_k of them. The scores must measure relevance
+    (cosine, BM25 or reranker scores): fused RRF scores only encode ranks, and their gaps are the same for every query
+    Args:
+        chunks (List[Chunk]): hits, best first
+        min_k (int): number of hits always kept
+        gap_ratio (float): drop between consecutive hits, as a fraction of the top score, that ends the list
+    Returns:
+        List[Chunk]: kept hits
+    """
+    if len(chunks) <= min_k or chunks[0].score <= 0:
+        return chunks
+    top = chunks[0].score
+    for i in range(max(min_k, 1), len(chunks)):
+        if (chunks[i - 1].score - chunks[i].score) / top > gap_ratio:
+            return chunks[:i]
+    return chunks
+
+
+class QueryRouter:
+    """
+    Rule-based question classifier over syllable n-gram features; it runs in microseconds and needs no model.
+    """
+    def __init__(self, adaptive: bool = ADAPTIVE_RETRIEVAL, default_k: int = 10,
+                 collection_keywords: Optional[Dict[str, List[str]]] = None):
+        self.adaptive = adaptive
+        self.default_k = default_k
+        self.collection_keywords = {
+            collection: {normalize_text(keyword) for keyword in keywords}
+            for collection, keywords in (collection_keywords if collection_keywords is not None
+                                         else ROUTER_COLLECTION_KEYWORDS).items()
+        }
+
+    def classify(self, question: str) -> str:
+        """
+        Classify a question as "chitchat", "factual", "procedural" or "complex".
+
+        Args:
+            question (str): The user's question.
+
+        Returns:
+            str: The category.
+        """
+        normalized = normalize_text(question)
+        ngrams = set(syllable_ngrams(normalized, max_n=3))
+        length = len(normalized.split())
+        if ngrams & CHITCHAT_MARKERS and length <= 6:
+            return "chitchat"
+
+        complexity = (
+            2 * bool(ngrams & COMPARISON_MARKERS)
+            + 2 * bool(ngrams & ENUMERATION_MARKERS)
+            + (question.count("?") > 1)
+            + (length > 25)
+            + ("va" in ngrams and length > 12)
+        )
+        if complexity >= 2:
+            return "complex"
+        if ngrams & PROCEDURAL_MARKERS:
+            return "procedural"
+        if ngrams & FACTUAL_MARKERS or length <= 12:
+            return "factual"
+        return "procedural"
+
+    def route(self, question: str, collection_name: str) -> RetrievalPlan:
+        """
+        Choose the retrieval plan of a question.
+
+        Args:
+            question (str): The user's question.
+            collection_name (str): Collection the question is asked against.
+
+        Returns:
+            RetrievalPlan: Depth, budget, collections and FAQ decision. A fixed plan (default_k, no cut-off)
+                when adaptive retrieval is disabled.
+        """
+        if not self.adaptive:
+            return RetrievalPlan("fixed", k=self.default_k, min_k=self.default_k,
+                                 token_budget=PARENT_CONTEXT_TOKEN_BUDGET, collections=(collection_name,))
+
+        plan = ROUTE_PLANS[self.classify(question)]
+        ngrams = set(syllable_ngrams(normalize_text(question), max_n=3))
+        extra = tuple(collection for collection, keywords in self.collection_keywords.items()
+                      if ngrams & keywords and collection != collection_name)
+        skip_faq = plan.skip_faq or (plan.category == "complex" and bool(ngrams & COMPARISON_MARKERS))
+        return replace(plan, collections=(collection_name, *extra), skip_faq=skip_faq)
@@ -1,20 +1,50 @@
 """
 This module contains a class for performing semantic search on Qdrant.
 """
+import os
+from typing import List, Optional, Tuple
+
+from langchain_core.documents import Document as LangchainDocument
 from langchain_core.vectorstores import VectorStoreRetriever
+from langchain_qdrant import QdrantVectorStore, RetrievalMode
+from qdrant_client import QdrantClient, models
 
 from api.logging_theme import setup_logger
+from domain.retrieval.chunk import Chunk, to_documents
 from domain.retrieval.vectorstores import VectorStore
+from utils.configs import get_embeddings, get_qdrant_client, get_reranker, get_sparse_embeddings
+
+# Number of candidates fetched per final result when reranking
+RERANK_FETCH_MULTIPLIER = int(os.getenv("RERANK_FETCH_MULTIPLIER", "3"))
 
 
 class SearchEngine:
     """
     This class contains functions for performing semantic search on Qdrant.
     """
-    def __init__(self, collection_name: str, k: int = 5):
+    def __init__(self, collection_name: str, k: int = 5, retrieval_mode: RetrievalMode = RetrievalMode.HYBRID,
+                 rerank: bool = False, client: Optional[QdrantClient] = None):
         self.collection_name = collection_name
         self.k = k
+        self.retrieval_mode = retrieval_mode
+        self.rerank = rerank
+        self.client = client
         self.logger = setup_logger(__name__)
+        self._vectorstore_instance: Optional[QdrantVectorStore] = None
+
+    def _vectorstore(self) -> QdrantVectorStore:
+        if self._vectorstore_instance is not None:
+            return self._vectorstore_instance
+        try:
+            vectorstore = VectorStore(collection_name=self.collection_name, retrieval_mode=self.retrieval_mode,
+                                      client=self.client).get_vectorstore()
+            self._vectorstore_instance = vectorstore
+            self.logger.info(f"Retrieved vectorstore successfully created for collection {self.collection_name} "
+                             f"with k={self.k}")
+            return vectorstore
+        except Exception as e:
+            self.logger.error(f"Error retrieving vectorstore for collection {self.collection_name}: {e}")
+            raise ValueError(f"Error retrieving vectorstore for collection {self.collection_name}: {e}")
 
     def semantic_search(self) -> VectorStoreRetriever:
         """
@@ -23,15 +53,90 @@ class SearchEngine:
         Returns:
             VectorStoreRetriever: A retriever configured for semantic similarity search.
         """
+        vectorstore = self._vectorstore()
         try:
-            vectorstore = VectorStore(collection_name=self.collection_name).get_vectorstore()
-            self.logger.info(f"Retrieved vectorstore successfully created for collection {self.collection_name} with k={self.k}")
+            return vectorstore.as_retriever(search_kwargs={"k": self.k})
         except Exception as e:
-            self.logger.error(f"Error retrieving vectorstore for collection {self.collection_name}: {e}")
-            raise ValueError(f"Error retrieving vectorstore for collection {self.collection_name}: {e}")
+            self.logger.error(f"Error creating retriever for collection {self.collection_name} with k={self.k}: {e}")
+            raise ValueError(f"Error creating retriever for collection {self.collection_name} with k={self.k}: {e}")
+
+    def search(self, question: str) -> List[Tuple[LangchainDocument, float]]:
+        """
+        Search the collection with the configured retrieval mode, optionally reranking the candidates.
+
+        Args:
+            question (str): The question to search for.
 
+        Returns:
+            List[Tuple[LangchainDocument, float]]: The top-k documents with their scores.
+        """
+        vectorstore = self._vectorstore()
+        fetch_k = self.k * RERANK_FETCH_MULTIPLIER if self.rerank else self.k
         try:
-            return vectorstore.as_retriever(search_kwargs={"k": self.k})
+            results = vectorstore.similarity_search_with_score(question, k=fetch_k)
         except Exception as e:
-            self.logger.error(f"Error creating retriever for collection {self.collection_name} with k={self.k}: {e}")
-            raise ValueError(f"Error creating retriever for collection {self.collection_name} with k={self.k}: {e}")
\ No newline at end of file
+            self.logger.error(f"Error searching collection {self.collection_name}: {e}")
+            raise ValueError(f"Error searching collection {self.collection_name}: {e}")
+
+        if not self.rerank:
+            return results
+        return get_reranker().rerank(question, [document for document, _ in results], k=self.k)
+
+    def _query_request(self, dense: Optional[List[float]], sparse) -> models.QueryRequest:
+        """Build the Qdrant query of one question for the configured retrieval mode."""
+        dense_query = dict(query=dense, using=QdrantVectorStore.VECTOR_NAME)
+        sparse_query = dict(query=models.SparseVector(indices=sparse.indices, values=sparse.values),
+                            using=QdrantVectorStore.SPARSE_VECTOR_NAME) if sparse is not None else None
+        if self.retrieval_mode == RetrievalMode.DENSE:
+            return models.QueryRequest(**dense_query, limit=self.k, with_payload=True)
+        if self.retrieval_mode == RetrievalMode.SPARSE:
+            return models.QueryRequest(**sparse_query, limit=self.k, with_payload=True)
+        return models.QueryRequest(
+            prefetch=[models.Prefetch(**dense_query, limit=self.k), models.Prefetch(**sparse_query, limit=self.k)],
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            limit=self.k,
+            with_payload=True,
+        )
+
+    def search_chunks(self, questions: List[str]) -> List[List[Chunk]]:
+        """
+        Search many questions with one embedding call and one Qdrant round trip.
+
+        Args:
+            questions (List[str]): The questions to search for.
+
+        Returns:
+            List[List[Chunk]]: The top-k chunks of each question, in input order.
+        """
+        if not questions:
+            return []
+        try:
+            dense_vectors = [None] * len(questions)
+            sparse_vectors = [None] * len(questions)
+            if self.retrieval_mode != RetrievalMode.SPARSE:
+                embeddings = get_embeddings()
+                embed_queries = getattr(embeddings, "embed_queries", embeddings.embed_documents)
+                dense_vectors = embed_queries(questions)
+            if self.retrieval_mode != RetrievalMode.DENSE:
+                sparse_vectors = [get_sparse_embeddings(self.collection_name).embed_query(question) for question in questions]
+            responses = (self.client or get_qdrant_client()).query_batch_points(
+                collection_name=self.collection_name,
+                requests=[self._query_request(dense, sparse) for dense, sparse in zip(dense_vectors, sparse_vectors)],
+            )
+        except Exception as e:
+            self.logger.error(f"Error running batch search on collection {self.collection_name}: {e}")
+            raise ValueError(f"Error running batch search on collection {self.collection_name}: {e}")
+
+        return [[Chunk.from_point(point) for point in response.points] for response in responses]
+
+    def batch_search(self, questions: List[str]) -> List[List[LangchainDocument]]:
+        """
+        Same as search_chunks, converted to LangchainDocuments for LangChain consumers.
+
+        Args:
+            questions (List[str]): The questions to search for.
+
+        Returns:
+            List[List[LangchainDocument]]: The top-k documents of each question, in input order.
+        """
+        return [to_documents(chunks) for chunks in self.search_chunks(questions)]
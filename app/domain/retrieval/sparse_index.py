@@ -0,0 +1,412 @@
+"""
+This module contains the Vietnamese BM25 sparse encoder and the per-collection statistics it relies on.
+
+Qdrant applies the IDF part of BM25 server-side (sparse vectors created with ``Modifier.IDF``), so documents are
+encoded with the saturated term-frequency part only and queries with unit weights. The average document length
+needed for the length normalisation is kept per collection and updated incrementally as chunks are added or
+removed.
+
+Tokenizing is the costly part of encoding, so the term frequencies of every encoded text are persisted by content
+hash in the same SQLite database: re-ingesting a document or re-encoding a collection, in any process, only
+recomputes the BM25 weights, which depend on the current average length.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+from array import array
+from collections import Counter, OrderedDict
+from typing import Dict, Iterable, List, Optional
+
+from langchain_qdrant import SparseEmbeddings, SparseVector
+
+from api.logging_theme import setup_logger
+from utils.text import normalize_text, syllable_ngrams
+
+SPARSE_INDEX_PATH = os.getenv("SPARSE_INDEX_PATH", "data/sparse_index.sqlite3")
+SPARSE_FOLD_DIACRITICS = os.getenv("SPARSE_FOLD_DIACRITICS", "true").lower() == "true"
+SPARSE_MAX_NGRAM = int(os.getenv("SPARSE_MAX_NGRAM", "2"))
+SPARSE_CACHE_SIZE = int(os.getenv("SPARSE_CACHE_SIZE", "50000"))
+# Texts looked up per query in the persisted term-frequency cache (SQLite's default limit is 32766 parameters)
+_LOOKUP_BATCH_SIZE = 500
+BM25_K1 = float(os.getenv("BM25_K1", "1.2"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+# Average chunk length (in terms) assumed until a collection has statistics
+DEFAULT_AVG_DOC_LENGTH = 256.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS collection_stats (
+    collection TEXT PRIMARY KEY,
+    doc_count INTEGER NOT NULL,
+    total_length INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS term_freqs (
+    tokenizer TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    token_ids BLOB NOT NULL,
+    counts BLOB NOT NULL,
+    PRIMARY KEY (tokenizer, content_hash)
+) WITHOUT ROWID;
+-- Document frequencies used to be kept here, Qdrant's IDF modifier computes them
+DROP TABLE IF EXISTS doc_freq;
+"""
+
+
+def term_id(term: str) -> int:
+    """
+    Stable sparse index of a term, shared by every process and collection
+    Args:
+        term (str): normalized term
+    Returns:
+        int: unsigned 32-bit id
+    """
+    return zlib.crc32(term.encode("utf-8"))
+
+
+def _pack(values: Iterable[int]) -> bytes:
+    return array("I", values).tobytes()
+
+
+def _unpack(blob: bytes) -> array:
+    values = array("I")
+    values.frombytes(blob)
+    return values
+
+
+def content_hash(text: str) -> str:
+    """
+    Cache key of a text
+    Args:
+        text (str): raw text
+    Returns:
+        str: hex digest
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class VietnameseTokenizer:
+    """
+    Syllable n-gram tokenizer: NFC, lowercase, punctuation removed and, by default, diacritics folded so that
+    "diem chuan" and "điểm chuẩn" share terms. Vietnamese words are written as space-separated syllables, so
+    syllable bigrams approximate word segmentation without a dictionary.
+    """
+    def __init__(self, fold: bool = SPARSE_FOLD_DIACRITICS, max_n: int = SPARSE_MAX_NGRAM,
+                 cache_size: int = SPARSE_CACHE_SIZE):
+        self.fold = fold
+        self.max_n = max_n
+        self.cache_size = cache_size
+        # Term frequencies are only reusable with the same normalization and n-gram size
+        self.name = f"syllables:fold={fold}:max_n={max_n}"
+        self._cache: "OrderedDict[str, Dict[int, int]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def terms(self, text: str) -> List[str]:
+        """
+        Terms of a text, unigrams first
+        Args:
+            text (str): raw text
+        Returns:
+            List[str]: terms, with repetitions
+        """
+        return syllable_ngrams(normalize_text(text, fold=self.fold), max_n=self.max_n)
+
+    def cached(self, key: str) -> Optional[Dict[int, int]]:
+        """
+        Term frequencies of a text in the in-process cache
+        Args:
+            key (str): content hash of the text
+        Returns:
+            Optional[Dict[int, int]]: term frequencies, or None
+        """
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+            return cached
+
+    def remember(self, key: str, frequencies: Dict[int, int]):
+        """
+        Add the term frequencies of a text to the in-process cache
+        Args:
+            key (str): content hash of the text
+            frequencies (Dict[int, int]): term frequencies
+        """
+        with self._lock:
+            self._cache[key] = frequencies
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def count_terms(self, text: str) -> Dict[int, int]:
+        """
+        Term id -> count of a text, without any cache
+        Args:
+            text (str): raw text
+        Returns:
+            Dict[int, int]: term frequencies
+        """
+        return dict(Counter(term_id(term) for term in self.terms(text)))
+
+    def term_frequencies(self, text: str) -> Dict[int, int]:
+        """
+        Term id -> count of a text, cached in process by content hash
+        Args:
+            text (str): raw text
+        Returns:
+            Dict[int, int]: term frequencies
+        """
+        key = content_hash(text)
+        frequencies = self.cached(key)
+        if frequencies is None:
+            frequencies = self.count_terms(text)
+            self.remember(key, frequencies)
+        return frequencies
+
+    def cache_clear(self):
+        """Drop every cached term frequency"""
+        with self._lock:
+            self._cache.clear()
+
+
+class SparseIndexStats:
+    """
+    Per-collection document count and total length, and the persisted term frequencies of encoded texts, in SQLite.
+    """
+    def __init__(self, db_path: str = SPARSE_INDEX_PATH, tokenizer: Optional[VietnameseTokenizer] = None):
+        self.db_path = db_path
+        self.tokenizer = tokenizer or VietnameseTokenizer()
+        self.logger = setup_logger(__name__)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(_SCHEMA)
+
+    def term_frequencies(self, texts: List[str]) -> List[Dict[int, int]]:
+        """
+        Term frequencies of many texts, from the in-process cache, then from the database; only texts that were
+        never encoded, by any process, are tokenized (and stored).
+
+        Args:
+            texts (List[str]): Raw texts.
+
+        Returns:
+            List[Dict[int, int]]: Term frequencies of each text, in input order.
+        """
+        keys = [content_hash(text) for text in texts]
+        frequencies = {key: self.tokenizer.cached(key) for key in keys}
+        missing = [key for key, value in frequencies.items() if value is None]
+        for start in range(0, len(missing), _LOOKUP_BATCH_SIZE):
+            batch = missing[start:start + _LOOKUP_BATCH_SIZE]
+            with self._lock:
+                rows = self.connection.execute(
+                    f"SELECT content_hash, token_ids, counts FROM term_freqs "
+                    f"WHERE tokenizer = ? AND content_hash IN ({', '.join('?' * len(batch))})",
+                    (self.tokenizer.name, *batch),
+                ).fetchall()
+            for key, token_ids, counts in rows:
+                frequencies[key] = dict(zip(_unpack(token_ids), _unpack(counts)))
+                self.tokenizer.remember(key, frequencies[key])
+
+        counted = {}
+        for key, text in zip(keys, texts):
+            if frequencies[key] is None:
+                frequencies[key] = counted[key] = self.tokenizer.count_terms(text)
+                self.tokenizer.remember(key, counted[key])
+        if counted:
+            with self._lock, self.connection:
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO term_freqs VALUES (?, ?, ?, ?)",
+                    [(self.tokenizer.name, key, _pack(value.keys()), _pack(value.values()))
+                     for key, value in counted.items()],
+                )
+        return [frequencies[key] for key in keys]
+
+    def _update(self, collection_name: str, texts: Iterable[str], sign: int) -> int:
+        all_frequencies = self.term_frequencies(list(texts))
+        doc_count = len(all_frequencies)
+        total_length = sum(sum(frequencies.values()) for frequencies in all_frequencies)
+        if not doc_count:
+            return 0
+        with self._lock, self.connection:
+            self.connection.execute(
+                """
+                INSERT INTO collection_stats VALUES (?, ?, ?)
+                ON CONFLICT (collection) DO UPDATE SET
+                    doc_count = MAX(doc_count + excluded.doc_count, 0),
+                    total_length = MAX(total_length + excluded.total_length, 0)
+                """,
+                (collection_name, sign * doc_count, sign * total_length),
+            )
+        return doc_count
+
+    def add_documents(self, collection_name: str, texts: Iterable[str]) -> int:
+        """
+        Count new chunks in the statistics of a collection.
+
+        Args:
+            collection_name (str): Collection the chunks are added to.
+            texts (Iterable[str]): Chunk texts.
+
+        Returns:
+            int: Number of counted chunks.
+        """
+        return self._update(collection_name, texts, 1)
+
+    def remove_documents(self, collection_name: str, texts: Iterable[str]) -> int:
+        """
+        Remove deleted chunks from the statistics of a collection.
+
+        Args:
+            collection_name (str): Collection the chunks were removed from.
+            texts (Iterable[str]): Texts of the removed chunks.
+
+        Returns:
+            int: Number of uncounted chunks.
+        """
+        return self._update(collection_name, texts, -1)
+
+    def copy_collection(self, source: str, target: str):
+        """
+        Replace the statistics of a collection by those of another, e.g. after a migration or a snapshot import.
+
+        Args:
+            source (str): Collection to copy from.
+            target (str): Collection to copy to.
+        """
+        with self._lock, self.connection:
+            self._delete_collection(target)
+            self.connection.execute(
+                "INSERT INTO collection_stats SELECT ?, doc_count, total_length FROM collection_stats "
+                "WHERE collection = ?", (target, source))
+
+    def export_collection(self, collection_name: str) -> dict:
+        """
+        Every statistic of a collection, for snapshots.
+
+        Args:
+            collection_name (str): Collection name.
+
+        Returns:
+            dict: "doc_count" and "total_length".
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT doc_count, total_length FROM collection_stats WHERE collection = ?", (collection_name,)
+            ).fetchone() or (0, 0)
+        return {"doc_count": row[0], "total_length": row[1]}
+
+    def import_collection(self, collection_name: str, doc_count: int, total_length: int):
+        """
+        Replace the statistics of a collection by exported ones.
+
+        Args:
+            collection_name (str): Collection name.
+            doc_count (int): Number of chunks.
+            total_length (int): Total number of terms.
+        """
+        with self._lock, self.connection:
+            self._delete_collection(collection_name)
+            self.connection.execute("INSERT INTO collection_stats VALUES (?, ?, ?)",
+                                    (collection_name, int(doc_count), int(total_length)))
+
+    def _delete_collection(self, collection_name: str):
+        self.connection.execute("DELETE FROM collection_stats WHERE collection = ?", (collection_name,))
+
+    def drop_collection(self, collection_name: str):
+        """
+        Forget every statistic of a collection.
+
+        Args:
+            collection_name (str): Collection to forget.
+        """
+        with self._lock, self.connection:
+            self._delete_collection(collection_name)
+
+    def average_length(self, collection_name: str) -> float:
+        """
+        Average chunk length, in terms, of a collection.
+
+        Args:
+            collection_name (str): Collection name.
+
+        Returns:
+            float: Average length, DEFAULT_AVG_DOC_LENGTH when the collection has no statistics.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT doc_count, total_length FROM collection_stats WHERE collection = ?", (collection_name,)
+            ).fetchone()
+        if not row or not row[0]:
+            return DEFAULT_AVG_DOC_LENGTH
+        return row[1] / row[0]
+
+    def document_count(self, collection_name: str) -> int:
+        """
+        Number of counted chunks of a collection.
+
+        Args:
+            collection_name (str): Collection name.
+
+        Returns:
+            int: Chunk count.
+        """
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT doc_count FROM collection_stats WHERE collection = ?", (collection_name,)
+            ).fetchone()
+        return row[0] if row else 0
+
+
+class VietnameseBM25SparseEmbeddings(SparseEmbeddings):
+    """
+    BM25 sparse encoder for Vietnamese text, meant for sparse vectors with the Qdrant IDF modifier.
+    """
+    def __init__(self, collection_name: Optional[str] = None, stats: Optional[SparseIndexStats] = None,
+                 k1: float = BM25_K1, b: float = BM25_B):
+        self.collection_name = collection_name
+        self.stats = stats
+        self.tokenizer = stats.tokenizer if stats else VietnameseTokenizer()
+        self.k1 = k1
+        self.b = b
+
+    def _average_length(self) -> float:
+        if self.stats is None or self.collection_name is None:
+            return DEFAULT_AVG_DOC_LENGTH
+        return self.stats.average_length(self.collection_name)
+
+    def _encode_document(self, frequencies: Dict[int, int], average_length: float) -> SparseVector:
+        length_norm = self.k1 * (1 - self.b + self.b * sum(frequencies.values()) / average_length)
+        indices = sorted(frequencies)
+        return SparseVector(
+            indices=indices,
+            values=[frequencies[index] * (self.k1 + 1) / (frequencies[index] + length_norm) for index in indices],
+        )
+
+    def embed_documents(self, texts: List[str]) -> List[SparseVector]:
+        """
+        Encode chunks with saturated, length-normalized term frequencies.
+
+        Args:
+            texts (List[str]): Chunk texts.
+
+        Returns:
+            List[SparseVector]: One sparse vector per text.
+        """
+        average_length = self._average_length()
+        frequencies = self.stats.term_frequencies(texts) if self.stats is not None \
+            else [self.tokenizer.term_frequencies(text) for text in texts]
+        return [self._encode_document(text_frequencies, average_length) for text_frequencies in frequencies]
+
+    def embed_query(self, text: str) -> SparseVector:
+        """
+        Encode a query with unit weights; Qdrant multiplies them by the IDF of each term.
+
+        Args:
+            text (str): The query.
+
+        Returns:
+            SparseVector: The query vector.
+        """
+        indices = sorted(self.tokenizer.term_frequencies(text))
+        return SparseVector(indices=indices, values=[1.0] * len(indices))
@@ -0,0 +1,263 @@
+"""
+This module contains a SQLite row store for tables extracted from ingested documents, with exact entity lookup.
+"""
+import os
+import sqlite3
+import threading
+import uuid
+from typing import List, Optional
+
+from api.logging_theme import setup_logger
+from domain.retrieval.chunk import Chunk
+from utils.text import normalize_text, syllable_ngrams
+
+TABLE_STORE_PATH = os.getenv("TABLE_STORE_PATH", "data/tables.sqlite3")
+# Single syllables ("hoc", "phi", "nganh") match too many key cells; they only count when they look like codes
+TABLE_MIN_MATCH_SYLLABLES = int(os.getenv("TABLE_MIN_MATCH_SYLLABLES", "2"))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tables (
+    table_id TEXT PRIMARY KEY,
+    collection TEXT NOT NULL,
+    file_path TEXT NOT NULL,
+    caption TEXT
+);
+CREATE INDEX IF NOT EXISTS tables_collection ON tables (collection);
+CREATE TABLE IF NOT EXISTS columns (
+    table_id TEXT NOT NULL,
+    col_idx INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    name_norm TEXT NOT NULL,
+    is_key INTEGER NOT NULL,
+    PRIMARY KEY (table_id, col_idx)
+);
+CREATE TABLE IF NOT EXISTS cells (
+    table_id TEXT NOT NULL,
+    row_idx INTEGER NOT NULL,
+    col_idx INTEGER NOT NULL,
+    value TEXT NOT NULL,
+    value_norm TEXT NOT NULL,
+    is_key INTEGER NOT NULL,
+    PRIMARY KEY (table_id, row_idx, col_idx)
+);
+CREATE INDEX IF NOT EXISTS cells_key_value ON cells (value_norm) WHERE is_key = 1;
+"""
+
+
+def _is_entity_ngram(ngram: str) -> bool:
+    """Multi-syllable phrases, and single tokens with a digit such as major codes or subject groups (a00, 7340101)"""
+    return len(ngram.split()) >= TABLE_MIN_MATCH_SYLLABLES or (len(ngram) >= 3 and any(c.isdigit() for c in ngram))
+
+
+def _is_numeric(value: str) -> bool:
+    try:
+        float(value.replace(",", ".").replace(" ", ""))
+        return True
+    except ValueError:
+        return False
+
+
+class TableStore:
+    """
+    Columnar-ish store of extracted tables: one row per cell, with an index on the normalized values of key
+    (mostly non-numeric) columns, such as major names or admission methods.
+    """
+    def __init__(self, db_path: str = TABLE_STORE_PATH):
+        self.db_path = db_path
+        self.logger = setup_logger(__name__)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False)
+        self.connection.executescript(_SCHEMA)
+
+    def save_table(self, collection_name: str, file_path: str, table_index: int, table_df,
+                   caption: Optional[str] = None) -> str:
+        """
+        Store (or replace) one table.
+
+        Args:
+            collection_name (str): Collection the source document was ingested into.
+            file_path (str): Source file name.
+            table_index (int): Position of the table in the document.
+            table_df (pd.DataFrame): Table, after header detection and merging.
+            caption (Optional[str]): Table caption.
+
+        Returns:
+            str: Id of the stored table.
+        """
+        table_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{collection_name}|{file_path}|{table_index}"))
+        rows = [[str(value).strip() for value in row] for row in table_df.itertuples(index=False)]
+        columns = [str(name).strip() for name in table_df.columns]
+        key_columns = [
+            sum(not _is_numeric(row[col]) for row in rows if row[col]) > len(rows) / 2
+            for col in range(len(columns))
+        ]
+        with self._lock, self.connection:
+            for table in ("cells", "columns", "tables"):
+                self.connection.execute(f"DELETE FROM {table} WHERE table_id = ?", (table_id,))
+            self.connection.execute("INSERT INTO tables VALUES (?, ?, ?, ?)",
+                                    (table_id, collection_name, file_path, caption))
+            self.connection.executemany(
+                "INSERT INTO columns VALUES (?, ?, ?, ?, ?)",
+                [(table_id, col, name, normalize_text(name), int(key_columns[col])) for col, name in enumerate(columns)],
+            )
+            self.connection.executemany(
+                "INSERT INTO cells VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (table_id, row_idx, col, value, normalize_text(value), int(key_columns[col]))
+                    for row_idx, row in enumerate(rows)
+                    for col, value in enumerate(row)
+                ],
+            )
+        return table_id
+
+    def save_tables(self, collection_name: str, file_path: str, tables: list) -> int:
+        """
+        Store every table extracted from a document.
+
+        Args:
+            collection_name (str): Collection the document was ingested into.
+            file_path (str): Source file name.
+            tables (list): (DataFrame, caption) pairs in document order.
+
+        Returns:
+            int: Number of stored tables.
+        """
+        try:
+            for table_index, (table_df, caption) in enumerate(tables):
+                self.save_table(collection_name, file_path, table_index, table_df, caption)
+            self.logger.info(f"Stored {len(tables)} tables of {file_path} for collection {collection_name}")
+            return len(tables)
+        except Exception as e:
+            self.logger.error(f"Error storing tables of {file_path}: {e}")
+            raise ValueError(f"Error storing tables of {file_path}: {e}")
+
+    def delete_file(self, collection_name: str, file_path: str) -> int:
+        """
+        Delete every table extracted from a document.
+
+        Args:
+            collection_name (str): Collection the document was ingested into.
+            file_path (str): Source file name.
+
+        Returns:
+            int: Number of deleted tables.
+        """
+        with self._lock, self.connection:
+            table_ids = [row[0] for row in self.connection.execute(
+                "SELECT table_id FROM tables WHERE collection = ? AND file_path = ?", (collection_name, file_path)
+            ).fetchall()]
+            for table in ("cells", "columns", "tables"):
+                self.connection.executemany(f"DELETE FROM {table} WHERE table_id = ?", [(tid,) for tid in table_ids])
+        self.logger.info(f"Deleted {len(table_ids)} tables of {file_path} from collection {collection_name}")
+        return len(table_ids)
+
+    def export_collection(self, collection_name: str) -> List[dict]:
+        """
+        Every stored table of a collection, for snapshots.
+
+        Args:
+            collection_name (str): Collection name.
+
+        Returns:
+            List[dict]: One {"table", "columns", "cells"} record of raw rows per table.
+        """
+        with self._lock:
+            tables = self.connection.execute("SELECT * FROM tables WHERE collection = ?", (collection_name,)).fetchall()
+            return [
+                {
+                    "table": list(table),
+                    "columns": [list(row) for row in self.connection.execute(
+                        "SELECT * FROM columns WHERE table_id = ?", (table[0],)).fetchall()],
+                    "cells": [list(row) for row in self.connection.execute(
+                        "SELECT * FROM cells WHERE table_id = ?", (table[0],)).fetchall()],
+                }
+                for table in tables
+            ]
+
+    def import_collection(self, collection_name: str, records: List[dict]) -> int:
+        """
+        Replace the tables of a collection by exported ones.
+
+        Args:
+            collection_name (str): Collection name, which may differ from the exported one.
+            records (List[dict]): Records from export_collection.
+
+        Returns:
+            int: Number of imported tables.
+        """
+        with self._lock, self.connection:
+            table_ids = [row[0] for row in self.connection.execute(
+                "SELECT table_id FROM tables WHERE collection = ?", (collection_name,)).fetchall()]
+            for table in ("cells", "columns", "tables"):
+                self.connection.executemany(f"DELETE FROM {table} WHERE table_id = ?", [(tid,) for tid in table_ids])
+            for record in records:
+                table_id, source_collection, file_path, caption = record["table"]
+                if source_collection != collection_name:
+                    table_id = str(uuid.uuid5(uuid.NAMESPACE_URL, f"{collection_name}|{table_id}"))
+                self.connection.execute("INSERT OR REPLACE INTO tables VALUES (?, ?, ?, ?)",
+                                        (table_id, collection_name, file_path, caption))
+                self.connection.executemany("INSERT OR REPLACE INTO columns VALUES (?, ?, ?, ?, ?)",
+                                            [(table_id, *row[1:]) for row in record["columns"]])
+                self.connection.executemany("INSERT OR REPLACE INTO cells VALUES (?, ?, ?, ?, ?, ?)",
+                                            [(table_id, *row[1:]) for row in record["cells"]])
+        self.logger.info(f"Imported {len(records)} tables into collection {collection_name}")
+        return len(records)
+
+    def lookup(self, collection_name: str, question: str, max_rows: int = 10) -> List[Chunk]:
+        """
+        Find table rows whose key cell is mentioned in the question, keeping only the key columns and the
+        columns whose header best matches the question (all columns when none matches). Rows matching more
+        key cells, then longer ones, come first.
+
+        Args:
+            collection_name (str): Collection to search.
+            question (str): The user's question.
+            max_rows (int): Maximum number of rows to return.
+
+        Returns:
+            List[Chunk]: One chunk per matched row, formatted as "caption: column=value, ...".
+        """
+        normalized_question = normalize_text(question)
+        ngrams = [ngram for ngram in syllable_ngrams(normalized_question, max_n=6) if _is_entity_ngram(ngram)]
+        if not ngrams:
+            return []
+
+        with self._lock:
+            matches = self.connection.execute(
+                f"""
+                SELECT cells.table_id, cells.row_idx, tables.file_path, tables.caption
+                FROM cells JOIN tables ON tables.table_id = cells.table_id
+                WHERE cells.is_key = 1 AND cells.value_norm IN ({", ".join("?" * len(ngrams))})
+                  AND tables.collection = ?
+                GROUP BY cells.table_id, cells.row_idx
+                ORDER BY COUNT(DISTINCT cells.value_norm) DESC, MAX(LENGTH(cells.value_norm)) DESC
+                LIMIT ?
+                """,
+                (*ngrams, collection_name, max_rows),
+            ).fetchall()
+
+            rows = []
+            question_terms = set(ngrams)
+            for table_id, row_idx, file_path, caption in matches:
+                columns = self.connection.execute(
+                    "SELECT col_idx, name, name_norm, is_key FROM columns WHERE table_id = ? ORDER BY col_idx",
+                    (table_id,),
+                ).fetchall()
+                overlaps = {
+                    col: len(question_terms & set(syllable_ngrams(name_norm, max_n=3)))
+                    for col, _, name_norm, is_key in columns if not is_key
+                }
+                best_overlap = max(overlaps.values(), default=0)
+                mentioned = {col for col, overlap in overlaps.items() if best_overlap and overlap == best_overlap}
+                wanted = {col for col, _, _, is_key in columns if is_key or col in mentioned or not mentioned}
+                values = dict(self.connection.execute(
+                    "SELECT col_idx, value FROM cells WHERE table_id = ? AND row_idx = ?", (table_id, row_idx)
+                ).fetchall())
+                cells = ", ".join(f"{name}={values.get(col, '')}" for col, name, _, _ in columns if col in wanted)
+                rows.append(Chunk(id=f"{table_id}:{row_idx}", score=1.0,
+                                  text=f"{caption}: {cells}" if caption else cells, source=file_path,
+                                  metadata={"file_path": file_path, "table_id": table_id, "row": row_idx}))
+
+        self.logger.info(f"Table lookup matched {len(rows)} rows in collection {collection_name}")
+        return rows
@@ -1,19 +1,25 @@
 """
 This module contains functions to connect to Qdrant with a specific collection.
 """
+from typing import Optional
+
 from langchain_qdrant import QdrantVectorStore, RetrievalMode
+from qdrant_client import QdrantClient
 
 from api.logging_theme import setup_logger
-from utils.configs import embeddings, spare_embeddings
+from utils.configs import get_embeddings, get_sparse_embeddings, get_qdrant_client
 
 
 class VectorStore:
     """
     This class contains functions to connect to Qdrant with a specific collection.
     """
-    def __init__(self, collection_name):
+    def __init__(self, collection_name, retrieval_mode: RetrievalMode = RetrievalMode.HYBRID,
+                 client: Optional[QdrantClient] = None):
         self.logger = setup_logger(__name__)
         self.collection_name: str = collection_name
+        self.retrieval_mode = retrieval_mode
+        self.client = client
 
 
     def get_vectorstore(self) -> QdrantVectorStore:
@@ -27,13 +33,12 @@ class VectorStore:
         """
         try:
             self.logger.info(f"Connecting to Qdrant collection: {self.collection_name}")
-            vectorstore = QdrantVectorStore.from_existing_collection(
+            vectorstore = QdrantVectorStore(
+                client=self.client or get_qdrant_client(),
                 collection_name=self.collection_name,
-                url="http://qdrant:6333/",
-                prefer_grpc=True,
-                embedding=embeddings,
-                retrieval_mode=RetrievalMode.HYBRID,
-                sparse_embedding=spare_embeddings
+                embedding=get_embeddings(),
+                retrieval_mode=self.retrieval_mode,
+                sparse_embedding=get_sparse_embeddings(self.collection_name)
             )
             self.logger.info("Successfully connected to Qdrant collection")
             return vectorstore
@@ -0,0 +1,113 @@
+"""
+OpenAI-compatible local stand-in chat server for tests and offline development.
+
+It answers /v1/chat/completions (streamed or not) with a canned reply after a configurable delay, and returns
+schema-shaped default arguments for tool calls and JSON-schema response formats, so structured-output callers
+(the FAQ validator) work too. Point the router at it with LOCAL_LLM_BASE_URL=http://localhost:8001/v1.
+
+    cd app && uvicorn external_services.local_llm_server:app --port 8001
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+LOCAL_LLM_LATENCY_MS = float(os.getenv("LOCAL_LLM_LATENCY_MS", "50"))
+LOCAL_LLM_REPLY = os.getenv("LOCAL_LLM_REPLY", "Đây là câu trả lời thử nghiệm từ máy chủ LLM cục bộ.")
+
+app = FastAPI()
+
+
+def _default_arguments(schema: dict) -> dict:
+    """Fill every property of a JSON schema with a neutral default value."""
+    defaults = {"boolean": False, "integer": 0, "number": 0, "string": "", "array": [], "object": {}}
+    return {
+        name: prop.get("default", defaults.get(prop.get("type"), None))
+        for name, prop in schema.get("properties", {}).items()
+    }
+
+
+def _usage(body: dict, completion_tokens: int) -> dict:
+    prompt_tokens = sum(len(str(message.get("content", ""))) // 4 for message in body.get("messages", []))
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": 0},
+    }
+
+
+def _message(body: dict) -> dict:
+    if body.get("tools"):
+        function = body["tools"][0]["function"]
+        return {
+            "role": "assistant",
+            "content": None,
+            "tool_calls": [{
+                "id": f"call_{uuid.uuid4().hex[:12]}",
+                "type": "function",
+                "function": {
+                    "name": function["name"],
+                    "arguments": json.dumps(_default_arguments(function.get("parameters", {}))),
+                },
+            }],
+        }
+    response_format = body.get("response_format") or {}
+    if response_format.get("type") == "json_schema":
+        content = json.dumps(_default_arguments(response_format["json_schema"].get("schema", {})))
+    else:
+        content = LOCAL_LLM_REPLY
+    return {"role": "assistant", "content": content}
+
+
+@app.get("/v1/models")
+async def list_models():
+    """API listing the stand-in model"""
+    return {"object": "list", "data": [{"id": "local-stand-in", "object": "model", "owned_by": "local"}]}
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    """API answering chat completions like the OpenAI endpoint"""
+    body = await request.json()
+    await asyncio.sleep(LOCAL_LLM_LATENCY_MS / 1000)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+    created = int(time.time())
+    model = body.get("model", "local-stand-in")
+    message = _message(body)
+
+    if not body.get("stream"):
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": created,
+            "model": model,
+            "choices": [{"index": 0, "message": message,
+                         "finish_reason": "tool_calls" if message.get("tool_calls") else "stop"}],
+            "usage": _usage(body, len(str(message.get("content") or "")) // 4),
+        }
+
+    async def events():
+        def chunk(delta: dict, finish_reason=None, usage=None) -> str:
+            payload = {"id": completion_id, "object": "chat.completion.chunk", "created": created, "model": model,
+                       "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}] if usage is None else []}
+            if usage is not None:
+                payload["usage"] = usage
+            return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+        yield chunk({"role": "assistant", "content": ""})
+        if message.get("tool_calls"):
+            yield chunk({"tool_calls": [{"index": 0, **message["tool_calls"][0]}]})
+        else:
+            for word in message["content"].split(" "):
+                yield chunk({"content": word + " "})
+        yield chunk({}, finish_reason="tool_calls" if message.get("tool_calls") else "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            yield chunk({}, usage=_usage(body, len(message.get("content") or "") // 4))
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
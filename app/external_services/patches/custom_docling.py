@@ -1,7 +1,12 @@
+import os
+
 import pandas as pd
 from docling_core.transforms.chunker import HierarchicalChunker
 from docling_core.types.doc.document import TableItem
 
+# Minimum ratio of matching columns for two leading rows to be merged into one header
+HEADER_MERGE_THRESHOLD = float(os.getenv("HEADER_MERGE_THRESHOLD", "0.6"))
+
 def detect_and_merge_header(df, threshold=0.6):
     """
     Detect and merge header rows in a DataFrame.
@@ -84,7 +89,7 @@ def export_to_dataframe_new(self) -> pd.DataFrame:
     # print("⚡ export_to_dataframe_new is called!")
     df = original_function(self)
 
-    df_new, check = detect_and_merge_header(df)
+    df_new, check = detect_and_merge_header(df, threshold=HEADER_MERGE_THRESHOLD)
     if check:
         return df_new
     else:
@@ -0,0 +1,35 @@
+"""
+Gunicorn configuration for production serving: preload the app, load the
+sparse model once in the master, then fork uvicorn workers that share its
+memory pages. There is no reload; session and cache state live in the state
+backend (STATE_BACKEND), so workers and nodes are interchangeable.
+
+On SIGTERM each worker stops accepting connections and lets in-flight SSE
+streams finish for up to GRACEFUL_TIMEOUT seconds before it is killed.
+
+    gunicorn main:app -c gunicorn.conf.py
+"""
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8000')}"
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+loglevel = os.getenv("LOG_LEVEL", "info")
+preload_app = os.getenv("PRELOAD_APP", "true").lower() == "true"
+reload = False
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "60"))
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+
+
+def on_starting(server):
+    """
+    Load the sparse model in the master so forked workers inherit it copy-on-write.
+
+    The local dense model is an onnxruntime session with its own thread pool,
+    which does not survive a fork, so it is warmed up per worker in the lifespan.
+    """
+    if preload_app:
+        from api.lifespan import warm_up_sparse_model
+
+        warm_up_sparse_model()
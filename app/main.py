@@ -4,13 +4,11 @@ Main server file
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from routers import file_uploading, pipeline
-from external_services.patches.custom_docling import export_to_dataframe_new
-from external_services.patches.custom_docling import TableItem
+from api.lifespan import lifespan
+from domain.ingestion.uploads import UploadSizeLimitMiddleware
+from routers import admin, file_uploading, health, pipeline
 
-TableItem.export_to_dataframe = export_to_dataframe_new
-
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -21,6 +19,13 @@ app.add_middleware(
     allow_headers=["*"]
 )
 
+# Upload bodies are capped while they are received, before the multipart file is spooled
+app.add_middleware(UploadSizeLimitMiddleware)
+
 app.include_router(file_uploading.router)
 
-app.include_router(pipeline.router)
\ No newline at end of file
+app.include_router(pipeline.router)
+
+app.include_router(admin.router)
+
+app.include_router(health.router)
@@ -0,0 +1,193 @@
+"""
+Command line tools for maintaining collections.
+
+    cd app && python manage.py <command> --help
+"""
+import argparse
+
+
+def bounded_int(low: int, high: int):
+    """argparse type accepting integers between low and high"""
+    def parse(value: str) -> int:
+        number = int(value)
+        if not low <= number <= high:
+            raise argparse.ArgumentTypeError(f"must be between {low} and {high}")
+        return number
+    return parse
+
+
+def migrate_embeddings(args: argparse.Namespace):
+    """Re-embed a collection with another dense embedding backend"""
+    from domain.ingestion.migration import EmbeddingMigrator
+
+    EmbeddingMigrator(
+        source_collection=args.source,
+        target_collection=args.target,
+        backend=args.backend,
+        batch_size=args.batch_size,
+    ).migrate()
+
+
+def reindex_sparse(args: argparse.Namespace):
+    """Rebuild the sparse statistics of a collection and re-encode its sparse vectors"""
+    from domain.ingestion.migration import SparseReindexer
+
+    SparseReindexer(collection_name=args.collection, batch_size=args.batch_size).reindex()
+
+
+def export_snapshot(args: argparse.Namespace):
+    """Export a collection, its parent sections, tables and sparse statistics to a local archive"""
+    import json
+
+    from domain.ingestion.snapshot import CollectionSnapshot
+
+    manifest = CollectionSnapshot(collection_name=args.collection, batch_size=args.batch_size).export(args.path)
+    print(json.dumps({key: value for key, value in manifest.items() if key != "files"}, indent=2))
+
+
+def import_snapshot(args: argparse.Namespace):
+    """Restore a collection from a local archive with bulk upserts"""
+    from domain.generation.faq_pipline import invalidate_faq_cache
+    from domain.ingestion.snapshot import CollectionSnapshot, read_manifest
+
+    collection = args.collection or read_manifest(args.path)["collection_name"]
+    CollectionSnapshot(collection_name=collection, batch_size=args.batch_size).restore(
+        args.path, overwrite=args.overwrite, parallel=args.parallel)
+    # Running workers rebuild their FAQ index and drop cached answers when the collection version changes
+    invalidate_faq_cache(collection)
+
+
+def batch(args: argparse.Namespace):
+    """Answer a JSONL file of questions and write the answers to JSONL"""
+    import asyncio
+
+    from models.batch import BatchRunner, read_questions
+
+    with open(args.input, encoding="utf-8") as f:
+        questions = read_questions(f)
+    report = asyncio.run(BatchRunner(
+        collection_name=args.collection,
+        output_path=args.output,
+        faq_collection_name=args.faq_collection,
+        concurrency=args.concurrency,
+        batch_size=args.batch_size,
+    ).run(questions))
+    print(report.model_dump_json(indent=2))
+
+
+def _chunk_docx(paths: list, threshold: float) -> list:
+    """Chunk .docx files with the given header-merging threshold"""
+    import asyncio
+    import os
+
+    from fastapi import UploadFile
+
+    import external_services.patches.custom_docling as custom_docling
+    from domain.ingestion.chunking import ChunkProcessor
+
+    custom_docling.HEADER_MERGE_THRESHOLD = threshold
+    chunks = []
+    for path in paths:
+        with open(path, "rb") as f:
+            chunks += asyncio.run(ChunkProcessor().chunking(UploadFile(file=f, filename=os.path.basename(path))))
+    return chunks
+
+
+def evaluate(args: argparse.Namespace):
+    """Measure recall@k, MRR and search latency over a grid of retrieval configurations"""
+    import json
+
+    from langchain_core.documents import Document as LangchainDocument
+    from langchain_qdrant import RetrievalMode
+
+    from domain.evaluation.retrieval_eval import (RetrievalEvaluator, format_report, read_labelled_questions,
+                                                  results_to_json)
+
+    with open(args.questions, encoding="utf-8") as f:
+        questions = read_labelled_questions(f)
+
+    if args.corpus:
+        with open(args.corpus, encoding="utf-8") as f:
+            items = [json.loads(line) for line in f if line.strip()]
+        corpora = {None: [
+            LangchainDocument(page_content=item["page_content"],
+                              metadata={**item.get("metadata", {}), "chunk_id": str(item.get("id", i))})
+            for i, item in enumerate(items)
+        ]}
+    else:
+        corpora = {f"threshold={threshold}": _chunk_docx(args.docx, threshold) for threshold in args.thresholds}
+
+    results = []
+    for label, corpus in corpora.items():
+        results += RetrievalEvaluator(corpus, questions).run_grid(
+            modes=[RetrievalMode(mode) for mode in args.modes],
+            k_values=args.k,
+            rerank_options={"off": [False], "on": [True], "both": [False, True]}[args.rerank],
+            label=label,
+        )
+
+    print(format_report(results))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(results_to_json(results))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HaUI admission chatbot management commands")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subparsers.add_parser("migrate-embeddings", help=migrate_embeddings.__doc__)
+    migrate.add_argument("--source", required=True, help="Existing collection")
+    migrate.add_argument("--target", required=True, help="New collection to create")
+    migrate.add_argument("--backend", required=True, choices=["openai", "fastembed"])
+    migrate.add_argument("--batch-size", type=int, default=256)
+    migrate.set_defaults(func=migrate_embeddings)
+
+    reindex = subparsers.add_parser("reindex-sparse", help=reindex_sparse.__doc__)
+    reindex.add_argument("--collection", required=True)
+    reindex.add_argument("--batch-size", type=int, default=256)
+    reindex.set_defaults(func=reindex_sparse)
+
+    export_parser = subparsers.add_parser("export-snapshot", help=export_snapshot.__doc__)
+    export_parser.add_argument("--collection", required=True)
+    export_parser.add_argument("--path", required=True, help="Archive directory to write")
+    export_parser.add_argument("--batch-size", type=int, default=512)
+    export_parser.set_defaults(func=export_snapshot)
+
+    import_parser = subparsers.add_parser("import-snapshot", help=import_snapshot.__doc__)
+    import_parser.add_argument("--path", required=True, help="Archive directory to read")
+    import_parser.add_argument("--collection", help="Collection to create, defaults to the exported one")
+    import_parser.add_argument("--overwrite", action="store_true", help="Replace the collection if it exists")
+    import_parser.add_argument("--batch-size", type=int, default=512)
+    import_parser.add_argument("--parallel", type=int, default=1, help="Upload processes")
+    import_parser.set_defaults(func=import_snapshot)
+
+    batch_parser = subparsers.add_parser("batch", help=batch.__doc__)
+    batch_parser.add_argument("--input", required=True, help="JSONL file of {\"id\", \"question\"}")
+    batch_parser.add_argument("--output", required=True, help="JSONL results file, appended to when resuming")
+    batch_parser.add_argument("--collection", default="tailieu_ftu")
+    batch_parser.add_argument("--faq-collection", default="faq")
+    batch_parser.add_argument("--concurrency", type=bounded_int(1, 64), default=8, help="Concurrent LLM calls (1-64)")
+    batch_parser.add_argument("--batch-size", type=int, default=32)
+    batch_parser.set_defaults(func=batch)
+
+    evaluate_parser = subparsers.add_parser("evaluate", help=evaluate.__doc__)
+    evaluate_parser.add_argument("--questions", required=True,
+                                 help="JSONL file of {\"question\", \"expected\": [...], \"expected_ids\": [...]}")
+    corpus_group = evaluate_parser.add_mutually_exclusive_group(required=True)
+    corpus_group.add_argument("--corpus", help="JSONL file of {\"id\", \"page_content\", \"metadata\"} chunks")
+    corpus_group.add_argument("--docx", nargs="+", help=".docx files to chunk for each header-merging threshold")
+    evaluate_parser.add_argument("--thresholds", nargs="+", type=float, default=[0.6])
+    evaluate_parser.add_argument("--modes", nargs="+", choices=["dense", "sparse", "hybrid"],
+                                 default=["dense", "sparse", "hybrid"])
+    evaluate_parser.add_argument("--k", nargs="+", type=int, default=[1, 5, 10])
+    evaluate_parser.add_argument("--rerank", choices=["off", "on", "both"], default="off")
+    evaluate_parser.add_argument("--output", help="Write the results as JSON")
+    evaluate_parser.set_defaults(func=evaluate)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,291 @@
+"""
+This module contains the BatchRunner class, which answers many questions offline and writes the results to JSONL.
+"""
+import asyncio
+import fcntl
+import json
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Set
+
+from langchain_core.output_parsers import StrOutputParser
+
+from api.logging_theme import setup_logger
+from domain.generation.faq_pipline import FAQSearcher
+from domain.generation.prompt_assembly import PromptCacheUsageHandler
+from domain.generation.prompt_templates import qa_prompt, qa_prompt_assembler
+from domain.generation.rag_pipeline import RAGPipeline
+from domain.retrieval.chunk import Chunk, pack_context
+from domain.retrieval.context import routed_contexts
+from domain.retrieval.faq_index import FAQ_COLLECTION, aget_faq_index
+from domain.retrieval.routing import QueryRouter
+from domain.retrieval.search import SearchEngine
+from schemas.batch_model import BatchQuestion, BatchReport, BatchResult, BatchStatus
+from utils.tokens import count_tokens
+
+MAX_BATCH_CONCURRENCY = 64
+
+
+class BatchJobRunning(RuntimeError):
+    """
+    Another run of the same batch job holds its lock.
+    """
+
+
+def read_questions(lines: Iterable[str]) -> List[BatchQuestion]:
+    """
+    Parse JSONL lines of {"question": ..., "id": ...} into batch questions. Missing ids default to the line number.
+
+    Args:
+        lines (Iterable[str]): JSONL lines.
+
+    Returns:
+        List[BatchQuestion]: Parsed questions.
+    """
+    questions = []
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            questions.append(BatchQuestion(id=str(item.get("id", line_number)), question=item["question"]))
+        except (ValueError, KeyError, TypeError) as e:
+            raise ValueError(f"Invalid question on line {line_number}: {e}")
+    return questions
+
+
+class BatchRunner:
+    """
+    Answer a batch of questions with the FAQ and RAG pipelines.
+
+    Retrieval is shared: each group of questions is embedded in one call and searched in one Qdrant round trip per
+    collection, identical questions are searched once, and LLM calls run with bounded concurrency. The query router
+    sets the depth and FAQ step of each question (a fixed k when ADAPTIVE_RETRIEVAL is off). Every result is appended
+    to the output file as soon as it is ready, so an interrupted run resumes where it stopped.
+
+    A run holds an exclusive lock on its output file (released by the OS if the process dies), so two runs of the
+    same job never write to it at once, and keeps its progress in "<output>.status.json".
+    """
+    def __init__(self, collection_name: str, output_path: str, faq_collection_name: str = FAQ_COLLECTION,
+                 concurrency: int = 8, batch_size: int = 32, k: int = 10):
+        if not 1 <= concurrency <= MAX_BATCH_CONCURRENCY:
+            raise ValueError(f"concurrency must be between 1 and {MAX_BATCH_CONCURRENCY}")
+        self.collection_name = collection_name
+        self.faq_collection_name = faq_collection_name
+        self.output_path = output_path
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.k = k
+        self.logger = setup_logger(__name__)
+        self._write_lock = asyncio.Lock()
+        self._lock_file = None
+        self.usage_handler = PromptCacheUsageHandler(static_tokens=qa_prompt_assembler.static_tokens)
+
+    def lock(self):
+        """
+        Take the job lock, held until the run ends. Called by run, or before it to fail fast when the run is started
+        in the background.
+
+        Raises:
+            BatchJobRunning: If another run of this job holds the lock.
+        """
+        if self._lock_file is not None:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.output_path)), exist_ok=True)
+        lock_file = open(f"{self.output_path}.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            raise BatchJobRunning(f"Batch job {self.output_path} is already running")
+        self._lock_file = lock_file
+
+    def _unlock(self):
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    @staticmethod
+    def is_running(output_path: str) -> bool:
+        """Whether a run of the job writing to output_path holds its lock."""
+        lock_path = f"{output_path}.lock"
+        if not os.path.exists(lock_path):
+            return False
+        with open(lock_path, "a") as lock_file:
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return True
+        return False
+
+    def _write_status(self, status: BatchStatus):
+        partial_path = f"{self.output_path}.status.json.partial"
+        with open(partial_path, "w", encoding="utf-8") as f:
+            f.write(status.model_dump_json())
+        os.replace(partial_path, f"{self.output_path}.status.json")
+
+    @staticmethod
+    def read_status(output_path: str) -> Optional[BatchStatus]:
+        """
+        Progress of a batch job. A job left "running" by a process that died is reported as "interrupted".
+
+        Args:
+            output_path (str): Output file of the job.
+
+        Returns:
+            Optional[BatchStatus]: The status, or None if the job never started.
+        """
+        try:
+            with open(f"{output_path}.status.json", encoding="utf-8") as f:
+                status = BatchStatus.model_validate_json(f.read())
+        except FileNotFoundError:
+            return None
+        if status.status == "running" and not BatchRunner.is_running(output_path):
+            status.status = "interrupted"
+        return status
+
+    def _completed_ids(self) -> Set[str]:
+        """
+        Ids answered by a previous (possibly interrupted) run. The output file is rewritten with only those results:
+        failed questions are answered again, and a line cut off by the interruption is dropped.
+        """
+        if not os.path.exists(self.output_path):
+            return set()
+        completed: Dict[str, str] = {}
+        with open(self.output_path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    result = BatchResult.model_validate_json(line)
+                except ValueError:
+                    continue
+                if result.error is None and result.answer is not None:
+                    completed[result.id] = line if line.endswith("\n") else line + "\n"
+        partial_path = f"{self.output_path}.partial"
+        with open(partial_path, "w", encoding="utf-8") as f:
+            f.writelines(completed.values())
+        os.replace(partial_path, self.output_path)
+        return set(completed)
+
+    async def _write(self, result: BatchResult):
+        async with self._write_lock:
+            with open(self.output_path, "a", encoding="utf-8") as f:
+                f.write(result.model_dump_json() + "\n")
+
+    async def _answer(self, question: BatchQuestion, faq_answer: Optional[str], faq_chunks: List[Chunk],
+                      rag_chunks: List[Chunk], faq_searcher: FAQSearcher, qa_chain,
+                      semaphore: asyncio.Semaphore) -> BatchResult:
+        async with semaphore:
+            start = time.perf_counter()
+            result = BatchResult(id=question.id, question=question.question)
+            try:
+                if faq_answer is not None:
+                    result.answer, result.source = faq_answer, "faq"
+                elif faq_chunks:
+                    result.answer = await faq_searcher.validate_faq(question.question, faq_chunks[0].to_document())
+                    result.source = "faq" if result.answer else None
+                if result.answer is None:
+                    result.answer = await qa_chain.ainvoke(
+                        {"input": question.question, "context": pack_context(rag_chunks), "chat_history": []},
+                        config={"callbacks": [self.usage_handler]},
+                    )
+                    result.source = "rag"
+            except Exception as e:
+                self.logger.error(f"Error answering question {question.id}: {e}")
+                result.error = str(e)
+            result.latency_ms = (time.perf_counter() - start) * 1000
+            await self._write(result)
+            return result
+
+    async def run(self, questions: List[BatchQuestion]) -> BatchReport:
+        """
+        Answer every question that is not already in the output file, holding the job lock.
+
+        Args:
+            questions (List[BatchQuestion]): Questions to answer.
+
+        Returns:
+            BatchReport: Counts and throughput of the run.
+
+        Raises:
+            BatchJobRunning: If another run of this job holds the lock.
+        """
+        self.lock()
+        status = BatchStatus(status="running", total=len(questions))
+        try:
+            report = await self._run(questions, status)
+            status.status, status.report = "finished", report
+            return report
+        except asyncio.CancelledError:
+            status.status = "interrupted"
+            raise
+        except Exception as e:
+            self.logger.error(f"Batch job {self.output_path} failed: {e}")
+            status.status, status.error = "failed", str(e)
+            raise
+        finally:
+            self._write_status(status)
+            self._unlock()
+
+    async def _run(self, questions: List[BatchQuestion], status: BatchStatus) -> BatchReport:
+        start = time.perf_counter()
+        completed = self._completed_ids()
+        pending = [question for question in questions if question.id not in completed]
+        self.logger.info(f"Batch: {len(pending)} questions to answer, {len(questions) - len(pending)} already done")
+        status.answered = len(questions) - len(pending)
+        self._write_status(status)
+
+        faq_searcher = FAQSearcher(collection_name=self.faq_collection_name)
+        # Context is packed from chunks directly, no stuff-documents chain (and no Document objects) needed
+        qa_chain = qa_prompt | RAGPipeline(collection_name=self.collection_name).llm | StrOutputParser()
+        faq_engine = SearchEngine(collection_name=self.faq_collection_name, k=1)
+        faq_index = await aget_faq_index(self.faq_collection_name)
+        router = QueryRouter(default_k=self.k)
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        results: List[BatchResult] = []
+        routes: Dict[str, int] = {}
+        context_tokens: List[int] = []
+        for offset in range(0, len(pending), self.batch_size):
+            group = pending[offset:offset + self.batch_size]
+            texts = list(dict.fromkeys(question.question for question in group))
+            faq_texts = [text for text in texts if not router.route(text, self.collection_name).skip_faq]
+            # Exact FAQ matches are answered from the in-process index, without search or validation
+            exact = {text: match.answer for text in faq_texts
+                     if faq_index.enabled and (match := faq_index.exact(text)) is not None}
+            faq_texts = [text for text in faq_texts if text not in exact]
+            faq_hits, routed = await asyncio.gather(
+                asyncio.to_thread(faq_engine.search_chunks, faq_texts),
+                asyncio.to_thread(routed_contexts, self.collection_name, texts, router),
+            )
+            faq_chunks: Dict[str, List[Chunk]] = dict(zip(faq_texts, faq_hits))
+            rag_chunks: Dict[str, List[Chunk]] = {text: blocks for text, (_, blocks) in zip(texts, routed)}
+            for plan, blocks in routed:
+                routes[plan.category] = routes.get(plan.category, 0) + 1
+                context_tokens.append(sum(count_tokens(block.text) for block in blocks))
+            answered = await asyncio.gather(*(
+                self._answer(question, exact.get(question.question), faq_chunks.get(question.question, []),
+                             rag_chunks[question.question], faq_searcher, qa_chain, semaphore)
+                for question in group
+            ))
+            results += answered
+            status.answered += sum(result.error is None for result in answered)
+            status.failed += sum(result.error is not None for result in answered)
+            self._write_status(status)
+
+        elapsed = time.perf_counter() - start
+        report = BatchReport(
+            total=len(questions),
+            resumed=len(questions) - len(pending),
+            processed=len(results),
+            faq_answers=sum(result.source == "faq" for result in results),
+            rag_answers=sum(result.source == "rag" for result in results),
+            failed=sum(result.error is not None for result in results),
+            elapsed_seconds=round(elapsed, 3),
+            questions_per_second=round(len(results) / elapsed, 3) if elapsed else 0.0,
+            prompt_tokens=sum(call["prompt_tokens"] for call in self.usage_handler.calls),
+            cached_prompt_tokens=sum(call["cached_tokens"] for call in self.usage_handler.calls),
+            average_context_tokens=round(sum(context_tokens) / len(context_tokens), 1) if context_tokens else 0.0,
+            routes=routes,
+        )
+        self.logger.info(f"Batch finished: {report.model_dump()}")
+        return report
@@ -1,15 +1,24 @@
 """
 This module contains the IngestionManager class, which is responsible for managing the ingestion of documents into the Qdrant collection.
 """
+import asyncio
+import os
 from typing import List, Any
 
 from fastapi import UploadFile, File
 from langchain_core.documents.base import Document as LangchainDocument
 
 from api.logging_theme import setup_logger
+from domain.generation.faq_pipline import invalidate_faq_cache
 from domain.ingestion.chunking import ChunkProcessor
+from domain.ingestion.deduplication import ChunkDeduplicator
 from domain.ingestion.docx_parsing import DocxParser
 from domain.ingestion.indexing import IngestionPipeline
+from domain.retrieval.faq_index import refresh_faq_index
+from domain.retrieval.parents import ParentStore
+from utils.configs import get_table_store
+
+DEDUPLICATE_CHUNKS = os.getenv("DEDUPLICATE_CHUNKS", "true").lower() == "true"
 
 
 class IngestionManager:
@@ -30,9 +39,21 @@ class IngestionManager:
         Returns:
             Any: Result of the ingestion process.
         """
-        chunks: List[LangchainDocument] = await ChunkProcessor().chunking(file)
+        processor = ChunkProcessor()
+        chunks: List[LangchainDocument] = await processor.chunking(file)
+        # A re-uploaded file replaces its previous version: its old chunks, parents and tables are removed first
+        await asyncio.to_thread(self.remove, file.filename)
+        await asyncio.to_thread(ParentStore(collection_name=self.collection_name).save, processor.all_parents)
+        if DEDUPLICATE_CHUNKS:
+            chunks, _ = await ChunkDeduplicator(collection_name=self.collection_name).deduplicate(chunks)
+            if not chunks:
+                get_table_store().save_tables(self.collection_name, file.filename, processor.all_tables)
+                self.logger.info("All chunks were duplicates of existing points, nothing new to index")
+                return True
         try:
             await IngestionPipeline(collection_name=self.collection_name).ingest_data(chunks=chunks)
+            # Tables are only kept for files whose chunks made it into the collection
+            get_table_store().save_tables(self.collection_name, file.filename, processor.all_tables)
             self.logger.info("Ingestion of documents into collection successfully")
             return True
         except Exception as e:
@@ -52,8 +73,26 @@ class IngestionManager:
         chunks: List[LangchainDocument] = await DocxParser().faq_parsing(file)
         try:
             await IngestionPipeline(collection_name=self.collection_name).ingest_data(chunks=chunks)
+            invalidate_faq_cache(self.collection_name)
+            await asyncio.to_thread(refresh_faq_index, self.collection_name)
             self.logger.info(f"Ingestion of faq into collection successfully")
             return True
         except Exception as e:
             self.logger.error(f"Error ingesting FAQ data into Qdrant collection {e}")
-            raise ValueError(f"Error: {e}")
\ No newline at end of file
+            raise ValueError(f"Error: {e}")
+
+    def remove(self, file_path: str) -> int:
+        """
+        Removes a source document from the collection: its chunks, parent sections, tables and sparse statistics.
+
+        Args:
+            file_path (str): File name the document was uploaded with.
+
+        Returns:
+            int: Number of deleted chunks.
+        """
+        deleted = IngestionPipeline(collection_name=self.collection_name).remove_file(file_path)
+        ParentStore(collection_name=self.collection_name).delete_file(file_path)
+        get_table_store().delete_file(self.collection_name, file_path)
+        invalidate_faq_cache(self.collection_name)
+        return deleted
@@ -3,7 +3,11 @@ This module contains functions for managing the pipeline.
 """
 from api.logging_theme import setup_logger
 from domain.generation.faq_pipline import FAQSearcher
+from domain.generation.prompt_assembly import PromptCacheUsageHandler
+from domain.generation.prompt_templates import qa_prompt_assembler
 from domain.generation.rag_pipeline import RAGPipeline
+from domain.retrieval.faq_index import FAQ_COLLECTION
+from domain.retrieval.routing import QueryRouter
 
 
 class Pipline:
@@ -24,10 +28,11 @@ class Pipline:
         Returns:
             str: The response to the user's question.
         """
-        # Search for FAQ answers
+        # Comparisons and small talk are never single FAQ entries: skip the FAQ round trip
+        plan = QueryRouter().route(question, self.collection_name)
         try:
             # Search for FAQ answers
-            faq_answer = await FAQSearcher(collection_name="faq").search_faq(question)
+            faq_answer = None if plan.skip_faq else await FAQSearcher(collection_name=FAQ_COLLECTION).search_faq(question)
         except Exception as e:
             self.logger.error("Error occurred while searching FAQ: %s", e, exc_info=True)
             yield "An error occurred while processing your question.\n"
@@ -48,7 +53,11 @@ class Pipline:
         try:
             # Stream response
 
-            async for chunk in rag_chain.astream({"input": question}, config={"configurable": {"conversation_id": session_id}}):
+            config = {
+                "configurable": {"conversation_id": session_id},
+                "callbacks": [PromptCacheUsageHandler(static_tokens=qa_prompt_assembler.static_tokens)],
+            }
+            async for chunk in rag_chain.astream({"input": question}, config=config):
                 if "answer" in chunk:
                     yield chunk["answer"]
                     self.logger.debug(chunk["answer"])
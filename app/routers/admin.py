@@ -0,0 +1,78 @@
+"""
+Admin API for collection snapshots
+"""
+import asyncio
+import hmac
+import os
+import re
+
+from fastapi import APIRouter, Header, HTTPException
+
+from domain.generation.faq_pipline import invalidate_faq_cache
+from domain.ingestion.snapshot import SNAPSHOT_DIR, CollectionSnapshot, read_manifest
+from utils.configs import get_qdrant_client
+
+router = APIRouter(prefix="/admin")
+
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+def _check_token(token: str | None):
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=503, detail="Admin API disabled, set ADMIN_TOKEN to enable it")
+    if token is None or not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+def _snapshot_path(snapshot: str) -> str:
+    if not re.fullmatch(r"[\w.-]+", snapshot) or snapshot.startswith("."):
+        raise HTTPException(status_code=400, detail="Invalid snapshot name")
+    return os.path.join(SNAPSHOT_DIR, snapshot)
+
+
+@router.get("/snapshots")
+async def list_snapshots(x_admin_token: str | None = Header(default=None)):
+    """API list the snapshot archives on this server"""
+    _check_token(x_admin_token)
+    if not os.path.isdir(SNAPSHOT_DIR):
+        return []
+    return [
+        {"snapshot": name, **{key: value for key, value in read_manifest(os.path.join(SNAPSHOT_DIR, name)).items()
+                              if key != "files"}}
+        for name in sorted(os.listdir(SNAPSHOT_DIR))
+        if os.path.exists(os.path.join(SNAPSHOT_DIR, name, "manifest.json"))
+    ]
+
+
+@router.post("/snapshots/{collection_name}")
+async def export_snapshot(collection_name: str, snapshot: str | None = None,
+                          x_admin_token: str | None = Header(default=None)):
+    """API export a collection to SNAPSHOT_DIR/<snapshot>, defaulting to the collection name"""
+    _check_token(x_admin_token)
+    path = _snapshot_path(snapshot or collection_name)
+    try:
+        manifest = await asyncio.to_thread(CollectionSnapshot(collection_name=collection_name).export, path)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"status": "success", "snapshot": os.path.basename(path), "manifest": manifest}
+
+
+@router.post("/snapshots/{snapshot}/restore")
+async def restore_snapshot(snapshot: str, collection_name: str | None = None, overwrite: bool = False,
+                           x_admin_token: str | None = Header(default=None)):
+    """API restore a collection from SNAPSHOT_DIR/<snapshot>, defaulting to the exported collection name"""
+    _check_token(x_admin_token)
+    path = _snapshot_path(snapshot)
+    if not os.path.exists(os.path.join(path, "manifest.json")):
+        raise HTTPException(status_code=404, detail=f"Snapshot {snapshot} not found")
+    collection_name = collection_name or read_manifest(path)["collection_name"]
+    if not overwrite and get_qdrant_client().collection_exists(collection_name):
+        raise HTTPException(status_code=409, detail=f"Collection {collection_name} already exists")
+    try:
+        manifest = await asyncio.to_thread(CollectionSnapshot(collection_name=collection_name).restore, path,
+                                           overwrite)
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    # Workers rebuild their FAQ index and drop cached answers when the collection version changes
+    await asyncio.to_thread(invalidate_faq_cache, collection_name)
+    return {"status": "success", "collection_name": collection_name, "points_count": manifest["points_count"]}
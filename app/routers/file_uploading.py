@@ -1,22 +1,42 @@
 """
 File uploading API
 """
-from fastapi import APIRouter, File, UploadFile
+import asyncio
 
+from fastapi import APIRouter, File, HTTPException, UploadFile
+
+from domain.ingestion.uploads import UploadError
 from models.ingestion import IngestionManager
 
 router = APIRouter()
 
+
+def _ingestion_error(e: Exception) -> HTTPException:
+    """Structured error response of a failed upload: {"detail": {"code": ..., "message": ...}}"""
+    if isinstance(e, UploadError):
+        return HTTPException(status_code=e.status_code, detail=e.detail())
+    return HTTPException(status_code=500, detail={"code": "ingestion_failed", "message": str(e)})
+
 @router.post("/upload")
 async def upload_file(file: UploadFile = File(...), collection_name: str = "tailieu_ftu"):
     """API upload file"""
-    status = await IngestionManager(collection_name=collection_name).ingest(file=file)
-    if status:
-        return {"status": "success"}
+    try:
+        await IngestionManager(collection_name=collection_name).ingest(file=file)
+    except Exception as e:
+        raise _ingestion_error(e)
+    return {"status": "success"}
 
 @router.post("/upload_faq")
 async def upload_faq(file: UploadFile = File(...), collection_name: str = "faq"):
     """API upload FAQ file"""
-    status = await IngestionManager(collection_name=collection_name).ingest_faq(file=file)
-    if status:
-        return {"status": "success"}
\ No newline at end of file
+    try:
+        await IngestionManager(collection_name=collection_name).ingest_faq(file=file)
+    except Exception as e:
+        raise _ingestion_error(e)
+    return {"status": "success"}
+
+@router.delete("/documents")
+async def delete_document(file_path: str, collection_name: str = "tailieu_ftu"):
+    """API remove an uploaded file from a collection"""
+    deleted = await asyncio.to_thread(IngestionManager(collection_name=collection_name).remove, file_path)
+    return {"status": "success", "deleted_chunks": deleted}
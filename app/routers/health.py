@@ -0,0 +1,24 @@
+"""
+Health check API for load balancers and orchestrators
+"""
+from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+
+from api.draining import drain_state
+
+router = APIRouter()
+
+
+@router.get("/healthz")
+async def healthz():
+    """API liveness: the worker is up"""
+    return {"status": "ok"}
+
+
+@router.get("/readyz")
+async def readyz():
+    """API readiness: 503 while the worker drains, so no new traffic is routed to it"""
+    if drain_state.draining:
+        return JSONResponse(status_code=503,
+                            content={"status": "draining", "active_streams": drain_state.active_streams})
+    return {"status": "ready", "active_streams": drain_state.active_streams}
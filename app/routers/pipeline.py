@@ -1,18 +1,89 @@
 """
 Chat API using streaming response
 """
+import asyncio
+import os
+import re
+import uuid
 
-from fastapi import APIRouter
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from fastapi.responses import FileResponse, StreamingResponse
 from langchain_core.tracers.context import tracing_v2_enabled
 
+from api.draining import drain_state
+from domain.ingestion.uploads import MAX_BATCH_UPLOAD_BYTES, UploadError, check_upload_size
+from models.batch import MAX_BATCH_CONCURRENCY, BatchJobRunning, BatchRunner, read_questions
 from models.pipline import Pipline
 from schemas.chat_model import ChatMessage
 
 router = APIRouter()
 
+BATCH_OUTPUT_DIR = os.getenv("BATCH_OUTPUT_DIR", "batch_results")
+# Batch runs of this worker, referenced until they end so that they are not garbage collected
+_batch_jobs = set()
+
+
+def _forget_batch_job(task: asyncio.Task):
+    _batch_jobs.discard(task)
+    if not task.cancelled():
+        # Failures are logged and recorded in the job status by BatchRunner
+        task.exception()
+
+
+def _batch_output_path(job_id: str) -> str:
+    if not re.fullmatch(r"[\w-]+", job_id):
+        raise HTTPException(status_code=400, detail="Invalid job id")
+    return os.path.join(BATCH_OUTPUT_DIR, f"{job_id}.jsonl")
+
+
 @router.post("/chat")
 async def chat_stream(request: ChatMessage):
     """API chat using streaming response"""
     with tracing_v2_enabled("ftu_chatbot"):
-        return StreamingResponse(Pipline(collection_name=request.collection_name).stream_rag_response(question=request.query, session_id=request.session_id), media_type="text/event-stream")
+        stream = Pipline(collection_name=request.collection_name).stream_rag_response(question=request.query, session_id=request.session_id)
+        return StreamingResponse(drain_state.track(stream), media_type="text/event-stream")
+
+
+@router.post("/chat/batch", status_code=202)
+async def chat_batch(file: UploadFile = File(...), collection_name: str = "tailieu_ftu", job_id: str | None = None,
+                     concurrency: int = Query(8, ge=1, le=MAX_BATCH_CONCURRENCY)):
+    """API starting a batch job on a JSONL file of questions. Re-posting with the same job_id resumes the job"""
+    if drain_state.draining:
+        raise HTTPException(status_code=503, detail="Worker is shutting down")
+    job_id = job_id or uuid.uuid4().hex
+    output_path = _batch_output_path(job_id)
+    try:
+        check_upload_size(file, MAX_BATCH_UPLOAD_BYTES)
+        questions = read_questions((await file.read()).decode("utf-8").splitlines())
+    except UploadError as e:
+        raise HTTPException(status_code=e.status_code, detail=e.detail())
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    runner = BatchRunner(collection_name=collection_name, output_path=output_path, concurrency=concurrency)
+    try:
+        runner.lock()
+    except BatchJobRunning:
+        raise HTTPException(status_code=409, detail=f"Batch job {job_id} is already running")
+    # The job outlives the request: progress is polled from /chat/batch/{job_id}
+    task = asyncio.create_task(drain_state.run(runner.run(questions)))
+    _batch_jobs.add(task)
+    task.add_done_callback(_forget_batch_job)
+    return {"job_id": job_id, "total": len(questions)}
+
+
+@router.get("/chat/batch/{job_id}")
+async def chat_batch_status(job_id: str):
+    """API reporting the progress of a batch job, and its report once finished"""
+    status = BatchRunner.read_status(_batch_output_path(job_id))
+    if status is None:
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return {"job_id": job_id, **status.model_dump()}
+
+
+@router.get("/chat/batch/{job_id}/results")
+async def chat_batch_results(job_id: str):
+    """API downloading the JSONL results of a batch job"""
+    output_path = _batch_output_path(job_id)
+    if not os.path.exists(output_path):
+        raise HTTPException(status_code=404, detail="Batch job not found")
+    return FileResponse(output_path, media_type="application/x-ndjson", filename=f"{job_id}.jsonl")
@@ -0,0 +1,41 @@
+from typing import Dict, Optional
+
+from pydantic import BaseModel
+
+
+class BatchQuestion(BaseModel):
+    id: str
+    question: str
+
+
+class BatchResult(BaseModel):
+    id: str
+    question: str
+    answer: Optional[str] = None
+    source: Optional[str] = None
+    error: Optional[str] = None
+    latency_ms: float = 0.0
+
+
+class BatchReport(BaseModel):
+    total: int
+    resumed: int
+    processed: int
+    faq_answers: int
+    rag_answers: int
+    failed: int
+    elapsed_seconds: float
+    questions_per_second: float
+    prompt_tokens: int = 0
+    cached_prompt_tokens: int = 0
+    average_context_tokens: float = 0.0
+    routes: Dict[str, int] = {}
+
+
+class BatchStatus(BaseModel):
+    status: str
+    total: int = 0
+    answered: int = 0
+    failed: int = 0
+    report: Optional[BatchReport] = None
+    error: Optional[str] = None
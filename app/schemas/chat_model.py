@@ -1,9 +1,9 @@
 import uuid
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 
 class ChatMessage(BaseModel):
     query: str
-    session_id: str = str(uuid.uuid4())
+    session_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     collection_name: str
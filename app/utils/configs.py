@@ -1,21 +1,166 @@
 import os
+from functools import lru_cache
+from typing import Optional
 
 from dotenv import load_dotenv
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
-from langchain_qdrant import FastEmbedSparse
 
 load_dotenv()
 api_key = os.getenv('OPENAI_API_KEY')
-embeddings = OpenAIEmbeddings(model=os.getenv("OPENAI_EMBEDDING_MODEL"), api_key=api_key)
 
-spare_embeddings = FastEmbedSparse(model_name="Qdrant/bm25")
+QDRANT_URL = os.getenv("QDRANT_URL", "http://qdrant:6333/")
+SPARSE_MODEL_NAME = os.getenv("SPARSE_MODEL_NAME", "Qdrant/bm25")
+# Sparse embedding backend: "fastembed" (SPARSE_MODEL_NAME) or "vietnamese_bm25" (syllable n-grams, folded diacritics)
+SPARSE_EMBEDDING_BACKEND = os.getenv("SPARSE_EMBEDDING_BACKEND", "fastembed")
 
-llm = ChatOpenAI(
-    model=os.getenv("OPENAI_CHAT_MODEL"),
-    temperature=1.3,
-    max_tokens=None,
-    timeout=None,
-    max_retries=2,
-    api_key=api_key,
-)
+# Dense embedding backend: "openai" (remote) or "fastembed" (local ONNX on CPU)
+DENSE_EMBEDDING_BACKEND = os.getenv("DENSE_EMBEDDING_BACKEND", "openai")
+FASTEMBED_DENSE_MODEL = os.getenv("FASTEMBED_DENSE_MODEL", "intfloat/multilingual-e5-large")
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+EMBEDDING_THREADS = int(os.getenv("EMBEDDING_THREADS", "0")) or None
 
+RERANK_MODEL = os.getenv("RERANK_MODEL", "jinaai/jina-reranker-v2-base-multilingual")
+
+# Session and cache state: "sqlite" (shared by the workers of one node) or "redis" (shared by every node)
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite")
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", "data/state.sqlite3")
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379/0")
+
+# Heavy clients are built on first use so that importing a router (or a
+# reloader child) does not pay for model loading before it is needed.
+
+
+@lru_cache(maxsize=None)
+def get_embeddings(backend: str = DENSE_EMBEDDING_BACKEND):
+    """
+    Get the dense embedding model
+    Args:
+        backend (str): "openai" or "fastembed". Defaults to DENSE_EMBEDDING_BACKEND
+    Returns:
+        Embeddings: shared dense embedding instance
+    """
+    if backend == "openai":
+        from langchain_openai import OpenAIEmbeddings
+
+        return OpenAIEmbeddings(model=os.getenv("OPENAI_EMBEDDING_MODEL"), api_key=api_key)
+    if backend == "fastembed":
+        from domain.retrieval.embeddings import FastEmbedDenseEmbeddings
+
+        return FastEmbedDenseEmbeddings(
+            model_name=FASTEMBED_DENSE_MODEL,
+            batch_size=EMBEDDING_BATCH_SIZE,
+            threads=EMBEDDING_THREADS,
+        )
+    raise ValueError(f"Unsupported dense embedding backend: {backend}")
+
+
+@lru_cache(maxsize=None)
+def get_sparse_embeddings(collection_name: Optional[str] = None, backend: str = SPARSE_EMBEDDING_BACKEND):
+    """
+    Get the sparse (BM25) embedding model
+    Args:
+        collection_name (Optional[str]): collection whose statistics normalize document lengths ("vietnamese_bm25")
+        backend (str): "fastembed" or "vietnamese_bm25". Defaults to SPARSE_EMBEDDING_BACKEND
+    Returns:
+        SparseEmbeddings: shared sparse embedding instance
+    """
+    if backend == "fastembed":
+        return _get_fastembed_sparse()
+    if backend == "vietnamese_bm25":
+        from domain.retrieval.sparse_index import VietnameseBM25SparseEmbeddings
+
+        return VietnameseBM25SparseEmbeddings(collection_name=collection_name, stats=get_sparse_index_stats())
+    raise ValueError(f"Unsupported sparse embedding backend: {backend}")
+
+
+@lru_cache(maxsize=None)
+def _get_fastembed_sparse():
+    from langchain_qdrant import FastEmbedSparse
+
+    return FastEmbedSparse(model_name=SPARSE_MODEL_NAME)
+
+
+@lru_cache(maxsize=None)
+def get_sparse_index_stats():
+    """
+    Get the per-collection sparse length statistics and term-frequency cache
+    Returns:
+        SparseIndexStats: shared statistics store
+    """
+    from domain.retrieval.sparse_index import SparseIndexStats
+
+    return SparseIndexStats()
+
+
+@lru_cache(maxsize=None)
+def get_llm_router():
+    """
+    Get the LLM provider router
+    Returns:
+        LLMRouter: shared router over the configured chat providers
+    """
+    from domain.generation.llm_providers import LLMRouter
+
+    return LLMRouter()
+
+
+def get_llm(role: str = "generation"):
+    """
+    Get the chat model of a role, with failover to the other providers of its route
+    Args:
+        role (str): "generation" or "validation"
+    Returns:
+        Runnable: chat model with fallbacks
+    """
+    return get_llm_router().chat_model(role)
+
+
+@lru_cache(maxsize=None)
+def get_qdrant_client():
+    """
+    Get the Qdrant client shared by retrieval and ingestion
+    Returns:
+        QdrantClient: shared Qdrant client
+    """
+    from qdrant_client import QdrantClient
+
+    return QdrantClient(url=QDRANT_URL, prefer_grpc=True)
+
+
+@lru_cache(maxsize=None)
+def get_reranker():
+    """
+    Get the cross-encoder reranker
+    Returns:
+        CrossEncoderReranker: shared reranker instance
+    """
+    from domain.retrieval.rerank import CrossEncoderReranker
+
+    return CrossEncoderReranker(model_name=RERANK_MODEL)
+
+
+@lru_cache(maxsize=None)
+def get_table_store():
+    """
+    Get the table row store
+    Returns:
+        TableStore: shared table store
+    """
+    from domain.retrieval.table_store import TableStore
+
+    return TableStore()
+
+
+@lru_cache(maxsize=None)
+def get_state_backend():
+    """
+    Get the session and cache state backend
+    Returns:
+        StateBackend: shared state backend
+    """
+    from utils.state_backend import RedisStateBackend, SQLiteStateBackend
+
+    if STATE_BACKEND == "sqlite":
+        return SQLiteStateBackend(STATE_DB_PATH)
+    if STATE_BACKEND == "redis":
+        return RedisStateBackend(REDIS_URL)
+    raise ValueError(f"Unsupported state backend: {STATE_BACKEND}")
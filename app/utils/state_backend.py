@@ -0,0 +1,174 @@
+"""
+Shared state backends: per-session and cache state that must be visible to every worker and node.
+
+The SQLite backend is shared by the workers of one node (one file, WAL mode); the Redis backend is shared by
+every node behind a load balancer. Values are strings, callers serialize them.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import List, Optional
+
+from api.logging_theme import setup_logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS state (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS state_expires_at ON state (expires_at) WHERE expires_at IS NOT NULL;
+"""
+
+
+class StateBackend(ABC):
+    """
+    Key-value and list store with optional expiry.
+    """
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        """Value of a key, None if it is missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: Optional[int] = None):
+        """Set a key, expiring after ttl seconds if given."""
+
+    @abstractmethod
+    def delete(self, key: str):
+        """Delete a key."""
+
+    @abstractmethod
+    def incr(self, key: str) -> int:
+        """Atomically increment an integer key (missing keys count as 0) and return the new value."""
+
+    @abstractmethod
+    def append(self, key: str, values: List[str], max_length: Optional[int] = None, ttl: Optional[int] = None):
+        """Append values to a list, keeping only its last max_length items, and reset its expiry."""
+
+    @abstractmethod
+    def get_list(self, key: str) -> List[str]:
+        """Items of a list, oldest first."""
+
+    def close(self):
+        """Release connections."""
+
+
+class SQLiteStateBackend(StateBackend):
+    """
+    State in a local SQLite file, for one node. Lists are stored as JSON arrays and updated in IMMEDIATE
+    transactions, so concurrent workers do not lose appends.
+    """
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self.logger = setup_logger(__name__)
+        self._lock = threading.Lock()
+        self._writes = 0
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False, timeout=30, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.executescript(_SCHEMA)
+
+    def _read(self, key: str) -> Optional[str]:
+        row = self.connection.execute(
+            "SELECT value FROM state WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)", (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _write(self, key: str, value: str, ttl: Optional[int]):
+        self.connection.execute(
+            "INSERT OR REPLACE INTO state VALUES (?, ?, ?)", (key, value, time.time() + ttl if ttl else None)
+        )
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self.connection.execute("DELETE FROM state WHERE expires_at <= ?", (time.time(),))
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._read(key)
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None):
+        with self._lock:
+            self._write(key, value, ttl)
+
+    def delete(self, key: str):
+        with self._lock:
+            self.connection.execute("DELETE FROM state WHERE key = ?", (key,))
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                value = int(self._read(key) or 0) + 1
+                self._write(key, str(value), None)
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return value
+
+    def append(self, key: str, values: List[str], max_length: Optional[int] = None, ttl: Optional[int] = None):
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                items = json.loads(self._read(key) or "[]") + list(values)
+                if max_length is not None:
+                    items = items[-max_length:]
+                self._write(key, json.dumps(items, ensure_ascii=False), ttl)
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+
+    def get_list(self, key: str) -> List[str]:
+        with self._lock:
+            return json.loads(self._read(key) or "[]")
+
+    def close(self):
+        with self._lock:
+            self.connection.close()
+
+
+class RedisStateBackend(StateBackend):
+    """
+    State in Redis, shared by every node. Requires the optional ``redis`` package.
+    """
+    def __init__(self, url: str):
+        try:
+            import redis
+        except ImportError:
+            raise ValueError("STATE_BACKEND=redis requires the redis package (pip install redis)")
+        self.url = url
+        self.logger = setup_logger(__name__)
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(key)
+
+    def set(self, key: str, value: str, ttl: Optional[int] = None):
+        self.client.set(key, value, ex=ttl)
+
+    def delete(self, key: str):
+        self.client.delete(key)
+
+    def incr(self, key: str) -> int:
+        return int(self.client.incr(key))
+
+    def append(self, key: str, values: List[str], max_length: Optional[int] = None, ttl: Optional[int] = None):
+        if not values:
+            return
+        with self.client.pipeline(transaction=True) as pipeline:
+            pipeline.rpush(key, *values)
+            if max_length is not None:
+                pipeline.ltrim(key, -max_length, -1)
+            if ttl:
+                pipeline.expire(key, ttl)
+            pipeline.execute()
+
+    def get_list(self, key: str) -> List[str]:
+        return self.client.lrange(key, 0, -1)
+
+    def close(self):
+        self.client.close()
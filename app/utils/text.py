@@ -0,0 +1,50 @@
+"""
+Vietnamese text normalization helpers
+"""
+import re
+import unicodedata
+
+_NON_WORD = re.compile(r"[^\w\s]+")
+_SPACES = re.compile(r"\s+")
+
+
+def fold_diacritics(text: str) -> str:
+    """
+    Remove Vietnamese diacritics ("điểm chuẩn" -> "diem chuan")
+    Args:
+        text (str): text to fold
+    Returns:
+        str: text without diacritics
+    """
+    decomposed = unicodedata.normalize("NFD", text)
+    stripped = "".join(char for char in decomposed if unicodedata.category(char) != "Mn")
+    return stripped.replace("đ", "d").replace("Đ", "D")
+
+
+def normalize_text(text: str, fold: bool = True) -> str:
+    """
+    Normalize text for exact matching: NFC, lowercase, punctuation removed, whitespace collapsed
+    Args:
+        text (str): text to normalize
+        fold (bool): also remove diacritics
+    Returns:
+        str: normalized text
+    """
+    text = unicodedata.normalize("NFC", str(text)).lower()
+    if fold:
+        text = fold_diacritics(text)
+    text = _NON_WORD.sub(" ", text)
+    return _SPACES.sub(" ", text).strip()
+
+
+def syllable_ngrams(text: str, max_n: int = 3) -> list:
+    """
+    Syllable n-grams of a normalized text; Vietnamese words are usually one to three syllables
+    Args:
+        text (str): normalized text
+        max_n (int): longest n-gram
+    Returns:
+        list: n-grams, shortest first
+    """
+    syllables = text.split()
+    return [" ".join(syllables[i:i + n]) for n in range(1, max_n + 1) for i in range(len(syllables) - n + 1)]
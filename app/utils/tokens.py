@@ -0,0 +1,28 @@
+"""
+Token counting helpers used for prompt and context budgets
+"""
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """
+    Count the tokens of a text with the OpenAI tokenizer, or estimate them when it is unavailable
+    Args:
+        text (str): text to count
+    Returns:
+        int: number of tokens
+    """
+    encoding = _encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text, disallowed_special=()))